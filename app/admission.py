@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Literal
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .errors import ServiceUnavailableError
+from .metrics import DB_ADMISSION_IN_FLIGHT, DB_ADMISSION_QUEUE, DB_ADMISSION_SHED
+
+Priority = Literal["critical", "normal", "background"]
+PRIORITY_RANKS: dict[str, int] = {"critical": 0, "normal": 1, "background": 2}
+
+# Probes must get through a saturated worker; long streams yield to everyone else.
+CRITICAL_PATHS = frozenset({"/healthz", "/readyz"})
+BACKGROUND_PREFIXES = ("/v1/export", "/v1/products/import")
+
+request_priority: ContextVar[str] = ContextVar("request_priority", default="normal")
+
+
+def priority_for_path(path: str) -> Priority:
+    if path in CRITICAL_PATHS:
+        return "critical"
+    if path.startswith(BACKGROUND_PREFIXES):
+        return "background"
+    return "normal"
+
+
+class PriorityMiddleware:
+    """Puts the request in its admission lane; DB slots are taken in app/db.py."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_priority.set(priority_for_path(scope["path"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_priority.reset(token)
+
+
+class AdmissionController:
+    """Bounds the DB work one worker runs against a pool.
+
+    At most ``limit`` connections are handed out; ``reserved`` of them are
+    kept for the critical lane. Up to ``queue_size`` requests wait, critical
+    first and FIFO within a lane, for at most ``queue_timeout`` seconds.
+    Anything beyond that is shed with 503 and Retry-After right away instead
+    of queueing inside pool.acquire() until DB_POOL_TIMEOUT and failing
+    with 500. Critical requests are never shed for queue depth.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        reserved: int = 0,
+        queue_size: int = 20,
+        queue_timeout: float = 1.0,
+        retry_after: int = 1,
+        enabled: bool = True,
+    ) -> None:
+        self.name = name
+        self.limit = max(limit, 1)
+        self.reserved = max(0, min(reserved, self.limit - 1))
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self.in_use = 0
+        self.queued = 0
+        self.shed = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+
+    def _capacity(self, rank: int) -> int:
+        return self.limit if rank == 0 else self.limit - self.reserved
+
+    def _first_waiting_rank(self) -> int | None:
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return self._waiters[0][0] if self._waiters else None
+
+    def _observe(self) -> None:
+        DB_ADMISSION_IN_FLIGHT.labels(self.name).set(self.in_use)
+        DB_ADMISSION_QUEUE.labels(self.name).set(self.queued)
+
+    def _reject(self, priority: str, reason: str) -> ServiceUnavailableError:
+        self.shed += 1
+        DB_ADMISSION_SHED.labels(self.name, priority, reason).inc()
+        return ServiceUnavailableError("Database is busy, retry later", retry_after=self.retry_after)
+
+    async def acquire(self, priority: str | None = None) -> None:
+        priority = priority or request_priority.get()
+        rank = PRIORITY_RANKS[priority]
+        first_waiting = self._first_waiting_rank()
+        if self.in_use < self._capacity(rank) and (first_waiting is None or first_waiting > rank):
+            self.in_use += 1
+            self._observe()
+            return
+        if rank and self.queued >= self.queue_size:
+            raise self._reject(priority, "queue_full")
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (rank, next(self._sequence), waiter))
+        self.queued += 1
+        self._observe()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise self._reject(priority, "timeout") from None
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            self.queued -= 1
+            self._observe()
+
+    def release(self) -> None:
+        self.in_use -= 1
+        while self._waiters:
+            rank, _, waiter = self._waiters[0]
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_use >= self._capacity(rank):
+                break
+            heapq.heappop(self._waiters)
+            self.in_use += 1
+            waiter.set_result(None)
+        self._observe()
+
+    @asynccontextmanager
+    async def slot(self, priority: str | None = None) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "enabled": self.enabled,
+            "limit": self.limit,
+            "reserved": self.reserved,
+            "in_use": self.in_use,
+            "queued": self.queued,
+            "shed": self.shed,
+        }
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+
+import asyncpg
+
+from .config import get_settings
+from .db import statement_cache_options
+from .repositories import totals as totals_repo
+from .services.catalog_import import catalog_format, import_catalog as run_catalog_import, parse_catalog
+from .services.product_index import build_product_index
+
+
+async def check_totals(conn: asyncpg.Connection, user_id: str | None, repair: bool) -> int:
+    meal_drift = await totals_repo.fetch_meal_totals_drift(conn, user_id)
+    for record in meal_drift:
+        print(
+            f"meal {record['meal_id']} ({record['user_id']} {record['meal_date']}): "
+            f"calories {record['actual_calories']} != {record['expected_calories']}, "
+            f"items {record['actual_items_count']} != {record['expected_items_count']}"
+        )
+
+    day_drift = await totals_repo.fetch_day_totals_drift(conn, user_id)
+    for record in day_drift:
+        print(
+            f"day {record['user_id']} {record['day_date']}: "
+            f"calories {record['actual_calories']} != {record['expected_calories']}"
+        )
+
+    print(f"meal_totals drift: {len(meal_drift)}, day_totals drift: {len(day_drift)}")
+    if not meal_drift and not day_drift:
+        return 0
+    if not repair:
+        return 1
+
+    async with conn.transaction():
+        # refresh_meal_totals also refreshes the meal's day
+        await totals_repo.refresh_meal_totals(conn, [record["meal_id"] for record in meal_drift])
+        await totals_repo.refresh_day_totals(
+            conn, [record["user_id"] for record in day_drift], [record["day_date"] for record in day_drift]
+        )
+    print("repaired")
+    return 0
+
+
+async def build_search_index(conn: asyncpg.Connection, path: str) -> int:
+    index = await build_product_index(conn)
+    index.save(path)
+    print(f"product index with {len(index)} products written to {path}")
+    return 0
+
+
+async def import_catalog(conn: asyncpg.Connection, path: str, fmt: str | None, batch_size: int) -> int:
+    with open(path, encoding="utf-8-sig", newline="") as source:
+        rows = parse_catalog(source, fmt or catalog_format(path))
+        async for progress in run_catalog_import(conn, rows, batch_size):
+            if progress["status"] == "loading":
+                print(f"staged {progress['rows']} rows", file=sys.stderr)
+    print(
+        f"imported {progress['rows']} rows: {progress['created']} created, {progress['renamed']} renamed, "
+        f"{progress['nutrition_updated']} nutrition updated"
+    )
+    return 0
+
+
+async def _run(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    conn = await asyncpg.connect(settings.database_url, **statement_cache_options(settings))
+    try:
+        if args.command == "check-totals":
+            return await check_totals(conn, args.user, args.repair)
+        if args.command == "build-search-index":
+            return await build_search_index(conn, args.path)
+        if args.command == "import-catalog":
+            return await import_catalog(conn, args.path, args.format, args.batch_size)
+    finally:
+        await conn.close()
+    return 2
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="FoodTracker gateway maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("check-totals", help="Compare meal_totals/day_totals with the aggregate views")
+    check.add_argument("--user", help="Only check this user_id")
+    check.add_argument("--repair", action="store_true", help="Recompute drifted rows")
+
+    index = commands.add_parser("build-search-index", help="Write the product search snapshot shared by workers")
+    index.add_argument("path", help="Snapshot file, usually PRODUCT_INDEX_SNAPSHOT_PATH")
+
+    catalog = commands.add_parser("import-catalog", help="Load products and nutrition from CSV or NDJSON via COPY")
+    catalog.add_argument("path", help="CSV with a header (name,brand,calories,protein,fat,carbs[,product_id]) or NDJSON")
+    catalog.add_argument("--format", choices=("csv", "ndjson"), help="Defaults from the file extension")
+    catalog.add_argument("--batch-size", type=int, default=5000, help="Rows per COPY batch")
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
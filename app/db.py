@@ -1,16 +1,108 @@
 import asyncio
-from contextlib import asynccontextmanager
+import importlib
+import itertools
+import json
+import logging
+import pkgutil
+import time
+from collections.abc import Mapping
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import AsyncIterator, Callable
 
 import asyncpg
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from .config import get_settings
+from .admission import AdmissionController
+from .config import Settings, get_settings
+from .metrics import DB_POOL_ACQUIRE_DURATION, DB_REPLICA_FALLBACKS, observe_pool
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Unix time until which the client's reads go to the primary: sent after its
+# writes, echoed back by the client on the reads that follow
+PRIMARY_UNTIL_HEADER = "X-Primary-Until"
+
+
+def statement_cache_options(settings: Settings) -> dict[str, int]:
+    # "unnamed" keeps every statement unnamed, which is the only safe choice
+    # behind a transaction-mode pooler without prepared statement support.
+    if settings.db_statement_mode == "unnamed":
+        return {"statement_cache_size": 0}
+    return {"statement_cache_size": settings.db_statement_cache_size}
+
+
+def server_settings(settings: Settings) -> dict[str, str]:
+    # Sent in the startup packet, so they are the session defaults and
+    # survive the RESET ALL asyncpg runs when a connection goes back to the
+    # pool (a set_config() in the init hook would not). Only a direct
+    # connection keeps them; behind a transaction-mode pooler leave the
+    # optional ones unset.
+    options = {"application_name": settings.db_application_name}
+    if settings.db_search_path:
+        options["search_path"] = settings.db_search_path
+    if settings.db_statement_timeout_ms:
+        options["statement_timeout"] = str(settings.db_statement_timeout_ms)
+    return options
+
+
+def repository_queries() -> list[str]:
+    from . import repositories
+
+    queries: list[str] = []
+    for module_info in pkgutil.iter_modules(repositories.__path__):
+        module = importlib.import_module(f"{repositories.__name__}.{module_info.name}")
+        for name, value in vars(module).items():
+            if name.endswith("_QUERY") and isinstance(value, str):
+                queries.append(value)
+    return list(dict.fromkeys(queries))
+
+
+async def warm_statement_cache(conn: asyncpg.Connection, queries: list[str]) -> int:
+    # _get_statement is what fetch/execute go through, so the prepared
+    # statements land in the connection's own statement cache.
+    prepared = 0
+    for query in queries:
+        try:
+            await conn._get_statement(query, None)
+        except asyncpg.PostgresError as exc:
+            logger.debug("Statement warm-up skipped a query: %s", exc)
+            continue
+        prepared += 1
+    return prepared
+
+
+async def init_connection(conn: asyncpg.Connection, settings: Settings) -> None:
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    # Nutrition values are rounded to 0.1 in SQL; float is what the API returns.
+    await conn.set_type_codec("numeric", encoder=str, decoder=float, schema="pg_catalog", format="text")
+
+    # Only a direct connection keeps its server session, so only there
+    # it pays off to prepare everything up front.
+    if settings.db_statement_mode == "cached":
+        await warm_statement_cache(conn, repository_queries())
 
 
 class Database:
-    def __init__(self) -> None:
+    def __init__(self, name: str = "primary", url_setting: str = "database_url") -> None:
+        self.name = name
+        self._url_setting = url_setting
         self._pool: asyncpg.Pool | None = None
         self._lock = asyncio.Lock()
+        self.warm = False
+        self.draining = False
+        settings = get_settings()
+        self.admission = AdmissionController(
+            name,
+            settings.db_admission_limit or settings.db_pool_max_size,
+            reserved=settings.db_admission_reserved,
+            queue_size=settings.db_admission_queue_size,
+            queue_timeout=settings.db_admission_queue_timeout,
+            retry_after=settings.db_admission_retry_after,
+            enabled=settings.db_admission_enabled,
+        )
 
     async def get_pool(self) -> asyncpg.Pool:
         if self._pool:
@@ -19,26 +111,163 @@ class Database:
         async with self._lock:
             if self._pool:
                 return self._pool
+            if self.draining:
+                raise asyncpg.InterfaceError("database pool is closed")
 
             settings = get_settings()
             self._pool = await asyncpg.create_pool(
-                settings.database_url,
+                getattr(settings, self._url_setting),
                 min_size=settings.db_pool_min_size,
                 max_size=settings.db_pool_max_size,
                 timeout=settings.db_pool_timeout,
                 command_timeout=settings.db_command_timeout,
-                statement_cache_size=0,
+                init=self._init_connection,
+                server_settings=server_settings(settings),
+                **statement_cache_options(settings),
             )
             return self._pool
 
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        await init_connection(conn, get_settings())
+
+    async def open(self) -> None:
+        # create_pool connects min_size connections (running the init hook on
+        # each) before it returns, so the first request does not pay for it.
+        self.draining = False
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+        self.warm = True
+        logger.info("Database pool %s ready (%d connections)", self.name, pool.get_size())
+
+    async def close(self, timeout: float) -> None:
+        self.draining = True
+        self.warm = False
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        try:
+            # Waits for checked-out connections to be released; acquire()
+            # on the closing pool fails fast.
+            await asyncio.wait_for(pool.close(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Database pool %s did not drain in %.1fs, terminating connections", self.name, timeout)
+            pool.terminate()
+
     @asynccontextmanager
     async def connection(self) -> AsyncIterator[asyncpg.Connection]:
         pool = await self.get_pool()
-        async with pool.acquire() as conn:
+        # A saturated worker answers 503 here instead of queueing in acquire()
+        async with self.admission.slot():
+            started = time.perf_counter()
+            try:
+                async with pool.acquire() as conn:
+                    DB_POOL_ACQUIRE_DURATION.labels(self.name).observe(time.perf_counter() - started)
+                    observe_pool(pool, self.name)
+                    yield conn
+            finally:
+                observe_pool(pool, self.name)
+
+
+# Errors that mean "the replica is not reachable", as opposed to a failing query.
+_REPLICA_UNAVAILABLE = (OSError, asyncio.TimeoutError, asyncpg.InterfaceError, asyncpg.PostgresConnectionError)
+
+
+class ReadRouter:
+    """Sends reads to the replica unless it is down or the user wrote recently.
+
+    After a failed acquire the replica is skipped for ``retry_seconds``. A user
+    who wrote in the last ``sticky_seconds`` reads from the primary, so replica
+    lag does not hide their own write. The window is kept per process; with
+    several workers ReadYourWritesMiddleware hands it to the client in a
+    header and the read dependencies pass ``primary=True`` while the echoed
+    value lasts.
+
+    Every write also moves the user to a new write generation. Read flights
+    put it in their key, so a read sent after a write never joins a flight
+    that started before it.
+    """
+
+    def __init__(self, primary: Database, replica: Database | None) -> None:
+        self.primary = primary
+        self.replica = replica
+        self._recent_writes: dict[str, float] = {}
+        self._write_generations: dict[str, int] = {}
+        self._generation = itertools.count(1)
+        self._replica_down_until = 0.0
+
+    def mark_write(self, user_id: str) -> None:
+        now = time.monotonic()
+        self._recent_writes[user_id] = now + get_settings().read_your_writes_seconds
+        self._write_generations[user_id] = next(self._generation)
+        if len(self._recent_writes) > 10_000:
+            self._recent_writes = {user: until for user, until in self._recent_writes.items() if until > now}
+            # Flights last one request; a generation outlives the window only to tell them apart
+            self._write_generations = {user: self._write_generations[user] for user in self._recent_writes}
+
+    def write_generation(self, user_id: str) -> int:
+        return self._write_generations.get(user_id, 0)
+
+    def use_replica(self, user_id: str | None) -> bool:
+        if self.replica is None:
+            return False
+        now = time.monotonic()
+        if now < self._replica_down_until:
+            return False
+        return user_id is None or self._recent_writes.get(user_id, 0.0) <= now
+
+    @asynccontextmanager
+    async def connection(self, user_id: str | None = None, primary: bool = False) -> AsyncIterator[asyncpg.Connection]:
+        async with AsyncExitStack() as stack:
+            conn = None
+            if not primary and self.use_replica(user_id):
+                try:
+                    conn = await stack.enter_async_context(self.replica.connection())
+                except _REPLICA_UNAVAILABLE as exc:
+                    self._replica_down_until = time.monotonic() + get_settings().db_replica_retry_seconds
+                    DB_REPLICA_FALLBACKS.inc()
+                    logger.warning("Read replica unavailable, reading from primary: %s", exc)
+            if conn is None:
+                conn = await stack.enter_async_context(self.primary.connection())
             yield conn
 
 
+class ReadYourWritesMiddleware:
+    """Carries the write window to the client, so the next read stays on the
+    primary whichever worker serves it: a successful mutating request answers
+    with PRIMARY_UNTIL_HEADER, READ_YOUR_WRITES_SECONDS ahead. A header rather
+    than a cookie: the mini-app calls from another site without credentials."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_window(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + get_settings().read_your_writes_seconds
+                MutableHeaders(scope=message)[PRIMARY_UNTIL_HEADER] = f"{until:.3f}"
+            await send(message)
+
+        await self.app(scope, receive, send_with_window)
+
+
+def wrote_recently(headers: Mapping[str, str]) -> bool:
+    try:
+        until = float(headers.get(PRIMARY_UNTIL_HEADER, ""))
+    except ValueError:
+        return False
+    now = time.time()
+    # A value further ahead than one window was not issued here
+    return now < until <= now + get_settings().read_your_writes_seconds + 1.0
+
+
 database = Database()
+replica_database = Database("replica", "database_replica_url") if get_settings().database_replica_url else None
+read_router = ReadRouter(database, replica_database)
 
 
 async def get_connection() -> AsyncIterator[asyncpg.Connection]:
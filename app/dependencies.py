@@ -1,10 +1,12 @@
 from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
 
 import asyncpg
-from fastapi import Depends
+from fastapi import Depends, Request
 
 from .config import get_settings
-from .db import get_connection
+from .db import SAFE_METHODS, get_connection, read_router, wrote_recently
 
 
 async def get_user_id() -> str:
@@ -12,5 +14,46 @@ async def get_user_id() -> str:
     return settings.fixed_user_id
 
 
-async def get_db_connection(conn: asyncpg.Connection = Depends(get_connection)) -> asyncpg.Connection:
-    return conn
+async def get_db_connection(
+    request: Request,
+    conn: asyncpg.Connection = Depends(get_connection),
+    user_id: str = Depends(get_user_id),
+) -> AsyncIterator[asyncpg.Connection]:
+    # The user's next reads go to the primary for a while, so they see this write.
+    # Marked again once the route is done: reads that started while the write
+    # was still uncommitted are not shared with the ones sent after it.
+    writing = request.method not in SAFE_METHODS
+    if writing:
+        read_router.mark_write(user_id)
+    try:
+        yield conn
+    finally:
+        if writing:
+            read_router.mark_write(user_id)
+
+
+async def get_read_connection(
+    request: Request, user_id: str = Depends(get_user_id)
+) -> AsyncIterator[asyncpg.Connection]:
+    """Replica connection for GET routes, primary when there is no healthy replica
+    or the client wrote recently (its write may have gone to another worker)."""
+    async with read_router.connection(user_id, primary=wrote_recently(request.headers)) as conn:
+        yield conn
+
+
+@dataclass(frozen=True)
+class ReadConnector:
+    """Opens a read connection when called. Connectors reading the same user
+    from the same database are equal, so read flights can key on them."""
+
+    user_id: str
+    primary: bool = False
+
+    def __call__(self) -> AbstractAsyncContextManager[asyncpg.Connection]:
+        return read_router.connection(self.user_id, primary=self.primary)
+
+
+async def get_read_connector(request: Request, user_id: str = Depends(get_user_id)) -> ReadConnector:
+    """Like get_read_connection, for routes that take the connection only when
+    they run the load themselves (see services/single_flight.py)."""
+    return ReadConnector(user_id, primary=wrote_recently(request.headers))
@@ -4,12 +4,23 @@ from fastapi import HTTPException, status
 
 
 class GatewayError(HTTPException):
-    def __init__(self, code: str, message: str, http_status: int = status.HTTP_400_BAD_REQUEST) -> None:
-        super().__init__(status_code=http_status, detail={"error": {"code": code, "message": message}})
+    def __init__(
+        self,
+        code: str,
+        message: str,
+        http_status: int = status.HTTP_400_BAD_REQUEST,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(status_code=http_status, detail={"error": {"code": code, "message": message}}, headers=headers)
         self.code = code
         self.message = message
 
 
+class BadRequestError(GatewayError):
+    def __init__(self, message: str) -> None:
+        super().__init__(code="BAD_REQUEST", message=message, http_status=status.HTTP_400_BAD_REQUEST)
+
+
 class ValidationError(GatewayError):
     def __init__(self, message: str) -> None:
         super().__init__(code="VALIDATION_ERROR", message=message, http_status=status.HTTP_422_UNPROCESSABLE_ENTITY)
@@ -20,6 +31,24 @@ class NotFoundError(GatewayError):
         super().__init__(code="NOT_FOUND", message=message, http_status=status.HTTP_404_NOT_FOUND)
 
 
+class ConflictError(GatewayError):
+    def __init__(self, message: str) -> None:
+        super().__init__(code="CONFLICT", message=message, http_status=status.HTTP_409_CONFLICT)
+
+
+class PayloadTooLargeError(GatewayError):
+    def __init__(self, message: str) -> None:
+        super().__init__(code="PAYLOAD_TOO_LARGE", message=message, http_status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+
+class ServiceUnavailableError(GatewayError):
+    def __init__(self, message: str, retry_after: int | None = None) -> None:
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+        super().__init__(
+            code="UNAVAILABLE", message=message, http_status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=headers
+        )
+
+
 class InternalError(GatewayError):
     def __init__(self, message: str = "Internal server error") -> None:
         super().__init__(code="INTERNAL", message=message, http_status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,15 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
+from .admission import PriorityMiddleware
 from .config import get_settings
-from .db import database
+from .db import PRIMARY_UNTIL_HEADER, ReadYourWritesMiddleware, database, replica_database
 from .errors import GatewayError, InternalError
-from .routers import day, meals, products, settings as settings_router, stats
+from .metrics import MetricsMiddleware, render_metrics
+from .responses import ORJSONResponse
+from .routers import day, export, meals, products, settings as settings_router, stats
+from .services.day_cache import day_cache
+from .services.day_events import day_event_hub
+from .services.idempotency import IdempotencyMiddleware, idempotency_cache, idempotency_store
+from .services.notifications import DAY_CHANNEL, SETTINGS_CHANNEL, notification_listener
+from .services.product_index import product_index
+from .services.recognition import UploadLimitMiddleware, recognition_jobs, upload_limit
+from .services.settings_cache import settings_cache
+from .services.single_flight import read_flights
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +34,33 @@ DEFAULT_CORS_ORIGINS = [
 ]
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    pools = [pool for pool in (database, replica_database) if pool is not None]
+    if settings.db_pool_prewarm:
+        for pool in pools:
+            try:
+                await pool.open()
+            except Exception as exc:
+                # Keep serving /healthz; /readyz retries the warm-up, reads fall back to the primary.
+                logger.error("Database pool %s warm-up failed: %s", pool.name, exc)
+    notification_listener.subscribe(SETTINGS_CHANNEL, settings_cache.invalidate)
+    notification_listener.on_reset(settings_cache.clear)
+    notification_listener.subscribe(DAY_CHANNEL, day_event_hub.notify)
+    notification_listener.on_reset(day_event_hub.reset)
+    await notification_listener.start()
+    await product_index.start()
+    try:
+        yield
+    finally:
+        await product_index.stop()
+        await recognition_jobs.stop()
+        await notification_listener.stop()
+        await day_event_hub.stop()
+        await asyncio.gather(*(pool.close(settings.db_shutdown_timeout) for pool in pools))
+
+
 def create_app() -> FastAPI:
     settings = get_settings()
 
@@ -33,6 +74,8 @@ def create_app() -> FastAPI:
         docs_url=docs_url,
         redoc_url=redoc_url,
         openapi_url=openapi_url,
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     app.state.settings = settings
@@ -47,6 +90,28 @@ def create_app() -> FastAPI:
             cors_origins,
         )
 
+    # Inside CORS, so replayed responses get CORS headers too
+    if settings.idempotency_enabled:
+        app.add_middleware(
+            IdempotencyMiddleware,
+            cache=idempotency_cache,
+            store=idempotency_store,
+            max_bytes=settings.idempotency_max_bytes,
+        )
+
+    # Before the multipart parser spools the photos; outside idempotency, which
+    # would read the first megabyte itself
+    app.add_middleware(
+        UploadLimitMiddleware,
+        path="/v1/products/recognize-photo",
+        max_bytes=upload_limit(settings.recognition_max_files, settings.recognition_max_file_bytes),
+    )
+
+    # Reads of a client that just wrote stay on the primary in every worker;
+    # outside idempotency so replays carry the window too
+    if replica_database is not None:
+        app.add_middleware(ReadYourWritesMiddleware)
+
     if cors_origins:
         app.add_middleware(
             CORSMiddleware,
@@ -56,15 +121,30 @@ def create_app() -> FastAPI:
             # Allow all headers so that browsers can send any custom headers in CORS requests
             allow_headers=["*"],
             allow_credentials=True,
+            # Pagination cursor of /v1/products/search, conditional GETs, export file name, replays,
+            # read-your-writes window
+            expose_headers=[
+                "X-Next-Cursor",
+                "ETag",
+                "Content-Disposition",
+                "Idempotent-Replayed",
+                PRIMARY_UNTIL_HEADER,
+            ],
         )
     else:
         logger.error("CORS middleware disabled: no origins configured")
 
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+
+    # Outermost: the admission lane is known before any other middleware runs
+    app.add_middleware(PriorityMiddleware)
+
     @app.exception_handler(GatewayError)
     async def gateway_error_handler(request: Request, exc: GatewayError) -> JSONResponse:  # type: ignore[override]
         # Логируем осознанные бизнес-ошибки с кодом и сообщением
         logger.warning("Gateway error [%s] at %s: %s", exc.code, request.url.path, exc.message)
-        return JSONResponse(status_code=exc.status_code, content=exc.detail)
+        return JSONResponse(status_code=exc.status_code, content=exc.detail, headers=exc.headers)
 
     @app.exception_handler(Exception)
     async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONResponse:  # type: ignore[override]
@@ -86,16 +166,39 @@ def create_app() -> FastAPI:
 
     @app.get("/readyz")
     async def readyz() -> dict[str, bool]:
+        if database.draining:
+            raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="shutting down")
         try:
-            pool = await database.get_pool()
-            async with pool.acquire() as conn:
-                await conn.fetchval("SELECT 1")
+            if not database.warm:
+                await database.open()
+            else:
+                async with database.connection() as conn:
+                    await conn.fetchval("SELECT 1")
         except Exception as exc:  # pragma: no cover - health endpoint
-            logger.exception("Readiness probe failed", exc)
+            logger.exception("Readiness probe failed: %s", exc)
             raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="database unavailable")
         return {"ok": True}
 
+    @app.get("/cachez")
+    async def cachez() -> dict[str, dict]:
+        return {
+            "day": day_cache.stats(),
+            "settings": settings_cache.stats(),
+            "recognition": recognition_jobs.stats(),
+            "idempotency": idempotency_cache.stats(),
+            "admission": database.admission.stats(),
+            "single_flight": read_flights.stats(),
+        }
+
+    if settings.metrics_enabled:
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics() -> Response:
+            payload, content_type = render_metrics()
+            return Response(content=payload, media_type=content_type)
+
     app.include_router(day.router, prefix="/v1")
+    app.include_router(export.router, prefix="/v1")
     app.include_router(meals.router, prefix="/v1")
     app.include_router(products.router, prefix="/v1")
     app.include_router(settings_router.router, prefix="/v1")
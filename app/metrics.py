@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import os
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+import asyncpg
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Buckets from 1ms to 10s: the interesting range for both queries and routes.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "gateway_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "gateway_db_query_duration_seconds",
+    "Latency of repository functions.",
+    ["query"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "gateway_db_query_errors_total",
+    "Repository functions that raised a database error.",
+    ["query"],
+)
+DB_POOL_ACQUIRE_DURATION = Histogram(
+    "gateway_db_pool_acquire_duration_seconds",
+    "Time spent waiting for a pool connection.",
+    ["pool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "gateway_db_pool_connections",
+    "Pool connections by state (size, idle, in_use, max).",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+DB_ADMISSION_IN_FLIGHT = Gauge(
+    "gateway_db_admission_in_flight",
+    "Connections handed out by the admission controller.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_ADMISSION_QUEUE = Gauge(
+    "gateway_db_admission_queue_depth",
+    "Requests waiting for a database slot.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_ADMISSION_SHED = Counter(
+    "gateway_db_admission_shed_total",
+    "Requests answered 503 because the pool was saturated.",
+    ["pool", "priority", "reason"],
+)
+DB_REPLICA_FALLBACKS = Counter(
+    "gateway_db_replica_fallbacks_total",
+    "Reads sent to the primary because the replica could not be reached.",
+)
+DAY_EVENT_SUBSCRIBERS = Gauge(
+    "gateway_day_event_subscribers",
+    "Open /v1/day/{date}/events streams.",
+    multiprocess_mode="livesum",
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    "gateway_idempotency_requests_total",
+    "Mutating requests sent with Idempotency-Key, by outcome.",
+    ["outcome"],
+)
+
+
+def observe_pool(pool: asyncpg.Pool, name: str) -> None:
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    DB_POOL_CONNECTIONS.labels(name, "size").set(size)
+    DB_POOL_CONNECTIONS.labels(name, "idle").set(idle)
+    DB_POOL_CONNECTIONS.labels(name, "in_use").set(size - idle)
+    DB_POOL_CONNECTIONS.labels(name, "max").set(pool.get_max_size())
+
+
+def observe_query(func: F) -> F:
+    """Record the latency of a repository function as ``<module>.<function>``."""
+    label = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+    histogram = DB_QUERY_DURATION.labels(label)
+    errors = DB_QUERY_ERRORS.labels(label)
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def generator_wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                async for item in func(*args, **kwargs):
+                    yield item
+            except asyncpg.PostgresError:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        return generator_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except asyncpg.PostgresError:
+            errors.inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    return wrapper  # type: ignore[return-value]
+
+
+class MetricsMiddleware:
+    """Per-route latency. The label is the route template (``/v1/day/{date}``),
+    never the raw path, so cardinality stays bounded by the route table."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                f"{status_code // 100}xx",
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    # Under several uvicorn/gunicorn workers every process writes its samples
+    # to PROMETHEUS_MULTIPROC_DIR and the scrape aggregates them.
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+import asyncpg
+
+from ..metrics import observe_query
+
+IMPORT_STAGING_TABLE = "import_products"
+IMPORT_STAGING_COLUMNS = ("line", "product_id", "name", "brand", "calories", "protein", "fat", "carbs")
+
+# Staging lives for one transaction. Macros are float8 so COPY uses the
+# built-in binary codec; they are rounded to NUMERIC(6,1) when applied.
+CREATE_IMPORT_STAGING_QUERY = """
+CREATE TEMP TABLE import_products (
+  line       INT NOT NULL,
+  product_id UUID,
+  name       TEXT NOT NULL,
+  brand      TEXT,
+  calories   INT NOT NULL,
+  protein    DOUBLE PRECISION NOT NULL,
+  fat        DOUBLE PRECISION NOT NULL,
+  carbs      DOUBLE PRECISION NOT NULL
+) ON COMMIT DROP
+"""
+
+# Temp tables are never auto-analyzed; without stats the joins below plan as
+# if staging had a handful of rows.
+ANALYZE_IMPORT_STAGING_QUERY = "ANALYZE import_products"
+
+# The events are applied to the snapshot by APPLY_IMPORT_NUTRITION_QUERY in
+# one statement; trg_apply_nutrition_events skips them while this is on.
+SKIP_NUTRITION_TRIGGER_QUERY = "SELECT set_config('foodtracker.bulk_nutrition', 'on', true)"
+
+# Rows without product_id refresh the catalog product with the same name and brand
+RESOLVE_IMPORT_PRODUCTS_QUERY = """
+UPDATE import_products AS s
+SET product_id = p.product_id
+FROM foodtracker_app.products AS p
+WHERE s.product_id IS NULL
+  AND NOT p.is_custom
+  AND lower(p.name) = lower(s.name)
+  AND lower(coalesce(p.brand, '')) = lower(coalesce(s.brand, ''))
+"""
+
+# The same product twice in one file: the last line wins
+DEDUPE_IMPORT_PRODUCTS_QUERY = """
+DELETE FROM import_products AS s
+USING import_products AS later
+WHERE later.line > s.line
+  AND coalesce(later.product_id::text, lower(later.name) || '|' || lower(coalesce(later.brand, '')))
+    = coalesce(s.product_id::text, lower(s.name) || '|' || lower(coalesce(s.brand, '')))
+"""
+
+ASSIGN_IMPORT_PRODUCT_IDS_QUERY = """
+UPDATE import_products
+SET product_id = gen_random_uuid()
+WHERE product_id IS NULL
+"""
+
+# Created and renamed products come back so the in-memory search index can pick them up
+UPSERT_IMPORT_PRODUCTS_QUERY = """
+INSERT INTO foodtracker_app.products AS p (product_id, name, brand, is_custom)
+SELECT product_id, name, brand, false
+FROM import_products
+ON CONFLICT (product_id) DO UPDATE
+SET name = EXCLUDED.name,
+    brand = EXCLUDED.brand
+WHERE (p.name, p.brand) IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.brand)
+RETURNING p.product_id, p.name, p.brand, (xmax = 0) AS inserted
+"""
+
+# One event and one snapshot per product whose nutrition actually changed
+APPLY_IMPORT_NUTRITION_QUERY = """
+WITH changed AS (
+  SELECT s.product_id,
+         s.calories,
+         round(s.protein::numeric, 1) AS protein,
+         round(s.fat::numeric, 1) AS fat,
+         round(s.carbs::numeric, 1) AS carbs
+  FROM import_products AS s
+  LEFT JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = s.product_id
+  WHERE n.product_id IS NULL
+     OR (n.calories, n.protein, n.fat, n.carbs)
+        IS DISTINCT FROM (s.calories, round(s.protein::numeric, 1), round(s.fat::numeric, 1), round(s.carbs::numeric, 1))
+),
+events AS (
+  INSERT INTO foodtracker_app.product_nutrition_events (product_id, calories, protein, fat, carbs, source)
+  SELECT product_id, calories, protein, fat, carbs, $1
+  FROM changed
+),
+snapshots AS (
+  INSERT INTO foodtracker_app.product_nutrition_per_100g AS n (product_id, calories, protein, fat, carbs, updated_at)
+  SELECT product_id, calories, protein, fat, carbs, now()
+  FROM changed
+  ON CONFLICT (product_id) DO UPDATE
+  SET calories = EXCLUDED.calories,
+      protein = EXCLUDED.protein,
+      fat = EXCLUDED.fat,
+      carbs = EXCLUDED.carbs,
+      updated_at = EXCLUDED.updated_at
+)
+SELECT count(*) FROM changed
+"""
+
+
+@observe_query
+async def create_import_staging(conn: asyncpg.Connection) -> None:
+    await conn.execute(CREATE_IMPORT_STAGING_QUERY)
+
+
+@observe_query
+async def copy_import_rows(conn: asyncpg.Connection, rows: Iterable[tuple]) -> None:
+    await conn.copy_records_to_table(IMPORT_STAGING_TABLE, records=rows, columns=IMPORT_STAGING_COLUMNS)
+
+
+@observe_query
+async def apply_import(conn: asyncpg.Connection, source: str) -> tuple[dict[str, int], list[asyncpg.Record]]:
+    """Apply the staged rows; returns the counts and the created or renamed products."""
+    await conn.execute(ANALYZE_IMPORT_STAGING_QUERY)
+    await conn.execute(RESOLVE_IMPORT_PRODUCTS_QUERY)
+    await conn.execute(DEDUPE_IMPORT_PRODUCTS_QUERY)
+    await conn.execute(ASSIGN_IMPORT_PRODUCT_IDS_QUERY)
+    await conn.execute(SKIP_NUTRITION_TRIGGER_QUERY)
+    products = await conn.fetch(UPSERT_IMPORT_PRODUCTS_QUERY)
+    nutrition_updated = await conn.fetchval(APPLY_IMPORT_NUTRITION_QUERY, source)
+    created = sum(1 for record in products if record["inserted"])
+    result = {"created": created, "renamed": len(products) - created, "nutrition_updated": nutrition_updated}
+    return result, products
@@ -4,16 +4,18 @@ from datetime import date
 
 import asyncpg
 
+from ..metrics import observe_query
+
 
 DAY_TOTAL_QUERY = """
 SELECT day_date, calories, protein, fat, carbs
-FROM foodtracker_app.v_day_totals
+FROM foodtracker_app.day_totals
 WHERE user_id = $1 AND day_date = $2
 """
 
 MEAL_TOTALS_QUERY = """
 SELECT meal_id, meal_type, meal_time, calories, protein, fat, carbs, items_count
-FROM foodtracker_app.v_meal_totals
+FROM foodtracker_app.meal_totals
 WHERE user_id = $1 AND meal_date = $2
 ORDER BY meal_time, meal_type
 """
@@ -25,6 +27,130 @@ WHERE user_id = $1 AND insight_date = $2
 LIMIT 1
 """
 
+# Whole day screen in one round trip: settings, summary, meals and insight.
+# Summary is summed from the day's meal totals instead of reading day_totals
+# again; the rounding matches refresh_day_totals exactly.
+DAY_COMPOSITE_QUERY = """
+WITH user_settings AS (
+  SELECT calorie_target, calorie_tolerance, macro_mode, protein_target, fat_target, carbs_target
+  FROM foodtracker_app.settings
+  WHERE user_id = $1
+  LIMIT 1
+),
+day_meals AS (
+  SELECT meal_id, meal_type, meal_time, calories, protein, fat, carbs, items_count
+  FROM foodtracker_app.meal_totals
+  WHERE user_id = $1 AND meal_date = $2
+),
+day_summary AS (
+  SELECT
+    COALESCE(SUM(calories), 0)::INT AS calories,
+    COALESCE(ROUND(SUM(protein), 1), 0.0) AS protein,
+    COALESCE(ROUND(SUM(fat), 1), 0.0) AS fat,
+    COALESCE(ROUND(SUM(carbs), 1), 0.0) AS carbs,
+    COALESCE(
+      json_agg(
+        json_build_object(
+          'meal_id', meal_id,
+          'meal_type', meal_type,
+          'meal_time', meal_time,
+          'calories', calories,
+          'protein', protein,
+          'fat', fat,
+          'carbs', carbs,
+          'items_count', items_count
+        )
+        ORDER BY meal_time, meal_type
+      ),
+      '[]'::json
+    ) AS meals
+  FROM day_meals
+),
+day_insight AS (
+  SELECT text, severity
+  FROM foodtracker_app.day_insights
+  WHERE user_id = $1 AND insight_date = $2
+  LIMIT 1
+)
+SELECT
+  s.calorie_target,
+  s.calorie_tolerance,
+  s.macro_mode,
+  s.protein_target,
+  s.fat_target,
+  s.carbs_target,
+  d.calories,
+  d.protein,
+  d.fat,
+  d.carbs,
+  d.meals,
+  i.text AS insight_text,
+  i.severity AS insight_severity
+FROM user_settings AS s
+CROSS JOIN day_summary AS d
+LEFT JOIN day_insight AS i ON TRUE
+"""
+
+# Every date of [$2, $3] with its summary, meals and insight, in one round
+# trip whatever the length of the range. Same shape and rounding as
+# DAY_COMPOSITE_QUERY; settings are loaded once by the caller.
+DAYS_RANGE_QUERY = """
+WITH range_meals AS (
+  SELECT
+    meal_date,
+    SUM(calories)::INT AS calories,
+    ROUND(SUM(protein), 1) AS protein,
+    ROUND(SUM(fat), 1) AS fat,
+    ROUND(SUM(carbs), 1) AS carbs,
+    json_agg(
+      json_build_object(
+        'meal_id', meal_id,
+        'meal_type', meal_type,
+        'meal_time', meal_time,
+        'calories', calories,
+        'protein', protein,
+        'fat', fat,
+        'carbs', carbs,
+        'items_count', items_count
+      )
+      ORDER BY meal_time, meal_type
+    ) AS meals
+  FROM foodtracker_app.meal_totals
+  WHERE user_id = $1 AND meal_date BETWEEN $2 AND $3
+  GROUP BY meal_date
+),
+range_insights AS (
+  SELECT insight_date, text, severity
+  FROM foodtracker_app.day_insights
+  WHERE user_id = $1 AND insight_date BETWEEN $2 AND $3
+)
+SELECT
+  d::date AS day_date,
+  COALESCE(m.calories, 0) AS calories,
+  COALESCE(m.protein, 0.0) AS protein,
+  COALESCE(m.fat, 0.0) AS fat,
+  COALESCE(m.carbs, 0.0) AS carbs,
+  COALESCE(m.meals, '[]'::json) AS meals,
+  i.text AS insight_text,
+  i.severity AS insight_severity
+FROM generate_series($2::date, $3::date, interval '1 day') AS d
+LEFT JOIN range_meals AS m ON m.meal_date = d::date
+LEFT JOIN range_insights AS i ON i.insight_date = d::date
+ORDER BY d
+"""
+
+# Which of the given (user_id, date) pairs have an item with the product.
+DAYS_USING_PRODUCTS_QUERY = """
+SELECT k.user_id::text AS user_id, k.day_date
+FROM unnest($2::uuid[], $3::date[]) AS k(user_id, day_date)
+WHERE EXISTS (
+  SELECT 1
+  FROM foodtracker_app.meals AS m
+  JOIN foodtracker_app.meal_items AS mi ON mi.meal_id = m.meal_id
+  WHERE m.user_id = k.user_id AND m.meal_date = k.day_date AND mi.product_id = ANY($1::uuid[])
+)
+"""
+
 SETTINGS_QUERY = """
 SELECT calorie_target, calorie_tolerance, macro_mode, protein_target, fat_target, carbs_target
 FROM foodtracker_app.settings
@@ -33,20 +159,44 @@ LIMIT 1
 """
 
 
+@observe_query
 async def fetch_day_totals(conn: asyncpg.Connection, user_id: str, target_date: date) -> asyncpg.Record | None:
     return await conn.fetchrow(DAY_TOTAL_QUERY, user_id, target_date)
 
 
+@observe_query
 async def fetch_meal_totals(conn: asyncpg.Connection, user_id: str, target_date: date) -> list[asyncpg.Record]:
     return await conn.fetch(MEAL_TOTALS_QUERY, user_id, target_date)
 
 
+@observe_query
 async def fetch_insight(conn: asyncpg.Connection, user_id: str, target_date: date) -> asyncpg.Record | None:
     return await conn.fetchrow(INSIGHT_QUERY, user_id, target_date)
 
 
+@observe_query
 async def fetch_settings(conn: asyncpg.Connection, user_id: str) -> asyncpg.Record:
     record = await conn.fetchrow(SETTINGS_QUERY, user_id)
     if record is None:
         raise ValueError("User settings not found")
     return record
+
+
+@observe_query
+async def fetch_day(conn: asyncpg.Connection, user_id: str, target_date: date) -> asyncpg.Record:
+    record = await conn.fetchrow(DAY_COMPOSITE_QUERY, user_id, target_date)
+    if record is None:
+        raise ValueError("User settings not found")
+    return record
+
+
+@observe_query
+async def fetch_days(conn: asyncpg.Connection, user_id: str, start_date: date, end_date: date) -> list[asyncpg.Record]:
+    return await conn.fetch(DAYS_RANGE_QUERY, user_id, start_date, end_date)
+
+
+@observe_query
+async def fetch_days_using_products(
+    conn: asyncpg.Connection, product_ids: list[str], user_ids: list[str], dates: list[date]
+) -> list[asyncpg.Record]:
+    return await conn.fetch(DAYS_USING_PRODUCTS_QUERY, product_ids, user_ids, dates)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from datetime import date
+
+import asyncpg
+
+from ..metrics import observe_query
+
+# Meals without items come out once with empty item columns. Items keep the
+# order they were added in; item_id only breaks ties.
+EXPORT_ITEMS_QUERY = """
+SELECT m.meal_date,
+       m.meal_type,
+       m.meal_time,
+       m.meal_id,
+       v.item_id,
+       v.product_id,
+       v.name,
+       v.brand,
+       v.grams,
+       v.added_via,
+       v.calories,
+       v.protein,
+       v.fat,
+       v.carbs
+FROM foodtracker_app.meals AS m
+LEFT JOIN foodtracker_app.v_meal_items_computed AS v ON v.meal_id = m.meal_id
+WHERE m.user_id = $1
+  AND ($2::date IS NULL OR m.meal_date >= $2)
+  AND ($3::date IS NULL OR m.meal_date <= $3)
+ORDER BY m.meal_date, m.meal_time, m.meal_id, v.created_at, v.item_id
+"""
+
+
+@observe_query
+async def iter_export_rows(
+    conn: asyncpg.Connection,
+    user_id: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[asyncpg.Record]:
+    # One snapshot for the whole export, however long the client takes to read it
+    async with conn.transaction(isolation="repeatable_read", readonly=True):
+        async for record in conn.cursor(EXPORT_ITEMS_QUERY, user_id, date_from, date_to, prefetch=batch_size):
+            yield record
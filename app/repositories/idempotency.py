@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncpg
+
+from ..metrics import observe_query
+
+# Takes the key unless a live row holds it; an expired row or a claim whose
+# lease ran out (the worker running it is gone) is taken over.
+CLAIM_KEY_QUERY = """
+INSERT INTO foodtracker_app.idempotency_keys AS k (user_id, idem_key, fingerprint, expires_at, locked_until)
+VALUES ($1, $2, $3, now() + $4 * interval '1 second', now() + $5 * interval '1 second')
+ON CONFLICT (user_id, idem_key) DO UPDATE
+SET fingerprint = EXCLUDED.fingerprint,
+    status = NULL,
+    headers = NULL,
+    body = NULL,
+    created_at = now(),
+    expires_at = EXCLUDED.expires_at,
+    locked_until = EXCLUDED.locked_until
+WHERE k.expires_at <= now() OR (k.status IS NULL AND k.locked_until <= now())
+RETURNING true
+"""
+
+FETCH_KEY_QUERY = """
+SELECT fingerprint, status, headers, body
+FROM foodtracker_app.idempotency_keys
+WHERE user_id = $1 AND idem_key = $2
+"""
+
+COMPLETE_KEY_QUERY = """
+UPDATE foodtracker_app.idempotency_keys
+SET status = $3, headers = $4::jsonb, body = $5
+WHERE user_id = $1 AND idem_key = $2
+"""
+
+RELEASE_KEY_QUERY = """
+DELETE FROM foodtracker_app.idempotency_keys
+WHERE user_id = $1 AND idem_key = $2 AND status IS NULL
+"""
+
+PURGE_EXPIRED_KEYS_QUERY = """
+DELETE FROM foodtracker_app.idempotency_keys
+WHERE expires_at <= now()
+"""
+
+
+@observe_query
+async def claim_key(
+    conn: asyncpg.Connection, user_id: str, key: str, fingerprint: str, ttl_seconds: float, lease_seconds: float
+) -> bool:
+    return bool(await conn.fetchval(CLAIM_KEY_QUERY, user_id, key, fingerprint, ttl_seconds, lease_seconds))
+
+
+@observe_query
+async def fetch_key(conn: asyncpg.Connection, user_id: str, key: str) -> asyncpg.Record | None:
+    return await conn.fetchrow(FETCH_KEY_QUERY, user_id, key)
+
+
+@observe_query
+async def complete_key(
+    conn: asyncpg.Connection, user_id: str, key: str, status: int, headers: list[list[str]], body: bytes
+) -> None:
+    await conn.execute(COMPLETE_KEY_QUERY, user_id, key, status, headers, body)
+
+
+@observe_query
+async def release_key(conn: asyncpg.Connection, user_id: str, key: str) -> None:
+    await conn.execute(RELEASE_KEY_QUERY, user_id, key)
+
+
+@observe_query
+async def purge_expired_keys(conn: asyncpg.Connection) -> None:
+    await conn.execute(PURGE_EXPIRED_KEYS_QUERY)
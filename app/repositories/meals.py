@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from datetime import time
-from typing import Any
 
 import asyncpg
 
+from ..metrics import observe_query
+
 
 CREATE_MEAL_QUERY = """
 INSERT INTO foodtracker_app.meals (meal_id, user_id, meal_date, meal_type, meal_time)
@@ -12,19 +14,39 @@ VALUES (gen_random_uuid(), $1, $2, $3, $4)
 RETURNING meal_id
 """
 
-GET_MEAL_QUERY = """
-SELECT meal_id, meal_type, meal_time, calories, protein, fat, carbs
-FROM foodtracker_app.v_meal_totals
-WHERE user_id = $1 AND meal_id = $2
-"""
-
-GET_MEAL_ITEMS_QUERY = """
-SELECT v.item_id, v.name, v.grams, v.calories, v.protein, v.fat, v.carbs, v.added_via
-FROM foodtracker_app.v_meal_items_computed AS v
-JOIN foodtracker_app.meals AS m ON m.meal_id = v.meal_id
-JOIN foodtracker_app.meal_items AS mi ON mi.item_id = v.item_id
-WHERE m.user_id = $1 AND v.meal_id = $2
-ORDER BY mi.created_at
+# Meal header and its items in one statement. The header comes from
+# meal_totals (kept in sync by triggers) instead of aggregating v_meal_totals,
+# and the items are ordered by the view's created_at: no second meal_items join.
+GET_MEAL_DETAIL_QUERY = """
+SELECT t.meal_id,
+       t.meal_type,
+       t.meal_time,
+       t.calories,
+       t.protein,
+       t.fat,
+       t.carbs,
+       COALESCE(
+         (
+           SELECT json_agg(
+                    json_build_object(
+                      'item_id', v.item_id,
+                      'name', v.name,
+                      'grams', v.grams,
+                      'calories', v.calories,
+                      'protein', v.protein,
+                      'fat', v.fat,
+                      'carbs', v.carbs,
+                      'added_via', v.added_via
+                    )
+                    ORDER BY v.created_at
+                  )
+           FROM foodtracker_app.v_meal_items_computed AS v
+           WHERE v.meal_id = t.meal_id
+         ),
+         '[]'::json
+       ) AS items
+FROM foodtracker_app.meal_totals AS t
+WHERE t.user_id = $1 AND t.meal_id = $2
 """
 
 DELETE_MEAL_QUERY = """
@@ -33,28 +55,84 @@ WHERE user_id = $1 AND meal_id = $2
 RETURNING meal_id
 """
 
+# Item mutations return the computed MealItem from the same statement. The
+# view cannot see rows written by the statement itself, so the RETURNING rows
+# are joined to products and nutrition directly, with the view's formulas.
+# A product without a nutrition snapshot counts as zero, as in the totals:
+# the row is written either way and must come back, or the route says 404.
 CREATE_ITEM_QUERY = """
-INSERT INTO foodtracker_app.meal_items (item_id, meal_id, product_id, grams, added_via)
-VALUES (gen_random_uuid(), $1, $2, $3, $4)
-RETURNING item_id
+WITH inserted AS (
+  INSERT INTO foodtracker_app.meal_items (item_id, meal_id, product_id, grams, added_via)
+  SELECT gen_random_uuid(), m.meal_id, $3, $4, COALESCE($5::foodtracker_app.added_via, 'search')
+  FROM foodtracker_app.meals AS m
+  WHERE m.user_id = $1 AND m.meal_id = $2
+  RETURNING item_id, product_id, grams, added_via
+)
+SELECT i.item_id,
+       p.name,
+       i.grams,
+       COALESCE(ROUND((n.calories * i.grams) / 100.0)::INT, 0) AS calories,
+       COALESCE(ROUND((n.protein  * i.grams) / 100.0, 1), 0.0) AS protein,
+       COALESCE(ROUND((n.fat      * i.grams) / 100.0, 1), 0.0) AS fat,
+       COALESCE(ROUND((n.carbs    * i.grams) / 100.0, 1), 0.0) AS carbs,
+       i.added_via
+FROM inserted AS i
+JOIN foodtracker_app.products AS p ON p.product_id = i.product_id
+LEFT JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = i.product_id
 """
 
-GET_ITEM_QUERY = """
-SELECT v.item_id, v.name, v.grams, v.calories, v.protein, v.fat, v.carbs, v.added_via
-FROM foodtracker_app.v_meal_items_computed AS v
-JOIN foodtracker_app.meals AS m ON m.meal_id = v.meal_id
-WHERE m.user_id = $1 AND v.item_id = $2
+# One statement for the whole batch. created_at is spread by the item's
+# position so that items keep the request order in ORDER BY created_at.
+CREATE_ITEMS_BATCH_QUERY = """
+WITH inserted AS (
+  INSERT INTO foodtracker_app.meal_items (item_id, meal_id, product_id, grams, added_via, created_at)
+  SELECT gen_random_uuid(),
+         m.meal_id,
+         i.product_id,
+         i.grams,
+         COALESCE(i.added_via::foodtracker_app.added_via, 'search'),
+         now() + (i.position - 1) * interval '1 microsecond'
+  FROM foodtracker_app.meals AS m
+  CROSS JOIN unnest($3::uuid[], $4::int[], $5::text[]) WITH ORDINALITY AS i(product_id, grams, added_via, position)
+  WHERE m.user_id = $1 AND m.meal_id = $2
+  RETURNING item_id, product_id, grams, added_via, created_at
+)
+SELECT i.item_id,
+       p.name,
+       i.grams,
+       COALESCE(ROUND((n.calories * i.grams) / 100.0)::INT, 0) AS calories,
+       COALESCE(ROUND((n.protein  * i.grams) / 100.0, 1), 0.0) AS protein,
+       COALESCE(ROUND((n.fat      * i.grams) / 100.0, 1), 0.0) AS fat,
+       COALESCE(ROUND((n.carbs    * i.grams) / 100.0, 1), 0.0) AS carbs,
+       i.added_via
+FROM inserted AS i
+JOIN foodtracker_app.products AS p ON p.product_id = i.product_id
+LEFT JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = i.product_id
+ORDER BY i.created_at
 """
 
 UPDATE_ITEM_QUERY = """
-UPDATE foodtracker_app.meal_items AS mi
-SET grams = $1
-FROM foodtracker_app.meals AS m
-WHERE mi.meal_id = m.meal_id
-  AND m.user_id = $2
-  AND mi.meal_id = $3
-  AND mi.item_id = $4
-RETURNING mi.item_id
+WITH updated AS (
+  UPDATE foodtracker_app.meal_items AS mi
+  SET grams = $1
+  FROM foodtracker_app.meals AS m
+  WHERE mi.meal_id = m.meal_id
+    AND m.user_id = $2
+    AND mi.meal_id = $3
+    AND mi.item_id = $4
+  RETURNING mi.item_id, mi.product_id, mi.grams, mi.added_via
+)
+SELECT u.item_id,
+       p.name,
+       u.grams,
+       COALESCE(ROUND((n.calories * u.grams) / 100.0)::INT, 0) AS calories,
+       COALESCE(ROUND((n.protein  * u.grams) / 100.0, 1), 0.0) AS protein,
+       COALESCE(ROUND((n.fat      * u.grams) / 100.0, 1), 0.0) AS fat,
+       COALESCE(ROUND((n.carbs    * u.grams) / 100.0, 1), 0.0) AS carbs,
+       u.added_via
+FROM updated AS u
+JOIN foodtracker_app.products AS p ON p.product_id = u.product_id
+LEFT JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = u.product_id
 """
 
 DELETE_ITEM_QUERY = """
@@ -68,40 +146,46 @@ RETURNING mi.item_id
 """
 
 
+@observe_query
 async def create_meal(conn: asyncpg.Connection, user_id: str, meal_date: str, meal_type: str, meal_time: time) -> str:
     record = await conn.fetchrow(CREATE_MEAL_QUERY, user_id, meal_date, meal_type, meal_time)
     return str(record["meal_id"])
 
 
-async def get_meal(conn: asyncpg.Connection, user_id: str, meal_id: str) -> asyncpg.Record | None:
-    return await conn.fetchrow(GET_MEAL_QUERY, user_id, meal_id)
-
-
-async def get_meal_items(conn: asyncpg.Connection, user_id: str, meal_id: str) -> list[asyncpg.Record]:
-    return await conn.fetch(GET_MEAL_ITEMS_QUERY, user_id, meal_id)
+@observe_query
+async def get_meal_detail(conn: asyncpg.Connection, user_id: str, meal_id: str) -> asyncpg.Record | None:
+    return await conn.fetchrow(GET_MEAL_DETAIL_QUERY, user_id, meal_id)
 
 
+@observe_query
 async def delete_meal(conn: asyncpg.Connection, user_id: str, meal_id: str) -> bool:
     record = await conn.fetchrow(DELETE_MEAL_QUERY, user_id, meal_id)
     return record is not None
 
 
+@observe_query
 async def create_meal_item(
     conn: asyncpg.Connection, user_id: str, meal_id: str, product_id: str, grams: int, added_via: str | None
-) -> str:
-    record = await conn.fetchrow(CREATE_ITEM_QUERY, user_id, meal_id, product_id, grams, added_via)
-    return str(record["item_id"])
+) -> asyncpg.Record | None:
+    return await conn.fetchrow(CREATE_ITEM_QUERY, user_id, meal_id, product_id, grams, added_via)
 
 
-async def get_meal_item(conn: asyncpg.Connection, user_id: str, item_id: str) -> asyncpg.Record | None:
-    return await conn.fetchrow(GET_ITEM_QUERY, user_id, item_id)
+@observe_query
+async def create_meal_items(
+    conn: asyncpg.Connection, user_id: str, meal_id: str, items: Sequence[tuple[str, int, str | None]]
+) -> list[asyncpg.Record]:
+    product_ids, grams, added_via = (list(column) for column in zip(*items))
+    return await conn.fetch(CREATE_ITEMS_BATCH_QUERY, user_id, meal_id, product_ids, grams, added_via)
 
 
-async def update_meal_item(conn: asyncpg.Connection, user_id: str, meal_id: str, item_id: str, grams: int) -> bool:
-    record = await conn.fetchrow(UPDATE_ITEM_QUERY, grams, user_id, meal_id, item_id)
-    return record is not None
+@observe_query
+async def update_meal_item(
+    conn: asyncpg.Connection, user_id: str, meal_id: str, item_id: str, grams: int
+) -> asyncpg.Record | None:
+    return await conn.fetchrow(UPDATE_ITEM_QUERY, grams, user_id, meal_id, item_id)
 
 
+@observe_query
 async def delete_meal_item(conn: asyncpg.Connection, user_id: str, meal_id: str, item_id: str) -> bool:
     record = await conn.fetchrow(DELETE_ITEM_QUERY, user_id, meal_id, item_id)
     return record is not None
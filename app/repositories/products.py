@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from datetime import datetime
 from typing import Sequence
 
 import asyncpg
 
+from ..metrics import observe_query
+
 SEARCH_PRODUCTS_QUERY = """
 SELECT p.product_id,
        p.name,
@@ -15,14 +19,93 @@ SELECT p.product_id,
 FROM foodtracker_app.products AS p
 JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = p.product_id
 WHERE LOWER(p.name) LIKE LOWER($1)
-ORDER BY p.name
-LIMIT 25
+  AND ($2::text IS NULL OR (p.name, p.product_id) > ($2, $3::uuid))
+ORDER BY p.name, p.product_id
+LIMIT $4
 """
 
+# Ranked by trigram similarity; the keyset is (score DESC, name, product_id).
+SEARCH_PRODUCTS_TRGM_QUERY = """
+SELECT p.product_id,
+       p.name,
+       p.brand,
+       n.calories,
+       n.protein,
+       n.fat,
+       n.carbs,
+       similarity(lower(p.name), $1) AS score
+FROM foodtracker_app.products AS p
+JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = p.product_id
+WHERE lower(p.name) LIKE $2
+  AND (
+    $3::real IS NULL
+    OR similarity(lower(p.name), $1) < $3::real
+    OR (similarity(lower(p.name), $1) = $3::real AND (p.name, p.product_id) > ($4, $5::uuid))
+  )
+ORDER BY score DESC, p.name, p.product_id
+LIMIT $6
+"""
+
+# Queries shorter than a trigram: name prefix, served by the text_pattern_ops index
+SEARCH_PRODUCTS_PREFIX_QUERY = """
+SELECT p.product_id,
+       p.name,
+       p.brand,
+       n.calories,
+       n.protein,
+       n.fat,
+       n.carbs,
+       lower(p.name) AS sort_name
+FROM foodtracker_app.products AS p
+JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = p.product_id
+WHERE lower(p.name) LIKE $1
+  AND ($2::text IS NULL OR (lower(p.name), p.product_id) > ($2, $3::uuid))
+ORDER BY lower(p.name), p.product_id
+LIMIT $4
+"""
+
+GET_PRODUCTS_BY_IDS_QUERY = """
+SELECT p.product_id,
+       p.name,
+       p.brand,
+       n.calories,
+       n.protein,
+       n.fat,
+       n.carbs
+FROM unnest($1::uuid[]) WITH ORDINALITY AS ids(product_id, position)
+JOIN foodtracker_app.products AS p ON p.product_id = ids.product_id
+JOIN foodtracker_app.product_nutrition_per_100g AS n ON n.product_id = p.product_id
+ORDER BY ids.position
+"""
+
+LIST_PRODUCTS_FOR_INDEX_QUERY = """
+SELECT product_id, name, brand, created_at
+FROM foodtracker_app.products
+ORDER BY length(name), lower(name)
+"""
+
+LIST_PRODUCTS_CREATED_SINCE_QUERY = """
+SELECT product_id, name, brand, created_at
+FROM foodtracker_app.products
+WHERE created_at > $1
+ORDER BY created_at
+"""
+
+# Product and its first nutrition event in one statement: nothing to roll
+# back if the event fails, one round trip. FK checks and the snapshot trigger
+# run at the end of the statement, when the product row is visible.
 CREATE_PRODUCT_QUERY = """
-INSERT INTO foodtracker_app.products (product_id, name, brand, is_custom, created_by)
-VALUES (gen_random_uuid(), $1, $2, true, $3)
-RETURNING product_id
+WITH product AS (
+  INSERT INTO foodtracker_app.products (product_id, name, brand, is_custom, created_by)
+  VALUES (gen_random_uuid(), $1, $2, true, $3)
+  RETURNING product_id
+),
+event AS (
+  INSERT INTO foodtracker_app.product_nutrition_events (event_id, product_id, calories, protein, fat, carbs, source)
+  SELECT gen_random_uuid(), product_id, $4, $5, $6, $7, 'manual'
+  FROM product
+)
+SELECT product_id FROM product
 """
 
 INSERT_NUTRITION_EVENT_QUERY = """
@@ -31,17 +114,98 @@ VALUES (gen_random_uuid(), $1, $2, $3, $4, $5, $6)
 RETURNING event_id
 """
 
+# Only the last correction of each product in the request is written: events of
+# one statement share now(), so request order could not be told apart later.
+INSERT_NUTRITION_EVENTS_BATCH_QUERY = """
+WITH inserted AS (
+  INSERT INTO foodtracker_app.product_nutrition_events (
+    event_id, product_id, calories, protein, fat, carbs, source
+  )
+  SELECT gen_random_uuid(),
+         e.product_id,
+         e.calories,
+         round(e.protein::numeric, 1),
+         round(e.fat::numeric, 1),
+         round(e.carbs::numeric, 1),
+         $6
+  FROM (
+    SELECT DISTINCT ON (u.product_id) u.*
+    FROM unnest($1::uuid[], $2::int[], $3::float8[], $4::float8[], $5::float8[])
+         WITH ORDINALITY AS u(product_id, calories, protein, fat, carbs, position)
+    ORDER BY u.product_id, u.position DESC
+  ) AS e
+  ORDER BY e.product_id
+  RETURNING 1
+)
+SELECT count(*) FROM inserted
+"""
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@observe_query
+async def search_products(
+    conn: asyncpg.Connection, query: str, limit: int = 25, after: tuple[str, str] | None = None
+) -> Sequence[asyncpg.Record]:
+    pattern = f"%{_escape_like(query.lower())}%"
+    after_name, after_id = after or (None, None)
+    return await conn.fetch(SEARCH_PRODUCTS_QUERY, pattern, after_name, after_id, limit)
+
+
+@observe_query
+async def search_products_trgm(
+    conn: asyncpg.Connection, query: str, limit: int = 25, after: tuple[float, str, str] | None = None
+) -> Sequence[asyncpg.Record]:
+    needle = query.lower()
+    after_score, after_name, after_id = after or (None, None, None)
+    return await conn.fetch(
+        SEARCH_PRODUCTS_TRGM_QUERY, needle, f"%{_escape_like(needle)}%", after_score, after_name, after_id, limit
+    )
+
 
-async def search_products(conn: asyncpg.Connection, query: str) -> Sequence[asyncpg.Record]:
-    pattern = f"%{query.lower()}%"
-    return await conn.fetch(SEARCH_PRODUCTS_QUERY, pattern)
+@observe_query
+async def search_products_prefix(
+    conn: asyncpg.Connection, query: str, limit: int = 25, after: tuple[str, str] | None = None
+) -> Sequence[asyncpg.Record]:
+    after_name, after_id = after or (None, None)
+    return await conn.fetch(SEARCH_PRODUCTS_PREFIX_QUERY, f"{_escape_like(query.lower())}%", after_name, after_id, limit)
 
 
-async def create_product(conn: asyncpg.Connection, name: str, brand: str | None, user_id: str) -> str:
-    record = await conn.fetchrow(CREATE_PRODUCT_QUERY, name, brand, user_id)
+@observe_query
+async def get_products_by_ids(conn: asyncpg.Connection, product_ids: list[str]) -> Sequence[asyncpg.Record]:
+    return await conn.fetch(GET_PRODUCTS_BY_IDS_QUERY, product_ids)
+
+
+@observe_query
+async def iter_products_for_index(conn: asyncpg.Connection, batch_size: int = 5000) -> AsyncIterator[asyncpg.Record]:
+    async with conn.transaction(readonly=True):
+        async for record in conn.cursor(LIST_PRODUCTS_FOR_INDEX_QUERY, prefetch=batch_size):
+            yield record
+
+
+@observe_query
+async def list_products_created_since(conn: asyncpg.Connection, since: datetime) -> Sequence[asyncpg.Record]:
+    return await conn.fetch(LIST_PRODUCTS_CREATED_SINCE_QUERY, since)
+
+
+@observe_query
+async def create_product(
+    conn: asyncpg.Connection,
+    name: str,
+    brand: str | None,
+    user_id: str,
+    calories: int,
+    protein: float,
+    fat: float,
+    carbs: float,
+) -> str:
+    record = await conn.fetchrow(CREATE_PRODUCT_QUERY, name, brand, user_id, calories, protein, fat, carbs)
     return str(record["product_id"])
 
 
+@observe_query
 async def insert_nutrition_event(
     conn: asyncpg.Connection,
     product_id: str,
@@ -53,3 +217,14 @@ async def insert_nutrition_event(
 ) -> str:
     record = await conn.fetchrow(INSERT_NUTRITION_EVENT_QUERY, product_id, calories, protein, fat, carbs, source)
     return str(record["event_id"])
+
+
+@observe_query
+async def insert_nutrition_events(
+    conn: asyncpg.Connection, events: Sequence[tuple[str, int, float, float, float]], source: str
+) -> int:
+    """Writes the last correction of each product and returns how many events
+    were written. Earlier corrections of a product in the same batch never
+    reach the event log."""
+    product_ids, calories, protein, fat, carbs = (list(column) for column in zip(*events))
+    return await conn.fetchval(INSERT_NUTRITION_EVENTS_BATCH_QUERY, product_ids, calories, protein, fat, carbs, source)
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import asyncpg
 
+from ..metrics import observe_query
+
 GET_SETTINGS_QUERY = """
 SELECT calorie_target, calorie_tolerance, macro_mode, protein_target, fat_target, carbs_target
 FROM foodtracker_app.settings
@@ -21,10 +23,12 @@ RETURNING user_id
 """
 
 
+@observe_query
 async def get_settings(conn: asyncpg.Connection, user_id: str) -> asyncpg.Record | None:
     return await conn.fetchrow(GET_SETTINGS_QUERY, user_id)
 
 
+@observe_query
 async def update_settings(
     conn: asyncpg.Connection,
     user_id: str,
@@ -4,13 +4,67 @@ from datetime import date
 
 import asyncpg
 
+from ..metrics import observe_query
+
 STATS_QUERY = """
 SELECT day_date AS date, calories, protein, fat, carbs
-FROM foodtracker_app.v_day_totals
+FROM foodtracker_app.day_totals
 WHERE user_id = $1 AND day_date BETWEEN $2 AND $3
 ORDER BY day_date
 """
 
 
+# Week/month buckets report the average over logged days in the bucket. The
+# first bucket starts at the requested date, not at the week or month around it.
+STATS_BUCKET_QUERY = """
+SELECT GREATEST(date_trunc($4, day_date::timestamp)::date, $2) AS date,
+       ROUND(AVG(calories))::INT AS calories,
+       ROUND(AVG(protein), 1) AS protein,
+       ROUND(AVG(fat), 1) AS fat,
+       ROUND(AVG(carbs), 1) AS carbs,
+       COUNT(*)::INT AS days
+FROM foodtracker_app.day_totals
+WHERE user_id = $1 AND day_date BETWEEN $2 AND $3
+GROUP BY 1
+ORDER BY 1
+"""
+
+# Same buckets as parallel arrays in a single row
+STATS_COLUMNS_QUERY = """
+SELECT COALESCE(array_agg(b.date ORDER BY b.date), '{}') AS dates,
+       COALESCE(array_agg(b.calories ORDER BY b.date), '{}') AS calories,
+       COALESCE(array_agg(b.protein ORDER BY b.date), '{}') AS protein,
+       COALESCE(array_agg(b.fat ORDER BY b.date), '{}') AS fat,
+       COALESCE(array_agg(b.carbs ORDER BY b.date), '{}') AS carbs,
+       COALESCE(array_agg(b.days ORDER BY b.date), '{}') AS days
+FROM (
+  SELECT GREATEST(date_trunc($4, day_date::timestamp)::date, $2) AS date,
+         ROUND(AVG(calories))::INT AS calories,
+         ROUND(AVG(protein), 1) AS protein,
+         ROUND(AVG(fat), 1) AS fat,
+         ROUND(AVG(carbs), 1) AS carbs,
+         COUNT(*)::INT AS days
+  FROM foodtracker_app.day_totals
+  WHERE user_id = $1 AND day_date BETWEEN $2 AND $3
+  GROUP BY 1
+) AS b
+"""
+
+
+@observe_query
 async def fetch_stats(conn: asyncpg.Connection, user_id: str, start_date: date, end_date: date) -> list[asyncpg.Record]:
     return await conn.fetch(STATS_QUERY, user_id, start_date, end_date)
+
+
+@observe_query
+async def fetch_stats_buckets(
+    conn: asyncpg.Connection, user_id: str, start_date: date, end_date: date, bucket: str
+) -> list[asyncpg.Record]:
+    return await conn.fetch(STATS_BUCKET_QUERY, user_id, start_date, end_date, bucket)
+
+
+@observe_query
+async def fetch_stats_columns(
+    conn: asyncpg.Connection, user_id: str, start_date: date, end_date: date, bucket: str
+) -> asyncpg.Record:
+    return await conn.fetchrow(STATS_COLUMNS_QUERY, user_id, start_date, end_date, bucket)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncpg
+
+from ..metrics import observe_query
+
+# Rows where the trigger-maintained tables disagree with the views.
+# A NULL user filter ($1) checks every user.
+MEAL_TOTALS_DRIFT_QUERY = """
+SELECT COALESCE(v.meal_id, t.meal_id) AS meal_id,
+       COALESCE(v.user_id, t.user_id) AS user_id,
+       COALESCE(v.meal_date, t.meal_date) AS meal_date,
+       v.calories AS expected_calories,
+       t.calories AS actual_calories,
+       v.items_count AS expected_items_count,
+       t.items_count AS actual_items_count
+FROM (
+  SELECT * FROM foodtracker_app.v_meal_totals WHERE $1::uuid IS NULL OR user_id = $1
+) AS v
+FULL OUTER JOIN (
+  SELECT * FROM foodtracker_app.meal_totals WHERE $1::uuid IS NULL OR user_id = $1
+) AS t ON t.meal_id = v.meal_id
+WHERE (v.user_id, v.meal_date, v.meal_type, v.meal_time, v.calories, v.protein, v.fat, v.carbs, v.items_count)
+      IS DISTINCT FROM
+      (t.user_id, t.meal_date, t.meal_type, t.meal_time, t.calories, t.protein, t.fat, t.carbs, t.items_count)
+ORDER BY 2, 3
+"""
+
+DAY_TOTALS_DRIFT_QUERY = """
+SELECT COALESCE(v.user_id, t.user_id) AS user_id,
+       COALESCE(v.day_date, t.day_date) AS day_date,
+       v.calories AS expected_calories,
+       t.calories AS actual_calories
+FROM (
+  SELECT * FROM foodtracker_app.v_day_totals WHERE $1::uuid IS NULL OR user_id = $1
+) AS v
+FULL OUTER JOIN (
+  SELECT * FROM foodtracker_app.day_totals WHERE $1::uuid IS NULL OR user_id = $1
+) AS t ON t.user_id = v.user_id AND t.day_date = v.day_date
+WHERE (v.calories, v.protein, v.fat, v.carbs) IS DISTINCT FROM (t.calories, t.protein, t.fat, t.carbs)
+ORDER BY 1, 2
+"""
+
+REFRESH_MEAL_TOTALS_QUERY = """
+SELECT foodtracker_app.refresh_meal_totals(meal_id)
+FROM unnest($1::uuid[]) AS meal_id
+"""
+
+REFRESH_DAY_TOTALS_QUERY = """
+SELECT foodtracker_app.refresh_day_totals(k.user_id, k.day_date)
+FROM unnest($1::uuid[], $2::date[]) AS k(user_id, day_date)
+"""
+
+
+@observe_query
+async def fetch_meal_totals_drift(conn: asyncpg.Connection, user_id: str | None = None) -> list[asyncpg.Record]:
+    return await conn.fetch(MEAL_TOTALS_DRIFT_QUERY, user_id)
+
+
+@observe_query
+async def fetch_day_totals_drift(conn: asyncpg.Connection, user_id: str | None = None) -> list[asyncpg.Record]:
+    return await conn.fetch(DAY_TOTALS_DRIFT_QUERY, user_id)
+
+
+@observe_query
+async def refresh_meal_totals(conn: asyncpg.Connection, meal_ids: list) -> None:
+    await conn.execute(REFRESH_MEAL_TOTALS_QUERY, meal_ids)
+
+
+@observe_query
+async def refresh_day_totals(conn: asyncpg.Connection, user_ids: list, dates: list) -> None:
+    await conn.execute(REFRESH_DAY_TOTALS_QUERY, user_ids, dates)
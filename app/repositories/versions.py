@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import asyncpg
+
+from ..metrics import observe_query
+
+# Maintained by triggers (sql_templates/13_user_versions.sql); a user without
+# a row has never changed anything since the table was created.
+GET_USER_VERSION_QUERY = """
+SELECT version
+FROM foodtracker_app.user_versions
+WHERE user_id = $1
+"""
+
+
+@observe_query
+async def fetch_user_version(conn: asyncpg.Connection, user_id: str) -> int:
+    version = await conn.fetchval(GET_USER_VERSION_QUERY, user_id)
+    return version or 0
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    # Models built with model_construct from database rows are dumped as they
+    # are, without going through validation again.
+    if isinstance(value, BaseModel):
+        return vars(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson.
+
+    UUID, date, time, datetime and Enum are encoded natively; pydantic models
+    and Decimal go through ``_default``. Returning this response from a route
+    skips FastAPI's response_model validation, so only use it with data that
+    is already trusted (database rows, cached responses).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
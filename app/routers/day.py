@@ -1,43 +1,92 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
 
-from ..dependencies import get_db_connection, get_user_id
-from ..errors import ValidationError
-from ..repositories import day as day_repo
-from ..schemas.common import DayResponse, Insight, MealSummary, Settings, Summary
-from ..services.utils import compute_status, ensure_valid_date
+from ..dependencies import ReadConnector, get_read_connection, get_read_connector, get_user_id
+from ..config import get_settings
+from ..db import read_router
+from ..errors import ServiceUnavailableError, ValidationError
+from ..repositories import versions as versions_repo
+from ..responses import ORJSONResponse
+from ..schemas.common import DayResponse
+from ..services.day import load_day_cached, load_days
+from ..services.day_events import day_event_hub, stream_day_events
+from ..services.etag import etag_headers, etag_matches, make_etag, not_modified
+from ..services.single_flight import read_flights
+from ..services.utils import ensure_valid_date, resolve_days_range
 
 router = APIRouter(tags=["day"])
 
 
 @router.get("/day/{date}", response_model=DayResponse)
-async def get_day(date: str, conn=Depends(get_db_connection), user_id: str = Depends(get_user_id)) -> DayResponse:  # type: ignore[name-defined]
+async def get_day(
+    date: str,
+    if_none_match: str | None = Header(None),
+    connect: ReadConnector = Depends(get_read_connector),
+    user_id: str = Depends(get_user_id),
+) -> DayResponse:  # type: ignore[name-defined]
     try:
         target_date = ensure_valid_date(date)
     except ValueError as exc:
         raise ValidationError(str(exc)) from exc
 
-    settings_record = await day_repo.fetch_settings(conn, user_id)
-    settings = Settings(**dict(settings_record))
+    async def load() -> tuple[str, DayResponse | None]:
+        async with connect() as conn:
+            version = await versions_repo.fetch_user_version(conn, user_id)
+            etag = make_etag("day", version, target_date)
+            if etag_matches(if_none_match, etag):
+                return etag, None
+            return etag, await load_day_cached(conn, user_id, target_date, version)
 
-    totals_record = await day_repo.fetch_day_totals(conn, user_id, target_date)
-    if totals_record:
-        summary_totals = Summary(**dict(totals_record), status="ok")
-    else:
-        summary_totals = Summary(calories=0, protein=0, fat=0, carbs=0, status="ok")
+    # Tabs opened together send the same request; one connection serves them all
+    key = ("day", connect, read_router.write_generation(user_id), target_date, if_none_match)
+    etag, day = await read_flights.run(key, load)
+    if day is None:
+        return not_modified(etag)
+    return ORJSONResponse(day, headers=etag_headers(etag))
 
-    summary_totals.status = compute_status(summary_totals.calories, settings)
 
-    meal_records = await day_repo.fetch_meal_totals(conn, user_id, target_date)
-    meals: list[MealSummary] = []
-    for record in meal_records:
-        data = dict(record)
-        if "meal_id" in data:
-            data["meal_id"] = str(data["meal_id"])
-        meals.append(MealSummary(**data))
+@router.get("/days", response_model=list[DayResponse])
+async def get_days(
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    if_none_match: str | None = Header(None),
+    conn=Depends(get_read_connection),
+    user_id: str = Depends(get_user_id),
+) -> list[DayResponse]:  # type: ignore[name-defined]
+    try:
+        start_date, end_date = resolve_days_range(date_from, date_to)
+    except ValueError as exc:
+        raise ValidationError(str(exc)) from exc
+
+    version = await versions_repo.fetch_user_version(conn, user_id)
+    etag = make_etag("days", version, start_date, end_date)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    days = await load_days(conn, user_id, start_date, end_date, version)
+    return ORJSONResponse(days, headers=etag_headers(etag))
+
+
+@router.get("/day/{date}/events", response_class=StreamingResponse)
+async def get_day_events(
+    date: str,
+    user_id: str = Depends(get_user_id),
+) -> StreamingResponse:  # type: ignore[name-defined]
+    # No connection dependency: an open stream must not pin a pool connection
+    try:
+        target_date = ensure_valid_date(date)
+    except ValueError as exc:
+        raise ValidationError(str(exc)) from exc
 
-    insight_record = await day_repo.fetch_insight(conn, user_id, target_date)
-    insight = Insight(**dict(insight_record)) if insight_record else None
+    if not get_settings().notifications_enabled:
+        raise ServiceUnavailableError("Live updates are disabled")
+    if not day_event_hub.has_capacity():
+        raise ServiceUnavailableError("Too many live update streams")
 
-    return DayResponse(date=target_date, summary=summary_totals, meals=meals, insight=insight)
+    return StreamingResponse(
+        stream_day_events(day_event_hub, user_id, target_date),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+
+from ..config import get_settings
+from ..dependencies import get_user_id
+from ..errors import ServiceUnavailableError, ValidationError
+from ..services.export import EXPORT_MEDIA_TYPES, ExportFormat, export_has_capacity, stream_export
+from ..services.utils import accepts_encoding, ensure_valid_date
+
+router = APIRouter(tags=["export"])
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_log(
+    format_: ExportFormat = Query("ndjson", alias="format"),
+    date_from: str | None = Query(None, alias="from"),
+    date_to: str | None = Query(None, alias="to"),
+    accept_encoding: str | None = Header(None),
+    user_id: str = Depends(get_user_id),
+) -> StreamingResponse:  # type: ignore[name-defined]
+    # No connection dependency: the body is streamed after the route returns
+    try:
+        start_date = ensure_valid_date(date_from) if date_from else None
+        end_date = ensure_valid_date(date_to) if date_to else None
+    except ValueError as exc:
+        raise ValidationError(str(exc)) from exc
+    if start_date and end_date and start_date > end_date:
+        raise ValidationError("from must not be after to")
+
+    if not export_has_capacity():
+        raise ServiceUnavailableError("Too many exports in progress, try again later")
+
+    compress = accepts_encoding(accept_encoding, "gzip")
+    headers = {
+        "Content-Disposition": f'attachment; filename="foodtracker-export.{format_}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_export(user_id, format_, start_date, end_date, compress, get_settings().export_batch_size),
+        media_type=EXPORT_MEDIA_TYPES[format_],
+        headers=headers,
+    )
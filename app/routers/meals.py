@@ -1,12 +1,19 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+import json
 
-from ..dependencies import get_db_connection, get_user_id
-from ..errors import NotFoundError
+import asyncpg
+from fastapi import APIRouter, Depends, Header
+
+from ..dependencies import get_db_connection, get_read_connection, get_user_id
+from ..errors import ConflictError, NotFoundError
 
 from ..repositories import meals as meals_repo
-from ..schemas.common import MealItem, MealItemRequest, MealItemUpdateRequest, MealRequest
+from ..repositories import versions as versions_repo
+from ..responses import ORJSONResponse
+from ..schemas.common import MealItem, MealItemBatchRequest, MealItemRequest, MealItemUpdateRequest, MealRequest
+from ..services.day_cache import day_cache
+from ..services.etag import etag_headers, etag_matches, make_etag, not_modified
 from ..services.utils import ensure_valid_date
 
 router = APIRouter(prefix="/meals", tags=["meals"])
@@ -15,24 +22,36 @@ router = APIRouter(prefix="/meals", tags=["meals"])
 @router.post("", response_model=dict)
 async def create_meal(request: MealRequest, conn=Depends(get_db_connection), user_id: str = Depends(get_user_id)) -> dict:  # type: ignore[name-defined]
     ensure_valid_date(request.date.isoformat())
-    meal_id = await meals_repo.create_meal(conn, user_id, request.date, request.meal_type.value, request.meal_time)
+    try:
+        meal_id = await meals_repo.create_meal(conn, user_id, request.date, request.meal_type.value, request.meal_time)
+    except asyncpg.UniqueViolationError as exc:
+        # meals_unique_per_type_day: usually a retried create whose response was lost
+        raise ConflictError(f"{request.meal_type.value} already exists for {request.date}") from exc
+    day_cache.invalidate_day(user_id, request.date)
     return {"meal_id": meal_id}
 
 
 @router.get("/{meal_id}")
-async def get_meal(meal_id: str, conn=Depends(get_db_connection), user_id: str = Depends(get_user_id)) -> dict:  # type: ignore[name-defined]
-    meal = await meals_repo.get_meal(conn, user_id, meal_id)
-    if not meal:
+async def get_meal(
+    meal_id: str,
+    if_none_match: str | None = Header(None),
+    conn=Depends(get_read_connection),
+    user_id: str = Depends(get_user_id),
+) -> dict:  # type: ignore[name-defined]
+    version = await versions_repo.fetch_user_version(conn, user_id)
+    etag = make_etag("meal", version, meal_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    record = await meals_repo.get_meal_detail(conn, user_id, meal_id)
+    if not record:
         raise NotFoundError("Meal not found")
 
-    items = await meals_repo.get_meal_items(conn, user_id, meal_id)
-    return {
-        "meal": dict(meal),
-        "items": [
-            MealItem(**{**dict(item), "item_id": str(item["item_id"])})
-            for item in items
-        ],
-    }
+    meal = dict(record)
+    items = meal.pop("items")
+    if isinstance(items, str):
+        items = json.loads(items)
+    return ORJSONResponse({"meal": meal, "items": items}, headers=etag_headers(etag))
 
 
 @router.delete("/{meal_id}")
@@ -40,6 +59,7 @@ async def delete_meal(meal_id: str, conn=Depends(get_db_connection), user_id: st
     deleted = await meals_repo.delete_meal(conn, user_id, meal_id)
     if not deleted:
         raise NotFoundError("Meal not found")
+    day_cache.invalidate_meal(user_id, meal_id)
     return {"status": "ok"}
 
 
@@ -50,11 +70,35 @@ async def create_meal_item(
     conn=Depends(get_db_connection),
     user_id: str = Depends(get_user_id),
 ) -> MealItem:  # type: ignore[name-defined]
-    item_id = await meals_repo.create_meal_item(conn, user_id, meal_id, request.product_id, request.grams, request.added_via)
-    item = await meals_repo.get_meal_item(conn, user_id, item_id)
+    try:
+        item = await meals_repo.create_meal_item(
+            conn, user_id, meal_id, request.product_id, request.grams, request.added_via
+        )
+    except asyncpg.ForeignKeyViolationError as exc:
+        raise NotFoundError("Product not found") from exc
     if not item:
-        raise NotFoundError("Meal item not found after creation")
-    return MealItem(**{**dict(item), "item_id": str(item["item_id"])})
+        raise NotFoundError("Meal not found")
+    day_cache.invalidate_meal(user_id, meal_id)
+    return ORJSONResponse(dict(item))
+
+
+@router.post("/{meal_id}/items/batch", response_model=list[MealItem])
+async def create_meal_items(
+    meal_id: str,
+    request: MealItemBatchRequest,
+    conn=Depends(get_db_connection),
+    user_id: str = Depends(get_user_id),
+) -> list[MealItem]:  # type: ignore[name-defined]
+    rows = [(item.product_id, item.grams, item.added_via) for item in request.items]
+    try:
+        items = await meals_repo.create_meal_items(conn, user_id, meal_id, rows)
+    except asyncpg.ForeignKeyViolationError as exc:
+        raise NotFoundError("Product not found") from exc
+    if not items:
+        raise NotFoundError("Meal not found")
+
+    day_cache.invalidate_meal(user_id, meal_id)
+    return ORJSONResponse([dict(item) for item in items])
 
 
 @router.patch("/{meal_id}/items/{item_id}")
@@ -65,13 +109,11 @@ async def update_meal_item(
     conn=Depends(get_db_connection),
     user_id: str = Depends(get_user_id),
 ) -> MealItem:  # type: ignore[name-defined]
-    updated = await meals_repo.update_meal_item(conn, user_id, meal_id, item_id, request.grams)
-    if not updated:
-        raise NotFoundError("Meal item not found")
-    item = await meals_repo.get_meal_item(conn, user_id, item_id)
+    item = await meals_repo.update_meal_item(conn, user_id, meal_id, item_id, request.grams)
     if not item:
-        raise NotFoundError("Meal item not found after update")
-    return MealItem(**{**dict(item), "item_id": str(item["item_id"])})
+        raise NotFoundError("Meal item not found")
+    day_cache.invalidate_meal(user_id, meal_id)
+    return ORJSONResponse(dict(item))
 
 
 @router.delete("/{meal_id}/items/{item_id}")
@@ -84,4 +126,5 @@ async def delete_meal_item(
     deleted = await meals_repo.delete_meal_item(conn, user_id, meal_id, item_id)
     if not deleted:
         raise NotFoundError("Meal item not found")
+    day_cache.invalidate_meal(user_id, meal_id)
     return {"status": "ok"}
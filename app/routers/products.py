@@ -1,31 +1,72 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, File, UploadFile
+import asyncio
+import tempfile
 
-from ..dependencies import get_db_connection, get_user_id
+import asyncpg
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
+
+from ..config import get_settings
+from ..db import read_router
+from ..dependencies import ReadConnector, get_db_connection, get_read_connector, get_user_id
+from ..errors import NotFoundError, PayloadTooLargeError, ValidationError
 from ..repositories import products as products_repo
-from ..schemas.common import PhotoRecognitionResponse, ProductNutritionUpdate, ProductRequest, ProductSearchResult
+from ..responses import ORJSONResponse
+from ..schemas.common import (
+    PhotoRecognitionResponse,
+    ProductNutritionBatchRequest,
+    ProductNutritionUpdate,
+    ProductRequest,
+    ProductSearchResult,
+    RecognitionJobResponse,
+)
+from ..services import product_search
+from ..services.catalog_import import CatalogFormat, catalog_format, stream_catalog_import
+from ..services.day import invalidate_days_using_products
+from ..services.product_index import product_index
+from ..services.recognition import UploadTooLarge, recognition_jobs, save_uploads
+from ..services.single_flight import read_flights
+from ..services.utils import parse_content_length
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
 @router.get("/search", response_model=list[ProductSearchResult])
-async def search_products(q: str, conn=Depends(get_db_connection)) -> list[ProductSearchResult]:  # type: ignore[name-defined]
-    records = await products_repo.search_products(conn, q)
-    return [
-        ProductSearchResult(
-            product_id=str(record["product_id"]),
-            name=record["name"],
-            brand=record["brand"],
-            nutrition_per_100g={
+async def search_products(
+    q: str,
+    limit: int = Query(25, ge=1, le=100),
+    after: str | None = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    connect: ReadConnector = Depends(get_read_connector),
+    user_id: str = Depends(get_user_id),
+) -> list[ProductSearchResult]:  # type: ignore[name-defined]
+    async def load() -> product_search.SearchPage:
+        async with connect() as conn:
+            return await product_search.search_products(conn, q, limit, after)
+
+    try:
+        key = ("search", connect, read_router.write_generation(user_id), q, limit, after)
+        page = await read_flights.run(key, load)
+    except ValueError as exc:
+        raise ValidationError(str(exc)) from exc
+
+    # Rows are trusted: plain dicts in the ProductSearchResult shape, no model round trip
+    results = [
+        {
+            "product_id": record["product_id"],
+            "name": record["name"],
+            "brand": record["brand"],
+            "nutrition_per_100g": {
                 "calories": record["calories"],
                 "protein": record["protein"],
                 "fat": record["fat"],
                 "carbs": record["carbs"],
             },
-        )
-        for record in records
+        }
+        for record in page.records
     ]
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return ORJSONResponse(results, headers=headers)
 
 
 @router.post("", response_model=dict)
@@ -34,19 +75,51 @@ async def create_product(
     conn=Depends(get_db_connection),
     user_id: str = Depends(get_user_id),
 ) -> dict:  # type: ignore[name-defined]
-    product_id = await products_repo.create_product(conn, request.name, request.brand, user_id)
-    await products_repo.insert_nutrition_event(
+    product_id = await products_repo.create_product(
         conn,
-        product_id,
+        request.name,
+        request.brand,
+        user_id,
         request.nutrition_per_100g.calories,
         request.nutrition_per_100g.protein,
         request.nutrition_per_100g.fat,
         request.nutrition_per_100g.carbs,
-        source="manual",
     )
+    product_index.add(product_id, request.name, request.brand)
+    # A brand-new product is not part of any cached day, nothing to invalidate.
     return {"product_id": product_id}
 
 
+@router.post("/import", response_class=StreamingResponse)
+async def import_products(
+    request: Request,
+    format: CatalogFormat | None = Query(None, description="csv or ndjson; defaults from Content-Type"),
+) -> StreamingResponse:  # type: ignore[name-defined]
+    settings = get_settings()
+    if not settings.catalog_import_enabled:
+        raise NotFoundError("Catalog import is disabled")
+    content_length = parse_content_length(request.headers.get("content-length"))
+    if content_length is not None and content_length > settings.catalog_import_max_bytes:
+        raise PayloadTooLargeError(f"Catalog is larger than {settings.catalog_import_max_bytes} bytes")
+
+    # Spool the body (memory up to 1 MiB, then disk) so the import can run in
+    # one transaction after the upload is complete.
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > settings.catalog_import_max_bytes:
+            spool.close()
+            raise PayloadTooLargeError(f"Catalog is larger than {settings.catalog_import_max_bytes} bytes")
+        spool.write(chunk)
+
+    fmt = format or catalog_format(request.headers.get("content-type"))
+    return StreamingResponse(
+        stream_catalog_import(spool, fmt, settings.catalog_import_batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.patch("/{product_id}/nutrition")
 async def update_product_nutrition(
     product_id: str,
@@ -63,11 +136,80 @@ async def update_product_nutrition(
         request.nutrition_per_100g.carbs,
         source="correction",
     )
+    await invalidate_days_using_products(conn, [product_id])
     return {"status": "ok"}
 
 
-@router.post("/recognize-photo", response_model=PhotoRecognitionResponse)
-async def recognize_photo(files: list[UploadFile] = File(...)) -> PhotoRecognitionResponse:  # type: ignore[name-defined]
-    # Stub implementation per clarification document
-    _ = files  # ensure files are consumed
-    return PhotoRecognitionResponse(status="not_implemented", results=[])
+@router.post("/nutrition/batch")
+async def update_products_nutrition(
+    request: ProductNutritionBatchRequest,
+    conn=Depends(get_db_connection),
+    user_id: str = Depends(get_user_id),
+) -> dict:  # type: ignore[name-defined]
+    events = [
+        (
+            item.product_id,
+            item.nutrition_per_100g.calories,
+            item.nutrition_per_100g.protein,
+            item.nutrition_per_100g.fat,
+            item.nutrition_per_100g.carbs,
+        )
+        for item in request.items
+    ]
+    try:
+        # One INSERT; trg_apply_nutrition_events upserts each product's latest snapshot once
+        count = await products_repo.insert_nutrition_events(conn, events, source=request.source)
+    except asyncpg.ForeignKeyViolationError as exc:
+        raise NotFoundError("Product not found") from exc
+
+    product_ids = list(dict.fromkeys(item.product_id for item in request.items))
+    await invalidate_days_using_products(conn, product_ids)
+    return {"status": "ok", "events": count, "products": len(product_ids)}
+
+
+@router.post("/recognize-photo", response_model=PhotoRecognitionResponse | RecognitionJobResponse)
+async def recognize_photo(
+    files: list[UploadFile] = File(...),
+    user_id: str = Depends(get_user_id),
+) -> PhotoRecognitionResponse | RecognitionJobResponse:  # type: ignore[name-defined]
+    settings = get_settings()
+    if settings.recognition_stub_enabled:
+        # Stub implementation per clarification document
+        _ = files  # ensure files are consumed
+        return PhotoRecognitionResponse(status="not_implemented", results=[])
+
+    if len(files) > settings.recognition_max_files:
+        raise ValidationError(f"At most {settings.recognition_max_files} files per request")
+    for upload in files:
+        if upload.size is not None and upload.size > settings.recognition_max_file_bytes:
+            raise PayloadTooLargeError(f"{upload.filename} is larger than {settings.recognition_max_file_bytes} bytes")
+
+    # The multipart parser already spooled the uploads; move them out of the
+    # request so the job outlives it.
+    try:
+        paths = await save_uploads(files, settings.recognition_max_file_bytes)
+    except UploadTooLarge as exc:
+        raise PayloadTooLargeError(str(exc)) from exc
+
+    job = recognition_jobs.submit(user_id, paths)
+    # Photos seen before finish within the wait: answer right away
+    try:
+        await asyncio.wait_for(asyncio.shield(job.finished.wait()), settings.recognition_sync_wait_seconds)
+    except asyncio.TimeoutError:
+        return ORJSONResponse(
+            job.as_dict(),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/v1/products/recognize-photo/jobs/{job.job_id}"},
+        )
+    return ORJSONResponse(job.as_dict())
+
+
+@router.get("/recognize-photo/jobs/{job_id}", response_model=RecognitionJobResponse)
+async def get_recognition_job(
+    job_id: str,
+    user_id: str = Depends(get_user_id),
+) -> RecognitionJobResponse:  # type: ignore[name-defined]
+    job = recognition_jobs.get(job_id, user_id)
+    if job is None:
+        raise NotFoundError("Recognition job not found")
+    return ORJSONResponse(job.as_dict())
@@ -1,22 +1,36 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 
-from ..dependencies import get_db_connection, get_user_id
+from ..dependencies import get_db_connection, get_read_connection, get_user_id
 from ..errors import InternalError, NotFoundError
 
 from ..repositories import settings as settings_repo
+from ..repositories import versions as versions_repo
+from ..responses import ORJSONResponse
 from ..schemas.common import Settings
+from ..services.day_cache import day_cache
+from ..services.settings_cache import settings_cache
+from ..services.etag import etag_headers, etag_matches, make_etag, not_modified
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
 
 @router.get("", response_model=Settings)
-async def get_settings(conn=Depends(get_db_connection), user_id: str = Depends(get_user_id)) -> Settings:  # type: ignore[name-defined]
+async def get_settings(
+    if_none_match: str | None = Header(None),
+    conn=Depends(get_read_connection),
+    user_id: str = Depends(get_user_id),
+) -> Settings:  # type: ignore[name-defined]
+    version = await versions_repo.fetch_user_version(conn, user_id)
+    etag = make_etag("settings", version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
     record = await settings_repo.get_settings(conn, user_id)
     if not record:
         raise NotFoundError("Settings not found")
-    return Settings(**dict(record))
+    return ORJSONResponse(dict(record), headers=etag_headers(etag))
 
 
 @router.patch("", response_model=dict)
@@ -39,6 +53,10 @@ async def update_settings(
         )
         if not updated:
             raise NotFoundError("Settings not found")
+        # Day status depends on the calorie target. Other workers learn about
+        # the change from the settings NOTIFY.
+        settings_cache.invalidate(user_id)
+        day_cache.invalidate_user(user_id)
         return {"status": "ok"}
     except NotFoundError:
         # Bubble up domain-specific not-found error for unified handling
@@ -1,52 +1,112 @@
 from __future__ import annotations
 
-from datetime import timedelta
+from datetime import date
+from typing import Literal
 
-from fastapi import APIRouter, Depends, Query
+import asyncpg
+from fastapi import APIRouter, Depends, Header, Query
 
-from ..dependencies import get_db_connection, get_user_id
+from ..config import get_settings
+from ..db import read_router
+from ..dependencies import ReadConnector, get_read_connector, get_user_id
 
 from ..errors import ValidationError
-from ..repositories import day as day_repo
 from ..repositories import stats as stats_repo
-from ..schemas.common import Settings, StatsDay, StatsResponse
-from ..services.utils import compute_status
+from ..repositories import versions as versions_repo
+from ..responses import ORJSONResponse
+from ..schemas.common import StatsResponse
+from ..services.etag import etag_headers, etag_matches, make_etag, not_modified
+from ..services.settings_cache import load_settings
+from ..services.single_flight import read_flights
+from ..services.utils import compute_status, resolve_stats_period, resolve_today
 
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 
-_RANGE_MAP = {"7d": 7, "14d": 14, "30d": 30}
-
-
-@router.get("", response_model=StatsResponse)
+@router.get("", response_model=StatsResponse, response_model_exclude_none=True)
 async def get_stats(
-    range_: str = Query(..., alias="range"),
-    conn=Depends(get_db_connection),
+    range_: str | None = Query(None, alias="range"),
+    date_from: str | None = Query(None, alias="from"),
+    date_to: str | None = Query(None, alias="to"),
+    bucket: Literal["day", "week", "month"] = "day",
+    format_: Literal["rows", "columnar"] = Query("rows", alias="format"),
+    today: str | None = Query(None, description="Client's current date (YYYY-MM-DD)"),
+    tz: str | None = Query(None, description="Client's IANA timezone, used when today is not given"),
+    if_none_match: str | None = Header(None),
+    connect: ReadConnector = Depends(get_read_connector),
     user_id: str = Depends(get_user_id),
 ) -> StatsResponse:  # type: ignore[name-defined]
-    if range_ not in _RANGE_MAP:
-        raise ValidationError("range must be one of 7d, 14d, 30d")
-
-    days = _RANGE_MAP[range_]
-
-    end_date = await conn.fetchval("SELECT CURRENT_DATE")
-    start_date = end_date - timedelta(days=days - 1)
-
-    settings_record = await day_repo.fetch_settings(conn, user_id)
-    settings = Settings(**dict(settings_record))
-
-    records = await stats_repo.fetch_stats(conn, user_id, start_date, end_date)
-    items = [
-        StatsDay(
-            date=(record.get("date") or record.get("day_date")),
-            calories=record["calories"],
-            protein=record["protein"],
-            fat=record["fat"],
-            carbs=record["carbs"],
-            status=compute_status(record["calories"], settings),
-        )
-        for record in records
-    ]
-
-    return StatsResponse(range=range_, items=items)
+    try:
+        current_date = resolve_today(today, tz, get_settings().stats_default_timezone)
+        start_date, end_date, label = resolve_stats_period(range_, date_from, date_to, current_date)
+    except ValueError as exc:
+        raise ValidationError(str(exc)) from exc
+
+    async def load() -> tuple[str, dict | None]:
+        async with connect() as conn:
+            # Relative ranges move with "today", so the resolved period is part of the tag
+            version = await versions_repo.fetch_user_version(conn, user_id)
+            etag = make_etag("stats", version, label, start_date, end_date, bucket, format_)
+            if etag_matches(if_none_match, etag):
+                return etag, None
+            return etag, await _load_stats(conn, user_id, label, start_date, end_date, bucket, format_)
+
+    generation = read_router.write_generation(user_id)
+    key = ("stats", connect, generation, label, start_date, end_date, bucket, format_, if_none_match)
+    etag, response = await read_flights.run(key, load)
+    if response is None:
+        return not_modified(etag)
+    return ORJSONResponse(response, headers=etag_headers(etag))
+
+
+async def _load_stats(
+    conn: asyncpg.Connection,
+    user_id: str,
+    label: str,
+    start_date: date,
+    end_date: date,
+    bucket: str,
+    format_: str,
+) -> dict:
+    settings = await load_settings(conn, user_id)
+
+    # Built as plain dicts: None fields are left out like response_model_exclude_none does
+    response: dict = {"range": label, "date_from": start_date, "date_to": end_date, "bucket": bucket}
+
+    if format_ == "columnar":
+        record = await stats_repo.fetch_stats_columns(conn, user_id, start_date, end_date, bucket)
+        columns = {
+            "dates": record["dates"],
+            "calories": record["calories"],
+            "protein": record["protein"],
+            "fat": record["fat"],
+            "carbs": record["carbs"],
+            "status": [compute_status(calories, settings) for calories in record["calories"]],
+        }
+        if bucket != "day":
+            columns["days"] = record["days"]
+        response["items"] = []
+        response["columns"] = columns
+        return response
+
+    if bucket == "day":
+        records = await stats_repo.fetch_stats(conn, user_id, start_date, end_date)
+    else:
+        records = await stats_repo.fetch_stats_buckets(conn, user_id, start_date, end_date, bucket)
+
+    items = []
+    for record in records:
+        item = {
+            "date": record["date"],
+            "calories": record["calories"],
+            "protein": record["protein"],
+            "fat": record["fat"],
+            "carbs": record["carbs"],
+            "status": compute_status(record["calories"], settings),
+        }
+        if bucket != "day":
+            item["days"] = record["days"]
+        items.append(item)
+    response["items"] = items
+    return response
@@ -69,6 +69,17 @@ class StatsDay(BaseModel):
     fat: float
     carbs: float
     status: Literal["under", "ok", "over"]
+    days: int | None = Field(default=None, description="Logged days in a week/month bucket")
+
+
+class StatsColumns(BaseModel):
+    dates: list[date]
+    calories: list[int]
+    protein: list[float]
+    fat: list[float]
+    carbs: list[float]
+    status: list[Literal["under", "ok", "over"]]
+    days: list[int] | None = None
 
 
 class Settings(BaseModel):
@@ -119,6 +130,10 @@ class MealItemRequest(BaseModel):
         return value
 
 
+class MealItemBatchRequest(BaseModel):
+    items: list[MealItemRequest] = Field(..., min_length=1, max_length=100)
+
+
 class MealItemUpdateRequest(BaseModel):
     grams: int
 
@@ -146,11 +161,31 @@ class ProductNutritionUpdate(BaseModel):
     nutrition_per_100g: NutritionTotals
 
 
+class ProductNutritionCorrection(ProductNutritionUpdate):
+    product_id: str
+
+
+class ProductNutritionBatchRequest(BaseModel):
+    source: Literal["correction", "label", "photo"] = "correction"
+    items: list[ProductNutritionCorrection] = Field(..., min_length=1, max_length=10000)
+
+
 class PhotoRecognitionResponse(BaseModel):
     status: Literal["not_implemented"]
     results: list[dict] = Field(default_factory=list)
 
 
+class RecognitionJobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    results: list[dict] = Field(default_factory=list)
+    error: str | None = None
+
+
 class StatsResponse(BaseModel):
-    range: Literal["7d", "14d", "30d"]
-    items: list[StatsDay]
+    range: Literal["7d", "14d", "30d", "90d", "365d", "custom"]
+    date_from: date | None = None
+    date_to: date | None = None
+    bucket: Literal["day", "week", "month"] = "day"
+    items: list[StatsDay] = Field(default_factory=list)
+    columns: StatsColumns | None = None
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import itertools
+import logging
+import uuid
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from typing import IO, Any, Literal
+
+import asyncpg
+import orjson
+
+from ..db import database
+from ..repositories import catalog as catalog_repo
+from ..responses import dumps
+from .day_cache import day_cache
+from .product_index import product_index
+
+logger = logging.getLogger(__name__)
+
+CatalogFormat = Literal["csv", "ndjson"]
+
+IMPORT_SOURCE = "import"
+REQUIRED_COLUMNS = ("name", "calories", "protein", "fat", "carbs")
+# INT and NUMERIC(6,1) in product_nutrition_per_100g
+_MAX_CALORIES = 2**31 - 1
+_MAX_MACRO = 99999.9
+
+
+class CatalogFormatError(ValueError):
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def catalog_format(name: str | None) -> CatalogFormat:
+    """Guess the format from a file name or a Content-Type."""
+    name = (name or "").lower()
+    if "json" in name:
+        return "ndjson"
+    return "csv"
+
+
+def _parse_row(line: int, data: Mapping[str, Any]) -> tuple:
+    name = str(data.get("name") or "").strip()
+    if not name:
+        raise CatalogFormatError(line, "name is required")
+    brand = str(data.get("brand") or "").strip() or None
+
+    product_id = data.get("product_id") or None
+    if product_id is not None:
+        try:
+            product_id = uuid.UUID(str(product_id))
+        except ValueError as exc:
+            raise CatalogFormatError(line, f"invalid product_id {product_id!r}") from exc
+
+    # NDJSON lines may nest nutrition like the body of POST /v1/products
+    nutrition = data.get("nutrition_per_100g") or data
+    try:
+        calories = int(nutrition["calories"])
+        protein, fat, carbs = (round(float(nutrition[key]), 1) for key in ("protein", "fat", "carbs"))
+    except KeyError as exc:
+        raise CatalogFormatError(line, f"{exc.args[0]} is required") from exc
+    except (TypeError, ValueError) as exc:
+        raise CatalogFormatError(line, f"invalid nutrition value: {exc}") from exc
+    if calories < 0 or min(protein, fat, carbs) < 0:
+        raise CatalogFormatError(line, "nutrition values must be non-negative")
+    if calories > _MAX_CALORIES:
+        raise CatalogFormatError(line, f"calories must not exceed {_MAX_CALORIES}")
+    if max(protein, fat, carbs) > _MAX_MACRO:
+        raise CatalogFormatError(line, f"macros must not exceed {_MAX_MACRO}")
+
+    return (line, product_id, name, brand, calories, protein, fat, carbs)
+
+
+def parse_catalog(lines: Iterable[str], fmt: CatalogFormat) -> Iterator[tuple]:
+    """Staging rows from a CSV (with a header) or NDJSON source, one at a time."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise CatalogFormatError(1, f"missing columns: {', '.join(missing)}")
+        for row in reader:
+            yield _parse_row(reader.line_num, row)
+        return
+
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            data = orjson.loads(text)
+        except orjson.JSONDecodeError as exc:
+            raise CatalogFormatError(line, f"invalid JSON: {exc}") from exc
+        if not isinstance(data, dict):
+            raise CatalogFormatError(line, "expected a JSON object")
+        yield _parse_row(line, data)
+
+
+def _take(rows: Iterator[tuple], size: int) -> list[tuple]:
+    return list(itertools.islice(rows, size))
+
+
+async def import_catalog(
+    conn: asyncpg.Connection, rows: Iterator[tuple], batch_size: int = 5000, source: str = IMPORT_SOURCE
+) -> AsyncIterator[dict[str, Any]]:
+    """COPY rows into staging batch by batch, then apply them set-based.
+
+    Yields a progress dict after every batch and a summary at the end. Only
+    one batch is in memory at a time; parsing runs in a thread. Everything
+    happens in one transaction, so a bad line leaves the catalog untouched.
+    """
+    total = 0
+    result = {"created": 0, "renamed": 0, "nutrition_updated": 0}
+    products: list[asyncpg.Record] = []
+    async with conn.transaction():
+        await catalog_repo.create_import_staging(conn)
+        while batch := await asyncio.to_thread(_take, rows, batch_size):
+            await catalog_repo.copy_import_rows(conn, batch)
+            total += len(batch)
+            yield {"status": "loading", "rows": total}
+        if total:
+            result, products = await catalog_repo.apply_import(conn, source)
+    # Refreshes only see new products by created_at; renames would keep their
+    # old names in the index until the next rebuild
+    for record in products:
+        product_index.add(str(record["product_id"]), record["name"], record["brand"])
+    if result["nutrition_updated"]:
+        # Other workers see the new user_versions; drop what this one holds
+        day_cache.clear()
+    yield {"status": "done", "rows": total, **result}
+
+
+async def stream_catalog_import(source: IO[bytes], fmt: CatalogFormat, batch_size: int) -> AsyncIterator[bytes]:
+    """NDJSON progress for POST /v1/products/import. Takes a connection of its
+    own: the request's dependencies are closed before a streamed body runs."""
+    try:
+        source.seek(0)
+        lines = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+        rows = parse_catalog(lines, fmt)
+        async with database.connection() as conn:
+            async for progress in import_catalog(conn, rows, batch_size):
+                yield dumps(progress) + b"\n"
+    except (CatalogFormatError, UnicodeDecodeError) as exc:
+        yield dumps({"status": "failed", "error": str(exc)}) + b"\n"
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+        # InterfaceError covers values asyncpg refuses to encode (DataError)
+        logger.warning("Catalog import failed: %s", exc)
+        yield dumps({"status": "failed", "error": f"{exc.__class__.__name__}: {exc}"}) + b"\n"
+    finally:
+        source.close()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping
+from datetime import date, time
+
+import asyncpg
+
+from ..config import get_settings
+from ..repositories import day as day_repo
+from ..schemas.common import DayResponse, Insight, MealSummary, Settings, Summary
+from .day_cache import day_cache
+from .settings_cache import load_settings, settings_cache
+from .utils import compute_status
+
+_SETTINGS_FIELDS = ("calorie_target", "calorie_tolerance", "macro_mode", "protein_target", "fat_target", "carbs_target")
+
+
+async def load_day(conn: asyncpg.Connection, user_id: str, target_date: date) -> DayResponse:
+    if get_settings().day_composite_query_enabled:
+        return await load_day_composite(conn, user_id, target_date)
+    return await load_day_multi(conn, user_id, target_date)
+
+
+async def load_day_cached(
+    conn: asyncpg.Connection, user_id: str, target_date: date, version: int | None = None
+) -> DayResponse:
+    cached = day_cache.get(user_id, target_date, version)
+    if cached is not None:
+        return cached
+
+    token = day_cache.begin()
+    day = await load_day(conn, user_id, target_date)
+    day_cache.put(user_id, target_date, day, token, version)
+    return day
+
+
+async def invalidate_days_using_products(conn: asyncpg.Connection, product_ids: list[str]) -> None:
+    # Bump the epoch first so loads racing with the correction are not stored,
+    # then probe only the days that are actually cached.
+    day_cache.invalidate_days(())
+    keys = day_cache.keys()
+    if not keys:
+        return
+    records = await day_repo.fetch_days_using_products(
+        conn, product_ids, [user_id for user_id, _ in keys], [day for _, day in keys]
+    )
+    day_cache.invalidate_days((record["user_id"], record["day_date"]) for record in records)
+
+
+async def load_day_composite(conn: asyncpg.Connection, user_id: str, target_date: date) -> DayResponse:
+    token = settings_cache.begin()
+    record = await day_repo.fetch_day(conn, user_id, target_date)
+    # Rows coming from the database were validated on the way in
+    settings = Settings.model_construct(**{field: record[field] for field in _SETTINGS_FIELDS})
+    # The settings come with the day for free; keep them for the stats path
+    settings_cache.put(user_id, settings, token)
+    return _day_from_record(target_date, record, settings)
+
+
+async def load_days(
+    conn: asyncpg.Connection, user_id: str, start_date: date, end_date: date, version: int | None = None
+) -> list[DayResponse]:
+    settings = await load_settings(conn, user_id)
+    token = day_cache.begin()
+    records = await day_repo.fetch_days(conn, user_id, start_date, end_date)
+    days = [_day_from_record(record["day_date"], record, settings) for record in records]
+    # Opening a day from the week view is then a cache hit
+    for day in days:
+        day_cache.put(user_id, day.date, day, token, version)
+    return days
+
+
+def _day_from_record(target_date: date, record: Mapping, settings: Settings) -> DayResponse:
+    summary = Summary.model_construct(
+        calories=record["calories"],
+        protein=record["protein"],
+        fat=record["fat"],
+        carbs=record["carbs"],
+        status=compute_status(record["calories"], settings),
+    )
+
+    meals_payload = record["meals"]
+    if isinstance(meals_payload, str):
+        meals_payload = json.loads(meals_payload)
+    # json_build_object renders meal_time as text
+    meals = [MealSummary.model_construct(**{**meal, "meal_time": time.fromisoformat(meal["meal_time"])}) for meal in meals_payload]
+
+    insight = None
+    if record["insight_text"] is not None:
+        insight = Insight.model_construct(text=record["insight_text"], severity=record["insight_severity"])
+
+    return DayResponse.model_construct(date=target_date, summary=summary, meals=meals, insight=insight)
+
+
+async def load_day_multi(conn: asyncpg.Connection, user_id: str, target_date: date) -> DayResponse:
+    settings = await load_settings(conn, user_id)
+
+    totals_record = await day_repo.fetch_day_totals(conn, user_id, target_date)
+    if totals_record:
+        summary_totals = Summary.model_construct(**totals_record, status="ok")
+    else:
+        summary_totals = Summary.model_construct(calories=0, protein=0.0, fat=0.0, carbs=0.0, status="ok")
+
+    summary_totals.status = compute_status(summary_totals.calories, settings)
+
+    meal_records = await day_repo.fetch_meal_totals(conn, user_id, target_date)
+    meals: list[MealSummary] = []
+    for record in meal_records:
+        data = dict(record)
+        if "meal_id" in data:
+            data["meal_id"] = str(data["meal_id"])
+        meals.append(MealSummary.model_construct(**data))
+
+    insight_record = await day_repo.fetch_insight(conn, user_id, target_date)
+    insight = Insight.model_construct(**insight_record) if insight_record else None
+
+    return DayResponse.model_construct(date=target_date, summary=summary_totals, meals=meals, insight=insight)
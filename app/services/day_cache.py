@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date
+
+from ..config import get_settings
+from ..schemas.common import DayResponse
+
+DayKey = tuple[str, date]
+
+
+@dataclass
+class _Entry:
+    value: DayResponse
+    meal_ids: tuple[str, ...]
+    expires_at: float | None
+    version: int | None
+
+
+class DayCache:
+    """In-process LRU of DayResponse keyed by (user_id, date).
+
+    Invalidation happens from the write routes of this process. Every
+    invalidation bumps an epoch so that a load which raced with a write
+    (started before it, finished after it) is not stored. Entries stored with
+    the user's version (see services/etag.py) are also dropped as soon as a
+    caller sees a different version, which covers writes made by other workers.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float | None = None, enabled: bool = True) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and max_size > 0
+        self._entries: OrderedDict[DayKey, _Entry] = OrderedDict()
+        self._by_meal: dict[str, DayKey] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str, day: date, version: int | None = None) -> DayResponse | None:
+        if not self.enabled:
+            return None
+        key = (user_id, day)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stale = version is not None and entry.version is not None and entry.version != version
+        if stale or (entry.expires_at is not None and entry.expires_at <= time.monotonic()):
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def begin(self) -> int:
+        return self._epoch
+
+    def put(self, user_id: str, day: date, value: DayResponse, token: int, version: int | None = None) -> None:
+        if not self.enabled or token != self._epoch:
+            return
+        key = (user_id, day)
+        self._remove(key)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        meal_ids = tuple(meal.meal_id for meal in value.meals)
+        self._entries[key] = _Entry(value=value, meal_ids=meal_ids, expires_at=expires_at, version=version)
+        for meal_id in meal_ids:
+            self._by_meal[meal_id] = key
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def keys(self) -> list[DayKey]:
+        return list(self._entries)
+
+    def invalidate_day(self, user_id: str, day: date) -> None:
+        self._epoch += 1
+        if self._remove((user_id, day)):
+            self.invalidations += 1
+
+    def invalidate_days(self, keys: Iterable[DayKey]) -> None:
+        self._epoch += 1
+        for key in keys:
+            if self._remove(key):
+                self.invalidations += 1
+
+    def invalidate_meal(self, user_id: str, meal_id: str) -> None:
+        self._epoch += 1
+        key = self._by_meal.get(meal_id)
+        if key is not None and key[0] == user_id and self._remove(key):
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        self.invalidate_days([key for key in self._entries if key[0] == user_id])
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+        self._by_meal.clear()
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: DayKey) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for meal_id in entry.meal_ids:
+            if self._by_meal.get(meal_id) == key:
+                del self._by_meal[meal_id]
+        return True
+
+
+def _build_day_cache() -> DayCache:
+    settings = get_settings()
+    return DayCache(
+        max_size=settings.day_cache_max_size,
+        ttl_seconds=settings.day_cache_ttl_seconds,
+        enabled=settings.day_cache_enabled,
+    )
+
+
+day_cache = _build_day_cache()
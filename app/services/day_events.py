@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import date
+from typing import Any
+
+from ..config import get_settings
+from ..db import database, read_router
+from ..metrics import DAY_EVENT_SUBSCRIBERS
+from ..responses import dumps
+from ..schemas.common import DayResponse
+from .day import load_day
+
+logger = logging.getLogger(__name__)
+
+DayKey = tuple[str, date]
+
+# Sent before the first event: how long a client waits before reconnecting.
+RETRY_MILLISECONDS = 5000
+
+
+class DaySubscription:
+    """One open event stream. Holds at most the latest undelivered day, so a
+    slow client never queues more than one snapshot however many writes land."""
+
+    __slots__ = ("key", "_latest", "_ready")
+
+    def __init__(self, key: DayKey) -> None:
+        self.key = key
+        self._latest: DayResponse | None = None
+        self._ready = asyncio.Event()
+
+    def push(self, day: DayResponse) -> None:
+        self._latest = day
+        self._ready.set()
+
+    async def next(self, timeout: float) -> DayResponse | None:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        day, self._latest = self._latest, None
+        return day
+
+
+async def _load_from_primary(user_id: str, day: date) -> DayResponse:
+    # The NOTIFY arrives on commit; a replica may not have replayed it yet.
+    async with database.connection() as conn:
+        return await load_day(conn, user_id, day)
+
+
+class DayEventHub:
+    """Fans day changes out to the open streams of this process.
+
+    Streams hold no database connection while idle. A notification for a
+    (user, date) somebody is watching triggers one load, shared by every
+    stream on that day; notifications arriving during the load are folded
+    into a single reload.
+    """
+
+    def __init__(
+        self,
+        max_subscribers: int = 10000,
+        loader: Callable[[str, date], Awaitable[DayResponse]] = _load_from_primary,
+    ) -> None:
+        self.max_subscribers = max_subscribers
+        self._loader = loader
+        self._subscribers: dict[DayKey, set[DaySubscription]] = {}
+        self._refreshing: dict[DayKey, asyncio.Task] = {}
+        self._dirty: set[DayKey] = set()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def has_capacity(self) -> bool:
+        return self._count < self.max_subscribers
+
+    def subscribe(self, user_id: str, day: date) -> DaySubscription | None:
+        if not self.has_capacity():
+            return None
+        subscription = DaySubscription((user_id, day))
+        self._subscribers.setdefault(subscription.key, set()).add(subscription)
+        self._count += 1
+        DAY_EVENT_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: DaySubscription) -> None:
+        subscribers = self._subscribers.get(subscription.key)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.key]
+        self._count -= 1
+        DAY_EVENT_SUBSCRIBERS.dec()
+
+    def notify(self, payload: str) -> None:
+        # Payload is "<user_id> <date>" (sql_templates/15_day_notify.sql)
+        try:
+            user_id, raw_date = payload.split(" ", 1)
+            key = (user_id, date.fromisoformat(raw_date))
+        except ValueError:
+            logger.warning("Ignoring malformed day notification: %r", payload)
+            return
+        if key in self._subscribers:
+            self._schedule(key)
+
+    def reset(self) -> None:
+        # Changes made while the listener was away were never announced
+        for key in list(self._subscribers):
+            self._schedule(key)
+
+    async def stop(self) -> None:
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _schedule(self, key: DayKey) -> None:
+        if key in self._refreshing:
+            self._dirty.add(key)
+            return
+        self._refreshing[key] = asyncio.create_task(self._refresh(key))
+
+    async def _refresh(self, key: DayKey) -> None:
+        try:
+            while key in self._subscribers:
+                self._dirty.discard(key)
+                try:
+                    day = await self._loader(*key)
+                except Exception as exc:
+                    logger.warning("Could not load day %s for live updates: %s", key[1], exc)
+                    return
+                for subscription in self._subscribers.get(key, ()):
+                    subscription.push(day)
+                if key not in self._dirty:
+                    return
+        finally:
+            self._refreshing.pop(key, None)
+            self._dirty.discard(key)
+
+
+def day_changes(previous: DayResponse | None, current: DayResponse) -> list[tuple[str, Any]]:
+    """Events that turn ``previous`` into ``current``: the whole day first,
+    then only the summary, the meals that were added/changed/removed and the
+    insight when they differ."""
+    if previous is None:
+        return [("day", current)]
+
+    events: list[tuple[str, Any]] = []
+    if vars(previous.summary) != vars(current.summary):
+        events.append(("summary", current.summary))
+
+    before = {meal.meal_id: vars(meal) for meal in previous.meals}
+    after = {meal.meal_id for meal in current.meals}
+    upserted = [meal for meal in current.meals if before.get(meal.meal_id) != vars(meal)]
+    removed = [meal_id for meal_id in before if meal_id not in after]
+    if upserted or removed:
+        events.append(("meals", {"upserted": upserted, "removed": removed}))
+
+    previous_insight = vars(previous.insight) if previous.insight is not None else None
+    current_insight = vars(current.insight) if current.insight is not None else None
+    if previous_insight != current_insight:
+        events.append(("insight", current.insight))
+    return events
+
+
+def format_event(event: str, data: Any) -> bytes:
+    # orjson never emits newlines, so the payload always fits one data: line
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def stream_day_events(hub: DayEventHub, user_id: str, day: date) -> AsyncIterator[bytes]:
+    # Subscribe before the first load so a write landing in between is not missed
+    subscription = hub.subscribe(user_id, day)
+    if subscription is None:
+        return
+    heartbeat = get_settings().day_events_heartbeat_seconds
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n".encode()
+        async with read_router.connection(user_id) as conn:
+            current = await load_day(conn, user_id, day)
+
+        previous = None
+        while True:
+            for event, data in day_changes(previous, current):
+                yield format_event(event, data)
+            previous = current
+            # Comments keep proxies from closing the stream and surface dead clients
+            while (update := await subscription.next(heartbeat)) is None:
+                yield b": ping\n\n"
+            current = update
+    finally:
+        hub.unsubscribe(subscription)
+
+
+day_event_hub = DayEventHub(get_settings().day_events_max_subscribers)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import hashlib
+
+from fastapi import Response
+
+# Bump when the shape of a cached representation changes, so that clients
+# holding ETags from the previous deploy refetch.
+ETAG_FORMAT = 1
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(kind: str, version: int, *parts: object) -> str:
+    key = "|".join(str(part) for part in (ETAG_FORMAT, kind, version, *parts))
+    return f'"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
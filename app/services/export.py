@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import zlib
+from collections.abc import AsyncIterator, Callable, Mapping
+from datetime import date
+from typing import Any, Literal
+
+from ..config import get_settings
+from ..db import read_router
+from ..repositories import export as export_repo
+from ..responses import dumps
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_COLUMNS = (
+    "meal_date",
+    "meal_type",
+    "meal_time",
+    "meal_id",
+    "item_id",
+    "product_id",
+    "name",
+    "brand",
+    "grams",
+    "added_via",
+    "calories",
+    "protein",
+    "fat",
+    "carbs",
+)
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Rows are sent in chunks of about this size (before compression)
+_CHUNK_BYTES = 64 * 1024
+
+# Every running export holds a pool connection for its whole duration
+_export_slots = asyncio.Semaphore(get_settings().export_max_concurrent)
+
+
+def export_has_capacity() -> bool:
+    return not _export_slots.locked()
+
+
+def row_encoder(fmt: ExportFormat) -> Callable[[Mapping[str, Any]], bytes]:
+    if fmt == "ndjson":
+        return lambda record: dumps({column: record[column] for column in EXPORT_COLUMNS}) + b"\n"
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def encode(record: Mapping[str, Any]) -> bytes:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(["" if record[column] is None else record[column] for column in EXPORT_COLUMNS])
+        return buffer.getvalue().encode()
+
+    return encode
+
+
+async def stream_export(
+    user_id: str,
+    fmt: ExportFormat,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    compress: bool = False,
+    batch_size: int = 1000,
+) -> AsyncIterator[bytes]:
+    """The user's meals and items, chunk by chunk.
+
+    Runs after the route has returned, so it takes its own connection. The
+    server pulls the next chunk only once the previous one was sent: a slow
+    client slows the cursor down instead of filling memory.
+    """
+    encode = row_encoder(fmt)
+    # wbits=31: gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor is not None else data
+
+    async with _export_slots:
+        parts: list[bytes] = []
+        size = 0
+        if fmt == "csv":
+            parts.append(",".join(EXPORT_COLUMNS).encode() + b"\n")
+        async with read_router.connection(user_id) as conn:
+            async for record in export_repo.iter_export_rows(conn, user_id, date_from, date_to, batch_size):
+                row = encode(record)
+                parts.append(row)
+                size += len(row)
+                if size >= _CHUNK_BYTES:
+                    chunk = emit(b"".join(parts))
+                    parts, size = [], 0
+                    # A compressor may hold small inputs back; nothing to send yet
+                    if chunk:
+                        yield chunk
+        tail = emit(b"".join(parts))
+        if compressor is not None:
+            tail += compressor.flush()
+        if tail:
+            yield tail
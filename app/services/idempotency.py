@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import asyncpg
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import get_settings
+from ..db import database
+from ..dependencies import get_user_id
+from ..errors import BadRequestError, ConflictError, GatewayError, ValidationError
+from ..metrics import IDEMPOTENCY_REQUESTS
+from ..repositories import idempotency as idempotency_repo
+from .utils import parse_content_length
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+# Answers the client is expected to retry are not remembered
+_RETRYABLE_STATUSES = frozenset({409, 425, 429})
+_STORE_ERRORS = (asyncpg.PostgresError, OSError, asyncio.TimeoutError)
+
+IdempotencyKey = tuple[str, str]
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+@dataclass
+class _Entry:
+    value: StoredResponse
+    expires_at: float
+
+
+class IdempotencyCache:
+    """In-process LRU of finished responses keyed by (user_id, Idempotency-Key)."""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 86400.0) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[IdempotencyKey, _Entry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: IdempotencyKey) -> StoredResponse | None:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def put(self, key: IdempotencyKey, value: StoredResponse) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = _Entry(value=value, expires_at=time.monotonic() + self.ttl_seconds)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+class PostgresIdempotencyStore:
+    """Keys shared by all workers. A claimed row without a status means the
+    request is still running somewhere, for at most ``lease_seconds``: after
+    that a retry takes the claim over. Expired rows are purged now and then
+    and can be claimed again."""
+
+    def __init__(self, ttl_seconds: float = 86400.0, lease_seconds: float = 30.0, purge_interval: float = 300.0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+
+    async def claim(self, user_id: str, key: str, fingerprint: str) -> asyncpg.Record | None:
+        """None when the key is ours now, otherwise the row holding it."""
+        async with database.connection() as conn:
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.purge_interval
+                await idempotency_repo.purge_expired_keys(conn)
+            if await idempotency_repo.claim_key(conn, user_id, key, fingerprint, self.ttl_seconds, self.lease_seconds):
+                return None
+            return await idempotency_repo.fetch_key(conn, user_id, key)
+
+    async def complete(self, user_id: str, key: str, response: StoredResponse) -> None:
+        # The jsonb codec (db.init_connection) encodes the list itself
+        headers = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers]
+        async with database.connection() as conn:
+            await idempotency_repo.complete_key(conn, user_id, key, response.status, headers, response.body)
+
+    async def release(self, user_id: str, key: str) -> None:
+        async with database.connection() as conn:
+            await idempotency_repo.release_key(conn, user_id, key)
+
+
+def stored_from_record(record: asyncpg.Record) -> StoredResponse:
+    return StoredResponse(
+        fingerprint=record["fingerprint"],
+        status=record["status"],
+        headers=[(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]],
+        body=bytes(record["body"]),
+    )
+
+
+def request_fingerprint(scope: Scope, body: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(scope["method"].encode())
+    digest.update(b" ")
+    digest.update(scope["path"].encode())
+    digest.update(b"?")
+    digest.update(scope.get("query_string", b""))
+    digest.update(b"\n")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """Idempotency-Key for mutating requests.
+
+    A retry with the same key gets the first response back without reaching
+    the route; retries arriving while the first request still runs in this
+    process wait for it. With a Postgres store the key is also claimed in the
+    database, so a retry that lands on another worker is replayed too (or
+    answered 409 while the first one is running). 5xx, 409 and 429 answers are
+    not remembered: the client is meant to retry those. A key reused with a
+    different method, path, query string or body is rejected with 422.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: IdempotencyCache,
+        store: PostgresIdempotencyStore | None = None,
+        max_bytes: int = 1024 * 1024,
+    ) -> None:
+        self.app = app
+        self.cache = cache
+        self.store = store
+        self.max_bytes = max_bytes
+        self._in_flight: dict[IdempotencyKey, asyncio.Future[None]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        raw_key = headers.get(IDEMPOTENCY_HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _reject(ValidationError(f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"), scope, receive, send)
+            return
+        try:
+            content_length = parse_content_length(headers.get(b"content-length"))
+        except BadRequestError as exc:
+            await _reject(exc, scope, receive, send)
+            return
+        if content_length is not None and content_length > self.max_bytes:
+            IDEMPOTENCY_REQUESTS.labels("uncached").inc()
+            await self.app(scope, receive, send)
+            return
+
+        # A chunked body has no Content-Length: stop at max_bytes and hand
+        # the route what was read followed by the rest of the stream
+        body, complete = await _read_body(receive, self.max_bytes)
+        receive = _replay_body(body, receive, more_body=not complete)
+        if not complete:
+            IDEMPOTENCY_REQUESTS.labels("uncached").inc()
+            await self.app(scope, receive, send)
+            return
+        user_id = await get_user_id()
+        fingerprint = request_fingerprint(scope, body)
+        await self._handle(scope, receive, send, (user_id, key), fingerprint)
+
+    async def _handle(
+        self, scope: Scope, receive: Receive, send: Send, scope_key: IdempotencyKey, fingerprint: str
+    ) -> None:
+        waited = False
+        while True:
+            stored = self.cache.get(scope_key)
+            if stored is not None:
+                await self._replay(stored, fingerprint, "coalesced" if waited else "replayed", scope, receive, send)
+                return
+            pending = self._in_flight.get(scope_key)
+            if pending is None:
+                break
+            waited = True
+            # The leader's cancellation must not cancel the waiters
+            await asyncio.shield(pending)
+
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[scope_key] = done
+        try:
+            await self._execute(scope, receive, send, scope_key, fingerprint)
+        finally:
+            del self._in_flight[scope_key]
+            done.set_result(None)
+
+    async def _execute(
+        self, scope: Scope, receive: Receive, send: Send, scope_key: IdempotencyKey, fingerprint: str
+    ) -> None:
+        user_id, key = scope_key
+        claimed = False
+        if self.store is not None:
+            try:
+                record = await self.store.claim(user_id, key, fingerprint)
+            except _STORE_ERRORS as exc:
+                # Deduplication within this process still works
+                logger.warning("Idempotency store unavailable: %s", exc)
+            else:
+                if record is not None:
+                    if record["fingerprint"] != fingerprint:
+                        IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+                        await _reject(_mismatch_error(), scope, receive, send)
+                    elif record["status"] is None:
+                        IDEMPOTENCY_REQUESTS.labels("in_progress").inc()
+                        await _reject(
+                            ConflictError("A request with this Idempotency-Key is still in progress"), scope, receive, send
+                        )
+                    else:
+                        stored = stored_from_record(record)
+                        self.cache.put(scope_key, stored)
+                        await self._replay(stored, fingerprint, "replayed", scope, receive, send)
+                    return
+                claimed = True
+
+        status = 500
+        headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+        size = 0
+        complete = False
+
+        async def capture(message: Message) -> None:
+            nonlocal status, headers, size, complete
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= self.max_bytes:
+                    chunks.append(body)
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            if complete and size <= self.max_bytes and 200 <= status < 500 and status not in _RETRYABLE_STATUSES:
+                stored = StoredResponse(fingerprint=fingerprint, status=status, headers=headers, body=b"".join(chunks))
+                self.cache.put(scope_key, stored)
+                IDEMPOTENCY_REQUESTS.labels("executed").inc()
+            else:
+                IDEMPOTENCY_REQUESTS.labels("uncached").inc()
+            if claimed:
+                await self._finish_claim(user_id, key, stored)
+
+    async def _finish_claim(self, user_id: str, key: str, stored: StoredResponse | None) -> None:
+        try:
+            if stored is not None:
+                await self.store.complete(user_id, key, stored)
+            else:
+                await self.store.release(user_id, key)
+        except _STORE_ERRORS as exc:
+            logger.warning("Idempotency store unavailable: %s", exc)
+
+    async def _replay(
+        self, stored: StoredResponse, fingerprint: str, outcome: str, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if stored.fingerprint != fingerprint:
+            IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+            await _reject(_mismatch_error(), scope, receive, send)
+            return
+        IDEMPOTENCY_REQUESTS.labels(outcome).inc()
+        await send({"type": "http.response.start", "status": stored.status, "headers": [*stored.headers, REPLAYED_HEADER]})
+        await send({"type": "http.response.body", "body": stored.body})
+
+
+def _mismatch_error() -> GatewayError:
+    return ValidationError("Idempotency-Key was already used for a different request")
+
+
+async def _reject(exc: GatewayError, scope: Scope, receive: Receive, send: Send) -> None:
+    response = JSONResponse(status_code=exc.status_code, content=exc.detail)
+    await response(scope, receive, send)
+
+
+async def _read_body(receive: Receive, max_bytes: int) -> tuple[bytes, bool]:
+    """The body and whether it was read to the end within ``max_bytes``."""
+    chunks: list[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if not message.get("more_body", False):
+            break
+        if size > max_bytes:
+            return b"".join(chunks), False
+    return b"".join(chunks), True
+
+
+def _replay_body(body: bytes, receive: Receive, more_body: bool = False) -> Receive:
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": more_body}
+
+    return replay
+
+
+def _build_idempotency() -> tuple[IdempotencyCache, PostgresIdempotencyStore | None]:
+    settings = get_settings()
+    cache = IdempotencyCache(max_size=settings.idempotency_max_size, ttl_seconds=settings.idempotency_ttl_seconds)
+    store = None
+    if settings.idempotency_store == "postgres":
+        lease_seconds = settings.idempotency_lease_seconds or 3 * settings.db_command_timeout
+        store = PostgresIdempotencyStore(settings.idempotency_ttl_seconds, lease_seconds)
+    return cache, store
+
+
+idempotency_cache, idempotency_store = _build_idempotency()
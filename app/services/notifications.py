@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+
+import asyncpg
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_CHANNEL = "foodtracker_settings"
+DAY_CHANNEL = "foodtracker_day"
+
+_RECONNECT_MIN_SECONDS = 1.0
+_RECONNECT_MAX_SECONDS = 30.0
+# A half-open TCP connection never reports termination; a ping does.
+_KEEPALIVE_SECONDS = 30.0
+
+
+class NotificationListener:
+    """One dedicated connection per process that LISTENs on Postgres channels.
+
+    LISTEN needs a session of its own, so this connection is opened outside
+    the pool (and must not go through a transaction-mode pooler). After every
+    (re)connect the reset handlers run: notifications sent while the listener
+    was away are lost, so whatever they would have invalidated must be dropped.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+        self._reset_handlers: list[Callable[[], None]] = []
+        self._task: asyncio.Task | None = None
+        self.connected = False
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        self._handlers[channel].append(handler)
+
+    def on_reset(self, handler: Callable[[], None]) -> None:
+        self._reset_handlers.append(handler)
+
+    async def start(self) -> None:
+        if not get_settings().notifications_enabled or self._task is not None or not self._handlers:
+            return
+        self._task = asyncio.create_task(self._run(), name="notification-listener")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def dispatch(self, channel: str, payload: str) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("Notification handler for %s failed", channel)
+
+    def reset(self) -> None:
+        for handler in self._reset_handlers:
+            handler()
+
+    def _on_notification(self, conn: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        self.dispatch(channel, payload)
+
+    async def _run(self) -> None:
+        delay = _RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                self.connected = False
+                raise
+            except Exception as exc:
+                if self.connected:
+                    # It was up, so this is a fresh outage: start the backoff over
+                    delay = _RECONNECT_MIN_SECONDS
+                logger.warning("Notification listener disconnected: %s; retrying in %.0fs", exc, delay)
+            self.connected = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RECONNECT_MAX_SECONDS)
+
+    async def _listen(self) -> None:
+        settings = get_settings()
+        conn = await asyncpg.connect(settings.database_listen_url or settings.database_url, statement_cache_size=0)
+        try:
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _: lost.set())
+            for channel in self._handlers:
+                await conn.add_listener(channel, self._on_notification)
+            self.connected = True
+            self.reset()
+            logger.info("Listening on %s", ", ".join(self._handlers))
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), _KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    await conn.fetchval("SELECT 1", timeout=5)
+            raise ConnectionError("listener connection closed")
+        finally:
+            if not conn.is_closed():
+                await conn.close(timeout=5)
+
+
+notification_listener = NotificationListener()
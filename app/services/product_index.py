@@ -0,0 +1,459 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import uuid
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from ..config import get_settings
+from ..db import database
+from ..repositories import products as products_repo
+
+logger = logging.getLogger(__name__)
+
+# Snapshot layout (native byte order, every section 8-byte aligned):
+#   header | ids (16 bytes each) | text offsets (uint32, n+1) | text blob
+#   | keys (uint64, sorted) | key offsets (uint32, k+1) | postings (uint32)
+# Postings hold product positions in ascending order. Products are stored by
+# (normalized name length, name, id), the ranking's tie-break, so a search can
+# stop as soon as no later position can beat the hits it holds.
+_MAGIC = b"FTPIDX02"
+_HEADER = struct.Struct("=8sdQQQQ")
+_FIELD_SEP = "\x1f"
+_PREFIX_MARK = "\x01"
+# Re-read a window of already seen products so that rows committed late
+# (created_at is the transaction start) are not missed; duplicates are merged.
+_REFRESH_OVERLAP_SECONDS = 300.0
+
+
+def normalize(text: str | None) -> str:
+    if not text:
+        return ""
+    return " ".join(text.casefold().replace("ё", "е").split())
+
+
+def _encode_key(gram: str) -> int:
+    return (ord(gram[0]) << 42) | (ord(gram[1]) << 21) | ord(gram[2])
+
+
+def _document_keys(name: str, brand: str) -> set[int]:
+    text = f"{name} {brand}" if brand else name
+    keys = {_encode_key(text[i : i + 3]) for i in range(len(text) - 2)}
+    # Word prefixes of 1-2 characters, for queries too short for trigrams
+    for word in text.split():
+        keys.add(_encode_key(_PREFIX_MARK * 2 + word[0]))
+        if len(word) > 1:
+            keys.add(_encode_key(_PREFIX_MARK + word[:2]))
+    return keys
+
+
+def _token_keys(token: str) -> list[int]:
+    if len(token) >= 3:
+        return list({_encode_key(token[i : i + 3]) for i in range(len(token) - 2)})
+    return [_encode_key(_PREFIX_MARK * (3 - len(token)) + token)]
+
+
+def _score_token(token: str, name: str, brand: str) -> int | None:
+    if name == token:
+        return 0
+    if name.startswith(token):
+        return 1
+    if f" {token}" in f" {name}":
+        return 2
+    if token in name:
+        return 3
+    if brand:
+        if brand.startswith(token) or f" {token}" in f" {brand}":
+            return 4
+        if token in brand:
+            return 5
+    return None
+
+
+def _rank(tokens: list[str], name: str, brand: str) -> int | None:
+    total = 0
+    for token in tokens:
+        score = _score_token(token, name, brand)
+        if score is None:
+            return None
+        total += score
+    return total
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    product_id: str
+    score: int
+    name: str
+
+    @property
+    def sort_key(self) -> tuple[int, int, str, str]:
+        return (self.score, len(self.name), self.name, self.product_id)
+
+
+class ProductSearchIndex:
+    def __init__(
+        self,
+        ids: bytes | memoryview,
+        text_offsets: Sequence[int],
+        text: bytes | memoryview,
+        keys: Sequence[int],
+        key_offsets: Sequence[int],
+        postings: Sequence[int],
+        watermark: float,
+        backing: mmap.mmap | None = None,
+    ) -> None:
+        self._ids = ids
+        self._text_offsets = text_offsets
+        self._text = text
+        self._keys = keys
+        self._key_offsets = key_offsets
+        self._postings = postings
+        self.watermark = watermark
+        self._backing = backing
+        # product_id -> (name, brand, normalized name, normalized brand)
+        self._delta: dict[str, tuple[str, str, str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._text_offsets) - 1 + len(self._delta)
+
+    @property
+    def delta_size(self) -> int:
+        return len(self._delta)
+
+    def add(self, product_id: str, name: str, brand: str | None) -> None:
+        self._delta[product_id] = (name, brand or "", normalize(name), normalize(brand))
+
+    def delta(self) -> dict[str, tuple[str, str, str, str]]:
+        return dict(self._delta)
+
+    def compacted(self, delta: dict[str, tuple[str, str, str, str]], watermark: float) -> ProductSearchIndex:
+        """A new snapshot with ``delta`` folded in. CPU bound: run it off the event loop."""
+        builder = ProductIndexBuilder()
+        for position in range(len(self._text_offsets) - 1):
+            product_id = self._product_id(position)
+            if product_id not in delta:
+                name, brand = self._record(position)[:2]
+                builder.add(product_id, name, brand)
+        for product_id, (name, brand, _, _) in delta.items():
+            builder.add(product_id, name, brand)
+        builder.watermark = max(self.watermark, watermark)
+        return builder.build()
+
+    def search(self, query: str, limit: int = 25, after: tuple | None = None) -> list[SearchHit]:
+        tokens = normalize(query).split()
+        if not tokens or limit <= 0:
+            return []
+
+        best: list[tuple[tuple[int, int, str, str], SearchHit]] = []
+
+        def keep(hit: SearchHit) -> None:
+            if after is not None and hit.sort_key <= after:
+                return
+            insort(best, (hit.sort_key, hit))
+            if len(best) > limit:
+                best.pop()
+
+        for product_id, (_, _, name, brand) in self._delta.items():
+            score = _rank(tokens, name, brand)
+            if score is not None:
+                keep(SearchHit(product_id, score, name))
+
+        # Positions come in tie-break order and a name longer than every token
+        # scores at least 1 per token, so once the worst kept hit ranks below
+        # that floor no later position can get in. A one-letter query stops
+        # after a few short names instead of ranking half the catalog.
+        longest = max(len(token) for token in tokens)
+        for position in self._candidates(tokens):
+            name, brand = self._document(position)
+            if len(best) == limit and best[-1][0] < (len(tokens) if len(name) > longest else 0, len(name), name):
+                break
+            score = _rank(tokens, name, brand)
+            if score is not None:
+                product_id = self._product_id(position)
+                # The delta holds the newer version of a product
+                if product_id not in self._delta:
+                    keep(SearchHit(product_id, score, name))
+        return [hit for _, hit in best]
+
+    def _candidates(self, tokens: list[str]) -> Iterator[int]:
+        # The rarest key of each token is a selective enough filter;
+        # _rank() verifies the full substring afterwards.
+        ranges = []
+        for token in tokens:
+            token_ranges = []
+            for key in _token_keys(token):
+                found = self._posting_range(key)
+                if found is None:
+                    return
+                token_ranges.append(found)
+            ranges.append(min(token_ranges, key=lambda bounds: bounds[1] - bounds[0]))
+        ranges.sort(key=lambda bounds: bounds[1] - bounds[0])
+
+        (start, end), others = ranges[0], ranges[1:]
+        # Positions only grow, so each other posting list is walked forward once
+        cursors = [lo for lo, _ in others]
+        for position in self._postings[start:end]:
+            for i, (_, hi) in enumerate(others):
+                slot = bisect_left(self._postings, position, cursors[i], hi)
+                cursors[i] = slot
+                if slot == hi or self._postings[slot] != position:
+                    break
+            else:
+                yield position
+
+    def _posting_range(self, key: int) -> tuple[int, int] | None:
+        slot = bisect_left(self._keys, key)
+        if slot == len(self._keys) or self._keys[slot] != key:
+            return None
+        return self._key_offsets[slot], self._key_offsets[slot + 1]
+
+    def _record(self, position: int) -> list[str]:
+        start, end = self._text_offsets[position], self._text_offsets[position + 1]
+        return bytes(self._text[start:end]).decode("utf-8").split(_FIELD_SEP)
+
+    def _document(self, position: int) -> tuple[str, str]:
+        record = self._record(position)
+        return record[2], record[3]
+
+    def _product_id(self, position: int) -> str:
+        return str(uuid.UUID(bytes=bytes(self._ids[position * 16 : position * 16 + 16])))
+
+    def save(self, path: str) -> None:
+        sections = [
+            bytes(self._ids),
+            array("I", self._text_offsets).tobytes(),
+            bytes(self._text),
+            array("Q", self._keys).tobytes(),
+            array("I", self._key_offsets).tobytes(),
+            array("I", self._postings).tobytes(),
+        ]
+        header = _HEADER.pack(
+            _MAGIC, self.watermark, len(self._text_offsets) - 1, len(self._text), len(self._keys), len(self._postings)
+        )
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".product-index-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(_pad(header))
+                for section in sections:
+                    fh.write(_pad(section))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> ProductSearchIndex:
+        with open(path, "rb") as fh:
+            backing = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(backing)
+        magic, watermark, count, text_size, key_count, posting_count = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC:
+            view.release()
+            backing.close()
+            raise ValueError(f"{path} is not a product index snapshot")
+
+        offset = _aligned(_HEADER.size)
+        sizes = [count * 16, (count + 1) * 4, text_size, key_count * 8, (key_count + 1) * 4, posting_count * 4]
+        sections = []
+        for size in sizes:
+            sections.append(view[offset : offset + size])
+            offset += _aligned(size)
+        ids, text_offsets, text, keys, key_offsets, postings = sections
+        return cls(
+            ids=ids,
+            text_offsets=text_offsets.cast("I"),
+            text=text,
+            keys=keys.cast("Q"),
+            key_offsets=key_offsets.cast("I"),
+            postings=postings.cast("I"),
+            watermark=watermark,
+            backing=backing,
+        )
+
+
+class ProductIndexBuilder:
+    def __init__(self) -> None:
+        self._ids = bytearray()
+        self._text = bytearray()
+        self._text_offsets = array("I", [0])
+        self._postings: dict[int, array] = {}
+        self._order: list[tuple[int, str, bytes]] = []
+        self._count = 0
+        self.watermark = 0.0
+
+    def add(self, product_id: str | uuid.UUID, name: str, brand: str | None, created_at: datetime | None = None) -> None:
+        product_uuid = product_id if isinstance(product_id, uuid.UUID) else uuid.UUID(str(product_id))
+        name_norm, brand_norm = normalize(name), normalize(brand)
+        record = _FIELD_SEP.join((name, brand or "", name_norm, brand_norm)).encode("utf-8")
+
+        self._ids += product_uuid.bytes
+        self._text += record
+        self._text_offsets.append(len(self._text))
+        self._order.append((len(name_norm), name_norm, product_uuid.bytes))
+        for key in _document_keys(name_norm, brand_norm):
+            posting = self._postings.get(key)
+            if posting is None:
+                posting = self._postings[key] = array("I")
+            posting.append(self._count)
+        self._count += 1
+        if created_at is not None:
+            self.watermark = max(self.watermark, created_at.timestamp())
+
+    def build(self) -> ProductSearchIndex:
+        order = sorted(range(self._count), key=self._order.__getitem__)
+        position_of = array("I", bytes(4 * self._count))
+        ids = bytearray()
+        text = bytearray()
+        text_offsets = array("I", [0])
+        for position, added in enumerate(order):
+            position_of[added] = position
+            ids += self._ids[added * 16 : added * 16 + 16]
+            text += self._text[self._text_offsets[added] : self._text_offsets[added + 1]]
+            text_offsets.append(len(text))
+
+        keys = array("Q", sorted(self._postings))
+        key_offsets = array("I", [0])
+        postings = array("I")
+        for key in keys:
+            postings.extend(sorted(position_of[added] for added in self._postings[key]))
+            key_offsets.append(len(postings))
+        return ProductSearchIndex(
+            ids=bytes(ids),
+            text_offsets=text_offsets,
+            text=bytes(text),
+            keys=keys,
+            key_offsets=key_offsets,
+            postings=postings,
+            watermark=self.watermark,
+        )
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b"\0" * (_aligned(len(data)) - len(data))
+
+
+async def build_product_index(conn) -> ProductSearchIndex:
+    builder = ProductIndexBuilder()
+    async for record in products_repo.iter_products_for_index(conn):
+        builder.add(record["product_id"], record["name"], record["brand"], record["created_at"])
+    return builder.build()
+
+
+class ProductIndexService:
+    """Process-wide product index: loaded in the background at startup,
+    refreshed with products created by other workers, SQL fallback until ready."""
+
+    def __init__(self) -> None:
+        self.index: ProductSearchIndex | None = None
+        self._seen_until = 0.0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def search(self, query: str, limit: int = 25, after: tuple | None = None) -> list[SearchHit]:
+        if self.index is None:
+            return []
+        return self.index.search(query, limit, after)
+
+    def add(self, product_id: str, name: str, brand: str | None) -> None:
+        if self.index is not None:
+            self.index.add(product_id, name, brand)
+
+    async def start(self) -> None:
+        if get_settings().product_search_backend != "memory" or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="product-index")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def load(self) -> None:
+        settings = get_settings()
+        path = settings.product_index_snapshot_path
+        if path and os.path.exists(path):
+            age = time.time() - os.path.getmtime(path)
+            if age <= settings.product_index_snapshot_max_age_seconds:
+                try:
+                    self.index = ProductSearchIndex.load(path)
+                except ValueError as exc:
+                    # Snapshots of an older layout are rebuilt
+                    logger.warning("Product index snapshot not loaded: %s", exc)
+                else:
+                    self._seen_until = self.index.watermark
+                    logger.info("Product index loaded from snapshot %s (%d products)", path, len(self.index))
+                    return
+
+        async with database.connection() as conn:
+            index = await build_product_index(conn)
+        if path:
+            await asyncio.to_thread(index.save, path)
+        self.index = index
+        self._seen_until = index.watermark
+        logger.info("Product index built from database (%d products)", len(index))
+
+    async def refresh(self) -> None:
+        if self.index is None:
+            return
+        since = datetime.fromtimestamp(max(0.0, self._seen_until - _REFRESH_OVERLAP_SECONDS), tz=timezone.utc)
+        async with database.connection() as conn:
+            records = await products_repo.list_products_created_since(conn, since)
+        for record in records:
+            self.index.add(str(record["product_id"]), record["name"], record["brand"])
+            self._seen_until = max(self._seen_until, record["created_at"].timestamp())
+        if self.index.delta_size >= get_settings().product_index_compact_threshold:
+            await self.compact()
+
+    async def compact(self) -> None:
+        """Fold the delta into a new snapshot; the delta is scanned on every search."""
+        index = self.index
+        delta = index.delta()
+        compacted = await asyncio.to_thread(index.compacted, delta, self._seen_until)
+        # Products added while the snapshot was built stay in the new delta
+        for product_id, entry in index.delta().items():
+            if delta.get(product_id) != entry:
+                compacted.add(product_id, entry[0], entry[1])
+        path = get_settings().product_index_snapshot_path
+        if path:
+            await asyncio.to_thread(compacted.save, path)
+        self.index = compacted
+        logger.info("Product index compacted (%d products, %d folded in)", len(compacted), len(delta))
+
+    async def _run(self) -> None:
+        interval = get_settings().product_index_refresh_seconds
+        while True:
+            try:
+                if self.index is None:
+                    await self.load()
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Product index load/refresh failed; search falls back to SQL")
+            await asyncio.sleep(interval)
+
+
+product_index = ProductIndexService()
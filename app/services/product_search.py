@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import asyncpg
+
+from ..config import get_settings
+from ..repositories import products as products_repo
+from .product_index import product_index
+from .utils import decode_cursor, encode_cursor
+
+_TRIGRAM_MIN_LENGTH = 3
+
+
+@dataclass
+class SearchPage:
+    records: Sequence[asyncpg.Record]
+    next_cursor: str | None
+
+
+async def search_products(conn: asyncpg.Connection, query: str, limit: int, after: str | None) -> SearchPage:
+    backend = get_settings().product_search_backend
+    needle = query.strip()
+
+    if backend == "memory" and product_index.ready and needle:
+        key = decode_cursor(after, "memory", (int, int, str, uuid.UUID)) if after else None
+        hits = product_index.search(needle, limit, tuple(key) if key else None)
+        records = await products_repo.get_products_by_ids(conn, [hit.product_id for hit in hits]) if hits else []
+        next_key = list(hits[-1].sort_key) if len(hits) == limit else None
+        return SearchPage(records, encode_cursor("memory", next_key) if next_key else None)
+
+    if backend == "trgm" and len(needle) >= _TRIGRAM_MIN_LENGTH:
+        key = decode_cursor(after, "trgm", (float, str, uuid.UUID)) if after else None
+        records = await products_repo.search_products_trgm(conn, needle, limit, tuple(key) if key else None)
+        return SearchPage(records, _next_cursor("trgm", records, limit, ("score", "name", "product_id")))
+
+    if backend == "trgm":
+        key = decode_cursor(after, "prefix", (str, uuid.UUID)) if after else None
+        records = await products_repo.search_products_prefix(conn, needle, limit, tuple(key) if key else None)
+        return SearchPage(records, _next_cursor("prefix", records, limit, ("sort_name", "product_id")))
+
+    key = decode_cursor(after, "like", (str, uuid.UUID)) if after else None
+    records = await products_repo.search_products(conn, query, limit, tuple(key) if key else None)
+    return SearchPage(records, _next_cursor("like", records, limit, ("name", "product_id")))
+
+
+def _next_cursor(kind: str, records: Sequence[asyncpg.Record], limit: int, fields: tuple[str, ...]) -> str | None:
+    if len(records) < limit:
+        return None
+    last = records[-1]
+    return encode_cursor(kind, [str(last[field]) if field == "product_id" else last[field] for field in fields])
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import importlib
+import io
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Literal, Protocol
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import get_settings
+from ..errors import BadRequestError, GatewayError, PayloadTooLargeError
+from .utils import parse_content_length
+
+try:  # Pillow is in requirements.txt; without it images are hashed but not decoded
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+# Multipart boundaries and part headers on top of the files themselves
+_MULTIPART_OVERHEAD = 64 * 1024
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    content_hash: str
+    width: int | None = None
+    height: int | None = None
+    format: str | None = None
+    # Downscaled JPEG handed to the recognizer; None when Pillow is missing
+    data: bytes | None = None
+
+
+def spool_upload(source: BinaryIO, directory: str | None, max_bytes: int) -> Path:
+    """Copy an upload to a temp file in chunks, failing past ``max_bytes``.
+    Blocking: run it in a thread."""
+    handle, name = tempfile.mkstemp(prefix="recognize-", dir=directory)
+    path = Path(name)
+    written = 0
+    try:
+        with os.fdopen(handle, "wb") as target:
+            source.seek(0)
+            while chunk := source.read(_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"File is larger than {max_bytes} bytes")
+                target.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+async def save_uploads(files: list[Any], max_bytes: int) -> list[Path]:
+    directory = get_settings().recognition_spool_dir
+    paths: list[Path] = []
+    try:
+        for upload in files:
+            paths.append(await asyncio.to_thread(spool_upload, upload.file, directory, max_bytes))
+    except BaseException:
+        for path in paths:
+            path.unlink(missing_ok=True)
+        raise
+    return paths
+
+
+class UploadLimitMiddleware:
+    """Caps the request body of photo uploads before the multipart parser
+    buffers it: a declared Content-Length over the limit is answered 413
+    right away, a chunked body is cut off once it goes past the limit."""
+
+    def __init__(self, app: ASGIApp, path: str, max_bytes: int) -> None:
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        too_large = PayloadTooLargeError(f"Upload is larger than {self.max_bytes} bytes")
+        try:
+            content_length = parse_content_length(dict(scope["headers"]).get(b"content-length"))
+        except BadRequestError as exc:
+            await _reject(exc, scope, receive, send)
+            return
+        if content_length is not None and content_length > self.max_bytes:
+            await _reject(too_large, scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # The parser sees a disconnect and stops reading
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def limited_send(message: Message) -> None:
+            if not exceeded:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                # Whatever the route answered to the cut-off body becomes a 413
+                await _reject(too_large, scope, receive, send)
+
+        await self.app(scope, limited_receive, limited_send)
+
+
+def upload_limit(max_files: int, max_file_bytes: int) -> int:
+    return max_files * max_file_bytes + _MULTIPART_OVERHEAD
+
+
+async def _reject(exc: GatewayError, scope: Scope, receive: Receive, send: Send) -> None:
+    response = JSONResponse(status_code=exc.status_code, content=exc.detail)
+    await response(scope, receive, send)
+
+
+def prepare_image(path: str, max_side: int) -> PreparedImage:
+    """Hash, decode and downscale one image. Runs in the process pool."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as source:
+        while chunk := source.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+    if Image is None:
+        return PreparedImage(content_hash)
+
+    with Image.open(path) as image:
+        image_format = image.format
+        width, height = image.size
+        # draft() lets JPEG decode at a reduced scale instead of full size
+        image.draft("RGB", (max_side, max_side))
+        image.thumbnail((max_side, max_side))
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=85)
+    return PreparedImage(content_hash, width, height, image_format, buffer.getvalue())
+
+
+class Recognizer(Protocol):
+    async def recognize(self, image: PreparedImage) -> list[dict[str, Any]]: ...
+
+
+class LocalRecognizer:
+    """Stand-in used until a model is plugged in: recognizes nothing, but
+    exercises the whole pipeline (spooling, decoding, caching, jobs)."""
+
+    async def recognize(self, image: PreparedImage) -> list[dict[str, Any]]:
+        return []
+
+
+def load_recognizer(backend: str) -> Recognizer:
+    # "local" or "package.module:factory", called without arguments
+    if backend == "local":
+        return LocalRecognizer()
+    module_name, _, attribute = backend.partition(":")
+    factory = getattr(importlib.import_module(module_name), attribute)
+    return factory()
+
+
+@dataclass
+class RecognitionJob:
+    job_id: str
+    user_id: str
+    paths: list[Path]
+    status: JobStatus = "queued"
+    results: list[dict[str, Any]] = field(default_factory=list)
+    error: str | None = None
+    created_at: float = field(default_factory=time.monotonic)
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"job_id": self.job_id, "status": self.status, "results": self.results, "error": self.error}
+
+
+class RecognitionJobs:
+    """In-process job queue for photo recognition.
+
+    Decoding and hashing go to a process pool, so big photos never block the
+    event loop. Results are cached by content hash: the same photo uploaded
+    again skips the recognizer. Jobs live in memory for ``job_ttl_seconds``;
+    clients poll GET /v1/products/recognize-photo/jobs/{job_id}.
+    """
+
+    def __init__(
+        self,
+        recognizer: Recognizer,
+        workers: int = 2,
+        max_side: int = 1024,
+        cache_size: int = 1000,
+        max_jobs: int = 1000,
+        job_ttl_seconds: float = 600.0,
+        executor: Executor | None = None,
+    ) -> None:
+        self.recognizer = recognizer
+        self.workers = workers
+        self.max_side = max_side
+        self.cache_size = cache_size
+        self.max_jobs = max_jobs
+        self.job_ttl_seconds = job_ttl_seconds
+        self._executor = executor
+        self._jobs: OrderedDict[str, RecognitionJob] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self._cache: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+        self._slots: asyncio.Semaphore | None = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def submit(self, user_id: str, paths: list[Path]) -> RecognitionJob:
+        self._expire()
+        job = RecognitionJob(uuid.uuid4().hex, user_id, paths)
+        self._jobs[job.job_id] = job
+        task = asyncio.create_task(self._run(job), name=f"recognition-{job.job_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> RecognitionJob | None:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "jobs": len(self._jobs),
+            "running": len(self._tasks),
+            "cache_size": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    async def _run(self, job: RecognitionJob) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.results = list(await asyncio.gather(*(self._recognize(path) for path in job.paths)))
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status, job.error = "failed", "cancelled"
+            raise
+        except Exception as exc:
+            logger.exception("Recognition job %s failed", job.job_id)
+            job.status, job.error = "failed", f"{exc.__class__.__name__}: {exc}"
+        finally:
+            for path in job.paths:
+                path.unlink(missing_ok=True)
+            job.finished.set()
+
+    async def _recognize(self, path: Path) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(self._get_executor(), prepare_image, str(path), self.max_side)
+        cached = self._cache.get(image.content_hash)
+        if cached is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(image.content_hash)
+            candidates = cached
+        else:
+            self.cache_misses += 1
+            candidates = await self.recognizer.recognize(image)
+            self._cache[image.content_hash] = candidates
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return {
+            "image_hash": image.content_hash,
+            "width": image.width,
+            "height": image.height,
+            "candidates": candidates,
+            "cached": cached is not None,
+        }
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self.job_ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            if len(self._jobs) <= self.max_jobs and job.created_at > deadline:
+                break
+            if job.finished.is_set():
+                del self._jobs[job_id]
+
+
+def _build_recognition_jobs() -> RecognitionJobs:
+    settings = get_settings()
+    return RecognitionJobs(
+        load_recognizer(settings.recognition_backend),
+        workers=settings.recognition_workers,
+        max_side=settings.recognition_max_side,
+        cache_size=settings.recognition_cache_size,
+        job_ttl_seconds=settings.recognition_job_ttl_seconds,
+    )
+
+
+recognition_jobs = _build_recognition_jobs()
+
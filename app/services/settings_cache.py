@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+import asyncpg
+
+from ..config import get_settings
+from ..repositories import day as day_repo
+from ..schemas.common import Settings
+
+
+@dataclass
+class _Entry:
+    value: Settings
+    expires_at: float | None
+
+
+class SettingsCache:
+    """Per-user Settings, read by the day and stats paths to compute status.
+
+    PATCH /v1/settings invalidates locally; the settings trigger NOTIFYs the
+    other workers (services/notifications.py). The TTL only bounds staleness
+    while the listener is reconnecting.
+
+    For ``settle_seconds`` after an invalidation the user's settings are not
+    cached: the NOTIFY can arrive before a replica has the new row, and a
+    read from it would otherwise put the old settings back until the TTL.
+    """
+
+    def __init__(
+        self, max_size: int = 10000, ttl_seconds: float | None = None, enabled: bool = True, settle_seconds: float = 0.0
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.settle_seconds = settle_seconds
+        self.enabled = enabled and max_size > 0
+        self._entries: dict[str, _Entry] = {}
+        self._unsettled: dict[str, float] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Settings | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None or (entry.expires_at is not None and entry.expires_at <= time.monotonic()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.value
+
+    def begin(self) -> int:
+        return self._epoch
+
+    def put(self, user_id: str, value: Settings, token: int) -> None:
+        if not self.enabled or token != self._epoch:
+            return
+        if self._unsettled.get(user_id, 0.0) > time.monotonic():
+            return
+        if len(self._entries) >= self.max_size and user_id not in self._entries:
+            # Settings are tiny and rarely change; starting over is cheaper than LRU bookkeeping
+            self._entries.clear()
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[user_id] = _Entry(value=value, expires_at=expires_at)
+
+    def invalidate(self, user_id: str) -> None:
+        self._epoch += 1
+        self._entries.pop(user_id, None)
+        if self.settle_seconds:
+            now = time.monotonic()
+            self._unsettled[user_id] = now + self.settle_seconds
+            if len(self._unsettled) > self.max_size:
+                self._unsettled = {user: until for user, until in self._unsettled.items() if until > now}
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+async def load_settings(conn: asyncpg.Connection, user_id: str) -> Settings:
+    cached = settings_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    token = settings_cache.begin()
+    record = await day_repo.fetch_settings(conn, user_id)
+    # Rows coming from the database were validated on the way in
+    settings = Settings.model_construct(**record)
+    settings_cache.put(user_id, settings, token)
+    return settings
+
+
+def _build_settings_cache() -> SettingsCache:
+    settings = get_settings()
+    return SettingsCache(
+        max_size=settings.user_settings_cache_max_size,
+        ttl_seconds=settings.user_settings_cache_ttl_seconds,
+        enabled=settings.user_settings_cache_enabled,
+        # Replica reads are routed to the primary for the same window after a write
+        settle_seconds=settings.read_your_writes_seconds if settings.database_replica_url else 0.0,
+    )
+
+
+settings_cache = _build_settings_cache()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from ..config import get_settings
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Identical concurrent reads share one execution.
+
+    The first caller of a key starts ``load`` as a task; callers arriving while
+    it runs await the same task, so N identical requests take one pool
+    connection and run their queries once. Nothing is kept once the task is
+    done: the next request starts a new flight. Each waiter is shielded from
+    the others: a client that goes away only cancels the load when it was the
+    last one waiting for it.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._flights: dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await load()
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(load()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(key, flight, task))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                # A request arriving now starts over instead of joining a cancelled load
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: Hashable, flight: _Flight, task: asyncio.Task) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Every waiter may be gone; retrieve the exception so it is not logged as lost
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        return {"enabled": self.enabled, "in_flight": len(self._flights), "started": self.started, "shared": self.shared}
+
+
+read_flights = SingleFlight(enabled=get_settings().single_flight_enabled)
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
-from datetime import date
+import base64
+import binascii
+import json
+import math
+import uuid
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from ..errors import BadRequestError
 from ..schemas.common import Settings
 
+STATS_RANGE_DAYS = {"7d": 7, "14d": 14, "30d": 30, "90d": 90, "365d": 365}
+STATS_MAX_DAYS = 731
+DAYS_MAX_RANGE = 31
+
 
 def compute_status(calories: int, settings: Settings) -> str:
     lower = settings.calorie_target - settings.calorie_tolerance
@@ -20,3 +32,118 @@ def ensure_valid_date(value: str) -> date:
         return date.fromisoformat(value)
     except ValueError as exc:
         raise ValueError("Date must be in ISO format YYYY-MM-DD") from exc
+
+
+def resolve_today(today: str | None, tz: str | None, default_tz: str) -> date:
+    if today:
+        return ensure_valid_date(today)
+    try:
+        zone = ZoneInfo(tz or default_tz)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError(f"Unknown timezone: {tz or default_tz}") from exc
+    return datetime.now(zone).date()
+
+
+def resolve_stats_period(
+    range_: str | None, date_from: str | None, date_to: str | None, today: date
+) -> tuple[date, date, str]:
+    if date_from or date_to:
+        if not date_from:
+            raise ValueError("from is required when to is given")
+        start_date = ensure_valid_date(date_from)
+        end_date = ensure_valid_date(date_to) if date_to else today
+        label = "custom"
+    elif range_:
+        if range_ not in STATS_RANGE_DAYS:
+            raise ValueError(f"range must be one of {', '.join(STATS_RANGE_DAYS)}")
+        end_date = today
+        start_date = end_date - timedelta(days=STATS_RANGE_DAYS[range_] - 1)
+        label = range_
+    else:
+        raise ValueError("Either range or from/to must be provided")
+
+    if start_date > end_date:
+        raise ValueError("from must not be after to")
+    if (end_date - start_date).days + 1 > STATS_MAX_DAYS:
+        raise ValueError(f"Stats period must not exceed {STATS_MAX_DAYS} days")
+    return start_date, end_date, label
+
+
+def resolve_days_range(date_from: str, date_to: str) -> tuple[date, date]:
+    start_date = ensure_valid_date(date_from)
+    end_date = ensure_valid_date(date_to)
+    if start_date > end_date:
+        raise ValueError("from must not be after to")
+    if (end_date - start_date).days + 1 > DAYS_MAX_RANGE:
+        raise ValueError(f"Range must not exceed {DAYS_MAX_RANGE} days")
+    return start_date, end_date
+
+
+def parse_content_length(value: str | bytes | None) -> int | None:
+    """Content-Length as an int, None when absent; anything else is a 400."""
+    if value is None:
+        return None
+    text = value.decode("latin-1") if isinstance(value, bytes) else value
+    if not (text.strip().isascii() and text.strip().isdigit()):
+        raise BadRequestError("Content-Length must be a non-negative integer")
+    return int(text)
+
+
+def accepts_encoding(accept_encoding: str | None, coding: str) -> bool:
+    """Whether an Accept-Encoding header allows ``coding``: listed (or ``*``)
+    with a q-value above zero. ``gzip;q=0`` refuses gzip."""
+    explicit: float | None = None
+    wildcard: float | None = None
+    for entry in (accept_encoding or "").split(","):
+        name, _, params = entry.partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == coding:
+            explicit = q
+        elif name == "*":
+            wildcard = q
+    q = explicit if explicit is not None else wildcard
+    return q is not None and q > 0
+
+
+def encode_cursor(kind: str, key: list) -> str:
+    raw = json.dumps([kind, key], separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(value: str, kind: str, fields: Sequence[type]) -> list:
+    """Key of a cursor of ``kind`` whose items have the ``fields`` types.
+
+    ``uuid.UUID`` stands for a string holding a UUID; an int passes for a float.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        cursor_kind, key = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if cursor_kind != kind or not isinstance(key, list) or len(key) != len(fields):
+        raise ValueError("Invalid cursor")
+    if not all(_is_cursor_field(item, field) for item, field in zip(key, fields)):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def _is_cursor_field(value: object, field: type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if field is uuid.UUID:
+        try:
+            uuid.UUID(value)  # type: ignore[arg-type]
+        except (AttributeError, TypeError, ValueError):
+            return False
+        return True
+    if field is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, field)
@@ -0,0 +1,130 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a real database (``DATABASE_URL``) that already has
+``sql_templates`` applied. Each script seeds its own user and removes it on exit.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from datetime import date, timedelta
+
+import asyncpg
+
+from app.config import get_settings
+
+BENCH_USER_ID = "00000000-0000-0000-0000-0000000000be"
+
+SEED_PRODUCTS_QUERY = """
+INSERT INTO foodtracker_app.products (product_id, name, brand, is_custom, created_by)
+SELECT gen_random_uuid(), 'bench product ' || g, 'bench', true, $1
+FROM generate_series(1, $2) AS g
+RETURNING product_id
+"""
+
+SEED_NUTRITION_QUERY = """
+INSERT INTO foodtracker_app.product_nutrition_events (product_id, calories, protein, fat, carbs, source)
+SELECT product_id, 50 + (random() * 400)::INT, round((random() * 30)::numeric, 1),
+       round((random() * 30)::numeric, 1), round((random() * 60)::numeric, 1), 'seed'
+FROM unnest($1::uuid[]) AS product_id
+"""
+
+SEED_MEALS_QUERY = """
+INSERT INTO foodtracker_app.meals (meal_id, user_id, meal_date, meal_type, meal_time)
+SELECT gen_random_uuid(), $1, d::date, t.meal_type, t.meal_time
+FROM generate_series($2::date, $3::date, interval '1 day') AS d
+CROSS JOIN (
+  VALUES ('breakfast'::foodtracker_app.meal_type, '08:00'::time),
+         ('lunch', '13:00'),
+         ('dinner', '19:00'),
+         ('snack', '16:00')
+) AS t(meal_type, meal_time)
+"""
+
+SEED_ITEMS_QUERY = """
+INSERT INTO foodtracker_app.meal_items (item_id, meal_id, product_id, grams, added_via)
+SELECT gen_random_uuid(), m.meal_id, ($2::uuid[])[1 + (random() * (array_length($2::uuid[], 1) - 1))::INT],
+       50 + (random() * 250)::INT, 'search'
+FROM foodtracker_app.meals AS m
+CROSS JOIN generate_series(1, $3) AS g
+WHERE m.user_id = $1
+"""
+
+
+def parse_args(description: str, **defaults: int) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--iterations", type=int, default=defaults.get("iterations", 500))
+    parser.add_argument("--warmup", type=int, default=defaults.get("warmup", 50))
+    parser.add_argument("--days", type=int, default=defaults.get("days", 365))
+    parser.add_argument("--items-per-meal", type=int, default=defaults.get("items_per_meal", 4))
+    return parser.parse_args()
+
+
+async def connect(statement_cache_size: int = 0) -> asyncpg.Connection:
+    return await asyncpg.connect(get_settings().database_url, statement_cache_size=statement_cache_size)
+
+
+async def seed_user(conn: asyncpg.Connection, days: int, items_per_meal: int, products: int = 200) -> date:
+    """Create the bench user with ``days`` days of history; returns the last seeded date."""
+    await cleanup_user(conn)
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    async with conn.transaction():
+        await conn.execute("INSERT INTO foodtracker_app.users (user_id) VALUES ($1)", BENCH_USER_ID)
+        await conn.execute(
+            """
+            INSERT INTO foodtracker_app.settings
+              (user_id, calorie_target, calorie_tolerance, macro_mode, protein_target, fat_target, carbs_target)
+            VALUES ($1, 2000, 100, 'percent', 30, 30, 40)
+            """,
+            BENCH_USER_ID,
+        )
+        product_ids = [r["product_id"] for r in await conn.fetch(SEED_PRODUCTS_QUERY, BENCH_USER_ID, products)]
+        await conn.execute(SEED_NUTRITION_QUERY, product_ids)
+        await conn.execute(SEED_MEALS_QUERY, BENCH_USER_ID, start_date, end_date)
+        await conn.execute(SEED_ITEMS_QUERY, BENCH_USER_ID, product_ids, items_per_meal)
+        await conn.execute(
+            """
+            INSERT INTO foodtracker_app.day_insights (user_id, insight_date, text, severity)
+            VALUES ($1, $2, 'bench insight', 'neutral')
+            """,
+            BENCH_USER_ID,
+            end_date,
+        )
+    await conn.execute("ANALYZE")
+    return end_date
+
+
+async def cleanup_user(conn: asyncpg.Connection) -> None:
+    async with conn.transaction():
+        await conn.execute("DELETE FROM foodtracker_app.users WHERE user_id = $1", BENCH_USER_ID)
+        await conn.execute(
+            "DELETE FROM foodtracker_app.products WHERE brand = 'bench' AND created_by IS NULL AND is_custom"
+        )
+
+
+async def measure(fn: Callable[[], Awaitable[object]], iterations: int, warmup: int) -> list[float]:
+    for _ in range(warmup):
+        await fn()
+    samples: list[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(name: str, samples: list[float]) -> None:
+    print(
+        f"{name:<32} n={len(samples):<6} p50={percentile(samples, 50):8.3f} ms  "
+        f"p99={percentile(samples, 99):8.3f} ms  mean={statistics.fmean(samples):8.3f} ms"
+    )
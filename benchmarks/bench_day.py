@@ -0,0 +1,34 @@
+"""GET /v1/day/{date}: composite single-statement path vs. the four-query path.
+
+Usage: DATABASE_URL=... python -m benchmarks.bench_day --iterations 1000
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from app.services.day import load_day_composite, load_day_multi
+
+from ._common import BENCH_USER_ID, cleanup_user, connect, measure, parse_args, report, seed_user
+
+
+async def main() -> None:
+    args = parse_args(__doc__.splitlines()[0])
+    conn = await connect()
+    try:
+        target_date = await seed_user(conn, args.days, args.items_per_meal)
+
+        composite = await load_day_composite(conn, BENCH_USER_ID, target_date)
+        multi = await load_day_multi(conn, BENCH_USER_ID, target_date)
+        assert composite == multi, "composite and multi-query paths disagree"
+
+        for name, loader in (("day: composite (1 query)", load_day_composite), ("day: multi (4 queries)", load_day_multi)):
+            samples = await measure(lambda: loader(conn, BENCH_USER_ID, target_date), args.iterations, args.warmup)
+            report(name, samples)
+    finally:
+        await cleanup_user(conn)
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+"""GET /v1/days: one range query vs. one composite day query per date, for 7/14/31 days.
+
+Usage: DATABASE_URL=... python -m benchmarks.bench_days_range --iterations 300
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+
+from app.services.day import load_day_composite, load_days
+
+from ._common import BENCH_USER_ID, cleanup_user, connect, measure, parse_args, report, seed_user
+
+
+async def main() -> None:
+    args = parse_args(__doc__.splitlines()[0], iterations=300, warmup=30)
+    conn = await connect()
+    try:
+        end_date = await seed_user(conn, args.days, args.items_per_meal)
+
+        for length in (7, 14, 31):
+            start_date = end_date - timedelta(days=length - 1)
+            dates = [start_date + timedelta(days=offset) for offset in range(length)]
+
+            per_day = [await load_day_composite(conn, BENCH_USER_ID, day) for day in dates]
+            assert await load_days(conn, BENCH_USER_ID, start_date, end_date) == per_day, "range and per-day paths disagree"
+
+            async def each_day() -> None:
+                for day in dates:
+                    await load_day_composite(conn, BENCH_USER_ID, day)
+
+            samples = await measure(each_day, args.iterations, args.warmup)
+            report(f"{length} days: per day ({length} q)", samples)
+            samples = await measure(lambda: load_days(conn, BENCH_USER_ID, start_date, end_date), args.iterations, args.warmup)
+            report(f"{length} days: range (1 query)", samples)
+    finally:
+        await cleanup_user(conn)
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""Adding N items to a meal: N single-item inserts vs. one batch insert (each returns computed items).
+
+Usage: DATABASE_URL=... python -m benchmarks.bench_meal_items --iterations 200 --items-per-meal 10
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from app.repositories import meals as meals_repo
+
+from ._common import BENCH_USER_ID, cleanup_user, connect, measure, parse_args, report, seed_user
+
+
+async def main() -> None:
+    args = parse_args(__doc__.splitlines()[0], days=1, items_per_meal=10, iterations=200, warmup=20)
+    conn = await connect()
+    try:
+        target_date = await seed_user(conn, args.days, 0)
+        meal_id = str(
+            await conn.fetchval(
+                "SELECT meal_id FROM foodtracker_app.meals WHERE user_id = $1 AND meal_date = $2 LIMIT 1",
+                BENCH_USER_ID,
+                target_date,
+            )
+        )
+        product_ids = await conn.fetch("SELECT product_id FROM foodtracker_app.products WHERE brand = 'bench'")
+        rows = [(str(product_ids[i % len(product_ids)]["product_id"]), 100 + i, "search") for i in range(args.items_per_meal)]
+
+        async def per_item() -> None:
+            for product_id, grams, added_via in rows:
+                await meals_repo.create_meal_item(conn, BENCH_USER_ID, meal_id, product_id, grams, added_via)
+
+        async def batch() -> None:
+            await meals_repo.create_meal_items(conn, BENCH_USER_ID, meal_id, rows)
+
+        n = len(rows)
+        for name, fn in ((f"items: per-item ({n} queries)", per_item), ("items: batch (1 query)", batch)):
+            samples = await measure(fn, args.iterations, args.warmup)
+            report(name, samples)
+            print(f"{'':<32} {n * 1000 / (sum(samples) / len(samples)):10.0f} items/s")
+            await conn.execute("DELETE FROM foodtracker_app.meal_items WHERE meal_id = $1", meal_id)
+    finally:
+        await cleanup_user(conn)
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""Cost of the Prometheus instrumentation itself (no database needed).
+
+Compares a bare FastAPI route with the same route behind MetricsMiddleware,
+and a no-op coroutine with the same coroutine under @observe_query.
+
+Usage: python -m benchmarks.bench_metrics_overhead --iterations 5000
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.metrics import MetricsMiddleware, observe_query
+
+from ._common import measure, parse_args, report
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.get("/v1/day/{date}")
+    async def day(date: str) -> dict[str, str]:
+        return {"date": date}
+
+    return app
+
+
+async def noop() -> None:
+    return None
+
+
+async def main() -> None:
+    args = parse_args(__doc__.splitlines()[0], iterations=5000, warmup=500)
+
+    for name, instrumented in (("route: bare", False), ("route: MetricsMiddleware", True)):
+        transport = httpx.ASGITransport(app=build_app(instrumented))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            samples = await measure(lambda: client.get("/v1/day/2024-01-01"), args.iterations, args.warmup)
+        report(name, samples)
+
+    observed = observe_query(noop)
+    for name, fn in (("query: bare coroutine", noop), ("query: @observe_query", observed)):
+        samples = await measure(fn, args.iterations, args.warmup)
+        report(name, samples)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
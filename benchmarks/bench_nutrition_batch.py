@@ -0,0 +1,93 @@
+"""10k nutrition corrections: per-row vs. statement-level snapshot trigger, and per-event vs. batch inserts.
+
+The row-trigger variant recreates trg_apply_nutrition_event inside a
+transaction that is rolled back, so the schema is left as it was.
+
+Usage: DATABASE_URL=... python -m benchmarks.bench_nutrition_batch --iterations 5 --events 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+
+from app.repositories import products as products_repo
+
+from ._common import cleanup_user, connect, measure, report, seed_user
+
+ROW_TRIGGER_SQL = """
+DROP TRIGGER trg_apply_nutrition_events ON foodtracker_app.product_nutrition_events;
+CREATE TRIGGER trg_apply_nutrition_event
+AFTER INSERT ON foodtracker_app.product_nutrition_events
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.apply_product_nutrition_event();
+"""
+
+
+class _Rollback(Exception):
+    pass
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--products", type=int, default=2000, help="Distinct products the events are spread over")
+    parser.add_argument("--days", type=int, default=90, help="History using those products (meal_totals refresh)")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    conn = await connect()
+    try:
+        await seed_user(conn, args.days, 4, products=args.products)
+        product_ids = [
+            str(record["product_id"])
+            for record in await conn.fetch("SELECT product_id FROM foodtracker_app.products WHERE brand = 'bench'")
+        ]
+        events = [
+            (
+                random.choice(product_ids),
+                random.randint(50, 450),
+                round(random.uniform(0, 30), 1),
+                round(random.uniform(0, 30), 1),
+                round(random.uniform(0, 60), 1),
+            )
+            for _ in range(args.events)
+        ]
+
+        async def in_rolled_back_transaction(fn, *setup: str) -> None:
+            try:
+                async with conn.transaction():
+                    for statement in setup:
+                        await conn.execute(statement)
+                    await fn()
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        async def batch() -> None:
+            await products_repo.insert_nutrition_events(conn, events, source="correction")
+
+        async def per_event() -> None:
+            for event in events:
+                await products_repo.insert_nutrition_event(conn, *event, source="correction")
+
+        variants = (
+            ("row trigger, batch insert", lambda: in_rolled_back_transaction(batch, ROW_TRIGGER_SQL)),
+            ("statement trigger, batch insert", lambda: in_rolled_back_transaction(batch)),
+            (f"statement trigger, {args.events} inserts", lambda: in_rolled_back_transaction(per_event)),
+        )
+        for name, fn in variants:
+            samples = await measure(fn, args.iterations, args.warmup)
+            report(name, samples)
+            print(f"{'':<32} {args.events * 1000 / (sum(samples) / len(samples)):10.0f} events/s")
+    finally:
+        await cleanup_user(conn)
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
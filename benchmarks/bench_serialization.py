@@ -0,0 +1,203 @@
+"""Response building for /day, /meals/{id} and /products/search (no database needed).
+
+"validated" is the previous path: models built with full validation, returned
+through response_model and the stock JSONResponse. "trusted" is the current
+one: rows passed on as dicts (model_construct where a model is kept, as for
+the cached day) and rendered by ORJSONResponse.
+
+Usage: python -m benchmarks.bench_serialization --iterations 2000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from datetime import date, time
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.responses import ORJSONResponse
+from app.schemas.common import (
+    DayResponse,
+    Insight,
+    MealItem,
+    MealSummary,
+    ProductSearchResult,
+    Settings,
+    Summary,
+)
+from app.services.utils import compute_status
+
+from ._common import measure, parse_args, report
+
+SETTINGS_ROW = {
+    "calorie_target": 2000,
+    "calorie_tolerance": 100,
+    "macro_mode": "percent",
+    "protein_target": 30,
+    "fat_target": 30,
+    "carbs_target": 40,
+}
+MEAL_ROWS = [
+    {
+        "meal_id": str(uuid.uuid4()),
+        "meal_type": meal_type,
+        "meal_time": meal_time,
+        "calories": 550,
+        "protein": 30.5,
+        "fat": 20.1,
+        "carbs": 60.0,
+        "items_count": 4,
+    }
+    for meal_type, meal_time in (("breakfast", time(8)), ("lunch", time(13)), ("dinner", time(19)), ("snack", time(16)))
+]
+MEAL_ROW = {"meal_id": uuid.uuid4(), "meal_date": date(2024, 5, 1), "meal_type": "lunch", "meal_time": time(13)}
+ITEM_ROWS = [
+    {
+        "item_id": uuid.uuid4(),
+        "name": f"product {i}",
+        "grams": 100 + i,
+        "calories": 120 + i,
+        "protein": Decimal("5.5"),
+        "fat": Decimal("2.1"),
+        "carbs": Decimal("15.0"),
+        "added_via": "search",
+    }
+    for i in range(8)
+]
+PRODUCT_ROWS = [
+    {
+        "product_id": uuid.uuid4(),
+        "name": f"product {i}",
+        "brand": "brand",
+        "calories": 250,
+        "protein": Decimal("10.0"),
+        "fat": Decimal("5.0"),
+        "carbs": Decimal("30.0"),
+    }
+    for i in range(25)
+]
+
+
+def build_validated_app() -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/day", response_model=DayResponse)
+    async def day() -> DayResponse:
+        settings = Settings(**SETTINGS_ROW)
+        return DayResponse(
+            date=date(2024, 5, 1),
+            summary=Summary(calories=2200, protein=122.0, fat=80.4, carbs=240.0, status=compute_status(2200, settings)),
+            meals=[MealSummary(**meal) for meal in MEAL_ROWS],
+            insight=Insight(text="Nice", severity="positive"),
+        )
+
+    @app.get("/meal")
+    async def meal() -> dict:
+        return {"meal": dict(MEAL_ROW), "items": [MealItem(**{**row, "item_id": str(row["item_id"])}) for row in ITEM_ROWS]}
+
+    @app.get("/search", response_model=list[ProductSearchResult])
+    async def search() -> list[ProductSearchResult]:
+        return [
+            ProductSearchResult(
+                product_id=str(row["product_id"]),
+                name=row["name"],
+                brand=row["brand"],
+                nutrition_per_100g={key: row[key] for key in ("calories", "protein", "fat", "carbs")},
+            )
+            for row in PRODUCT_ROWS
+        ]
+
+    return app
+
+
+def build_trusted_app() -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/day", response_model=DayResponse)
+    async def day() -> DayResponse:
+        settings = Settings.model_construct(**SETTINGS_ROW)
+        return ORJSONResponse(
+            DayResponse.model_construct(
+                date=date(2024, 5, 1),
+                summary=Summary.model_construct(
+                    calories=2200, protein=122.0, fat=80.4, carbs=240.0, status=compute_status(2200, settings)
+                ),
+                meals=[MealSummary.model_construct(**meal) for meal in MEAL_ROWS],
+                insight=Insight.model_construct(text="Nice", severity="positive"),
+            )
+        )
+
+    @app.get("/meal")
+    async def meal() -> dict:
+        return ORJSONResponse({"meal": dict(MEAL_ROW), "items": [dict(row) for row in ITEM_ROWS]})
+
+    @app.get("/search", response_model=list[ProductSearchResult])
+    async def search() -> list[ProductSearchResult]:
+        return ORJSONResponse(
+            [
+                {
+                    "product_id": row["product_id"],
+                    "name": row["name"],
+                    "brand": row["brand"],
+                    "nutrition_per_100g": {
+                        "calories": row["calories"],
+                        "protein": row["protein"],
+                        "fat": row["fat"],
+                        "carbs": row["carbs"],
+                    },
+                }
+                for row in PRODUCT_ROWS
+            ]
+        )
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> bytes:
+    # Straight ASGI call: no HTTP client in the measurement.
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+    }
+    body = bytearray()
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return bytes(body)
+
+
+async def main() -> None:
+    args = parse_args(__doc__.splitlines()[0], iterations=2000, warmup=200)
+    apps = {"validated": build_validated_app(), "trusted": build_trusted_app()}
+
+    for path in ("/day", "/meal", "/search"):
+        bodies = []
+        for name, app in apps.items():
+            bodies.append(json.loads(await call(app, path)))
+            samples = await measure(lambda: call(app, path), args.iterations, args.warmup)
+            report(f"{path}: {name}", samples)
+        assert bodies[0] == bodies[1], f"{path}: payloads differ"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""Read path latency with unnamed statements vs. the asyncpg statement cache.
+
+"unnamed" is DB_STATEMENT_MODE=unnamed (parse + plan on every call), "cached"
+is DB_STATEMENT_MODE=cached on a direct connection with the repository
+queries prepared up front. Run it once against Postgres directly and once
+through the pooler to see what the pooler costs.
+
+Usage: DATABASE_URL=... python -m benchmarks.bench_statement_modes --iterations 1000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from datetime import timedelta
+
+from app.db import repository_queries, warm_statement_cache
+from app.repositories import day as day_repo
+from app.repositories import meals as meals_repo
+from app.repositories import stats as stats_repo
+
+from ._common import BENCH_USER_ID, cleanup_user, connect, measure, parse_args, report, seed_user
+
+PLANNING_TIME = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+async def main() -> None:
+    args = parse_args(__doc__.splitlines()[0])
+    seed_conn = await connect()
+    try:
+        target_date = await seed_user(seed_conn, args.days, args.items_per_meal)
+        start_date = target_date - timedelta(days=29)
+        meal_id = await seed_conn.fetchval(
+            "SELECT meal_id::text FROM foodtracker_app.meals WHERE user_id = $1 AND meal_date = $2 LIMIT 1",
+            BENCH_USER_ID,
+            target_date,
+        )
+
+        # Planning is what the statement cache saves; show how much of it there is.
+        for name, query, params in (
+            ("DAY_COMPOSITE_QUERY", day_repo.DAY_COMPOSITE_QUERY, (BENCH_USER_ID, target_date)),
+            ("STATS_QUERY", stats_repo.STATS_QUERY, (BENCH_USER_ID, start_date, target_date)),
+            ("GET_MEAL_DETAIL_QUERY", meals_repo.GET_MEAL_DETAIL_QUERY, (BENCH_USER_ID, meal_id)),
+        ):
+            plan = await seed_conn.fetch(f"EXPLAIN (ANALYZE, SUMMARY) {query}", *params)
+            planning = PLANNING_TIME.search("\n".join(row[0] for row in plan))
+            print(f"{name:<32} planning={float(planning.group(1)) if planning else float('nan'):8.3f} ms")
+
+        for mode, cache_size in (("unnamed", 0), ("cached", 256)):
+            conn = await connect(statement_cache_size=cache_size)
+            try:
+                if cache_size:
+                    prepared = await warm_statement_cache(conn, repository_queries())
+                    print(f"{mode}: {prepared} repository queries prepared")
+
+                async def workload() -> None:
+                    await day_repo.fetch_day(conn, BENCH_USER_ID, target_date)
+                    await stats_repo.fetch_stats(conn, BENCH_USER_ID, start_date, target_date)
+                    await meals_repo.get_meal_detail(conn, BENCH_USER_ID, meal_id)
+
+                samples = await measure(workload, args.iterations, args.warmup)
+                report(f"{mode}: day+stats+meal (3 queries)", samples)
+            finally:
+                await conn.close()
+    finally:
+        await cleanup_user(seed_conn)
+        await seed_conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
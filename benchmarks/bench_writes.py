@@ -0,0 +1,139 @@
+"""Write endpoints before/after: write + read-back round trips vs. one data-modifying statement.
+
+Every scenario runs against the seeded bench user; "legacy" replays the
+previous statements (write, then a read through v_meal_items_computed; product
+and its nutrition event as two autocommit statements). Create/delete meal and
+delete item were one statement already and are reported for reference.
+
+Usage: DATABASE_URL=... python -m benchmarks.bench_writes --iterations 300
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import time
+
+from app.repositories import meals as meals_repo
+from app.repositories import products as products_repo
+
+from ._common import BENCH_USER_ID, cleanup_user, connect, measure, parse_args, report, seed_user
+
+LEGACY_CREATE_ITEM_QUERY = """
+INSERT INTO foodtracker_app.meal_items (item_id, meal_id, product_id, grams, added_via)
+SELECT gen_random_uuid(), m.meal_id, $3, $4, COALESCE($5::foodtracker_app.added_via, 'search')
+FROM foodtracker_app.meals AS m
+WHERE m.user_id = $1 AND m.meal_id = $2
+RETURNING item_id
+"""
+
+LEGACY_UPDATE_ITEM_QUERY = """
+UPDATE foodtracker_app.meal_items AS mi
+SET grams = $1
+FROM foodtracker_app.meals AS m
+WHERE mi.meal_id = m.meal_id
+  AND m.user_id = $2
+  AND mi.meal_id = $3
+  AND mi.item_id = $4
+RETURNING mi.item_id
+"""
+
+LEGACY_GET_ITEM_QUERY = """
+SELECT v.item_id, v.name, v.grams, v.calories, v.protein, v.fat, v.carbs, v.added_via
+FROM foodtracker_app.v_meal_items_computed AS v
+JOIN foodtracker_app.meals AS m ON m.meal_id = v.meal_id
+WHERE m.user_id = $1 AND v.item_id = $2
+"""
+
+LEGACY_CREATE_PRODUCT_QUERY = """
+INSERT INTO foodtracker_app.products (product_id, name, brand, is_custom, created_by)
+VALUES (gen_random_uuid(), $1, $2, true, $3)
+RETURNING product_id
+"""
+
+
+async def main() -> None:
+    args = parse_args(__doc__.splitlines()[0], days=1, items_per_meal=4, iterations=300, warmup=30)
+    conn = await connect()
+    try:
+        target_date = await seed_user(conn, args.days, args.items_per_meal)
+        meal_id = str(
+            await conn.fetchval(
+                "SELECT meal_id FROM foodtracker_app.meals WHERE user_id = $1 AND meal_date = $2 LIMIT 1",
+                BENCH_USER_ID,
+                target_date,
+            )
+        )
+        item_id = str(
+            await conn.fetchval("SELECT item_id FROM foodtracker_app.meal_items WHERE meal_id = $1 LIMIT 1", meal_id)
+        )
+        product_id = str(
+            await conn.fetchval("SELECT product_id FROM foodtracker_app.products WHERE brand = 'bench' LIMIT 1")
+        )
+        batch = [(product_id, 100 + i, "search") for i in range(10)]
+        grams = iter(range(1, 10**9))
+
+        async def legacy_create_item() -> None:
+            new_id = await conn.fetchval(LEGACY_CREATE_ITEM_QUERY, BENCH_USER_ID, meal_id, product_id, 120, "search")
+            await conn.fetchrow(LEGACY_GET_ITEM_QUERY, BENCH_USER_ID, new_id)
+
+        async def create_item() -> None:
+            await meals_repo.create_meal_item(conn, BENCH_USER_ID, meal_id, product_id, 120, "search")
+
+        async def legacy_batch() -> None:
+            async with conn.transaction():
+                for product, amount, added_via in batch:
+                    new_id = await conn.fetchval(
+                        LEGACY_CREATE_ITEM_QUERY, BENCH_USER_ID, meal_id, product, amount, added_via
+                    )
+                    await conn.fetchrow(LEGACY_GET_ITEM_QUERY, BENCH_USER_ID, new_id)
+
+        async def create_batch() -> None:
+            await meals_repo.create_meal_items(conn, BENCH_USER_ID, meal_id, batch)
+
+        async def legacy_update_item() -> None:
+            await conn.fetchval(LEGACY_UPDATE_ITEM_QUERY, 100 + next(grams) % 400, BENCH_USER_ID, meal_id, item_id)
+            await conn.fetchrow(LEGACY_GET_ITEM_QUERY, BENCH_USER_ID, item_id)
+
+        async def update_item() -> None:
+            await meals_repo.update_meal_item(conn, BENCH_USER_ID, meal_id, item_id, 100 + next(grams) % 400)
+
+        async def legacy_create_product() -> None:
+            new_id = await conn.fetchval(LEGACY_CREATE_PRODUCT_QUERY, "bench write", "bench", BENCH_USER_ID)
+            await products_repo.insert_nutrition_event(conn, str(new_id), 100, 1.0, 1.0, 1.0, "manual")
+
+        async def create_product() -> None:
+            await products_repo.create_product(conn, "bench write", "bench", BENCH_USER_ID, 100, 1.0, 1.0, 1.0)
+
+        async def create_and_delete_meal() -> None:
+            new_meal = await meals_repo.create_meal(conn, BENCH_USER_ID, target_date, "snack", time(16, 0))
+            await meals_repo.delete_meal(conn, BENCH_USER_ID, new_meal)
+
+        async def create_and_delete_item() -> None:
+            item = await meals_repo.create_meal_item(conn, BENCH_USER_ID, meal_id, product_id, 80, "search")
+            await meals_repo.delete_meal_item(conn, BENCH_USER_ID, meal_id, str(item["item_id"]))
+
+        scenarios = (
+            ("add item: legacy (2)", legacy_create_item),
+            ("add item: cte (1)", create_item),
+            ("add 10 items: legacy (20)", legacy_batch),
+            ("add 10 items: cte (1)", create_batch),
+            ("update item: legacy (2)", legacy_update_item),
+            ("update item: cte (1)", update_item),
+            ("create product: legacy (2)", legacy_create_product),
+            ("create product: cte (1)", create_product),
+            ("create+delete meal (2)", create_and_delete_meal),
+            ("add+delete item (2)", create_and_delete_item),
+        )
+        for name, fn in scenarios:
+            report(name, await measure(fn, args.iterations, args.warmup))
+            await conn.execute(
+                "DELETE FROM foodtracker_app.meal_items WHERE meal_id = $1 AND item_id <> $2", meal_id, item_id
+            )
+            await conn.execute("DELETE FROM foodtracker_app.products WHERE name = 'bench write' AND brand = 'bench'")
+    finally:
+        await cleanup_user(conn)
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""Plan check for GET /v1/meals/{meal_id}: one statement, meal_items read once.
+
+Seeds the bench user, then EXPLAINs the legacy two-query path (header from
+v_meal_totals, items with an extra meal_items join for ordering) against
+GET_MEAL_DETAIL_QUERY and times both. Exits non-zero if the single-statement
+plan touches meal_items more than once or aggregates meals on the fly.
+
+Usage: DATABASE_URL=... python -m benchmarks.plan_meal_detail --days 30
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from collections import Counter
+
+from app.repositories.meals import GET_MEAL_DETAIL_QUERY
+
+from ._common import BENCH_USER_ID, cleanup_user, connect, measure, parse_args, report, seed_user
+
+LEGACY_MEAL_QUERY = """
+SELECT meal_id, meal_type, meal_time, calories, protein, fat, carbs
+FROM foodtracker_app.v_meal_totals
+WHERE user_id = $1 AND meal_id = $2
+"""
+
+LEGACY_MEAL_ITEMS_QUERY = """
+SELECT v.item_id, v.name, v.grams, v.calories, v.protein, v.fat, v.carbs, v.added_via
+FROM foodtracker_app.v_meal_items_computed AS v
+JOIN foodtracker_app.meals AS m ON m.meal_id = v.meal_id
+JOIN foodtracker_app.meal_items AS mi ON mi.item_id = v.item_id
+WHERE m.user_id = $1 AND v.meal_id = $2
+ORDER BY mi.created_at
+"""
+
+
+def relations(plan: dict) -> Counter:
+    found: Counter = Counter()
+    if "Relation Name" in plan:
+        found[plan["Relation Name"]] += 1
+    for child in plan.get("Plans", []):
+        found.update(relations(child))
+    return found
+
+
+async def explain(conn, title: str, query: str, *args) -> Counter:
+    raw = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", *args)
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    text = await conn.fetch(f"EXPLAIN (ANALYZE) {query}", *args)
+    print(f"--- {title}")
+    print("\n".join(row[0] for row in text))
+    found = relations(plan["Plan"])
+    print(f"=> {dict(sorted(found.items()))}\n")
+    return found
+
+
+async def main() -> int:
+    args = parse_args(__doc__.splitlines()[0], iterations=500, days=30)
+
+    conn = await connect()
+    try:
+        await seed_user(conn, args.days, args.items_per_meal)
+        meal_id = await conn.fetchval(
+            "SELECT meal_id FROM foodtracker_app.meals WHERE user_id = $1 ORDER BY meal_date DESC LIMIT 1",
+            BENCH_USER_ID,
+        )
+
+        legacy = await explain(conn, "legacy: meal", LEGACY_MEAL_QUERY, BENCH_USER_ID, meal_id)
+        legacy += await explain(conn, "legacy: items", LEGACY_MEAL_ITEMS_QUERY, BENCH_USER_ID, meal_id)
+        single = await explain(conn, "GET_MEAL_DETAIL_QUERY", GET_MEAL_DETAIL_QUERY, BENCH_USER_ID, meal_id)
+        print(f"relation reads: legacy={sum(legacy.values())} single={sum(single.values())}")
+
+        async def legacy_path() -> None:
+            await conn.fetchrow(LEGACY_MEAL_QUERY, BENCH_USER_ID, meal_id)
+            await conn.fetch(LEGACY_MEAL_ITEMS_QUERY, BENCH_USER_ID, meal_id)
+
+        async def single_path() -> None:
+            await conn.fetchrow(GET_MEAL_DETAIL_QUERY, BENCH_USER_ID, meal_id)
+
+        report("legacy (2 queries)", await measure(legacy_path, args.iterations, args.warmup))
+        report("single statement", await measure(single_path, args.iterations, args.warmup))
+    finally:
+        await cleanup_user(conn)
+        await conn.close()
+
+    ok = single["meal_items"] <= 1 and single["meals"] == 0
+    if not ok:
+        print("single-statement plan reads meal_items twice or aggregates meals")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
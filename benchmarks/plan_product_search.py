@@ -0,0 +1,100 @@
+"""Plan check for PRODUCT_SEARCH_BACKEND=trgm: no sequential scan of products at 1M rows.
+
+Loads synthetic products inside a transaction that is rolled back, runs
+EXPLAIN on the trigram and prefix queries and exits non-zero if either plan
+sequentially scans foodtracker_app.products.
+
+Usage: DATABASE_URL=... python -m benchmarks.plan_product_search --products 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+
+from app.repositories.products import SEARCH_PRODUCTS_PREFIX_QUERY, SEARCH_PRODUCTS_QUERY, SEARCH_PRODUCTS_TRGM_QUERY
+
+from ._common import connect
+
+LOAD_PRODUCTS_QUERY = """
+INSERT INTO foodtracker_app.products (product_id, name, brand, is_custom)
+SELECT gen_random_uuid(),
+       (ARRAY['chicken','greek','oat','rye','apple','cheese','milk','beef','rice','tomato'])[1 + g % 10]
+         || ' ' || md5(g::text),
+       'plan-check',
+       false
+FROM generate_series(1, $1) AS g
+"""
+
+LOAD_NUTRITION_QUERY = """
+INSERT INTO foodtracker_app.product_nutrition_per_100g (product_id, calories, protein, fat, carbs)
+SELECT product_id, 100, 1.0, 1.0, 1.0
+FROM foodtracker_app.products
+WHERE brand = 'plan-check'
+"""
+
+REQUIRED_INDEXES = ("idx_products_name_trgm", "idx_products_name_lower_pattern")
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == "products":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def explain(conn, title: str, query: str, *args) -> bool:
+    raw = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", *args)
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    text = await conn.fetch(f"EXPLAIN (ANALYZE) {query}", *args)
+    print(f"--- {title}")
+    print("\n".join(row[0] for row in text))
+    scans = seq_scans(plan["Plan"])
+    print(f"=> {'SEQ SCAN on products' if scans else 'no sequential scan of products'}\n")
+    return not scans
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--query", default="chick")
+    args = parser.parse_args()
+
+    conn = await connect()
+    try:
+        present = {row["indexname"] for row in await conn.fetch(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = 'foodtracker_app' AND tablename = 'products'"
+        )}
+        missing = [name for name in REQUIRED_INDEXES if name not in present]
+        if missing:
+            print(f"missing indexes {missing}: apply sql_templates/12_product_search_trgm.sql first")
+            return 2
+
+        tx = conn.transaction()
+        await tx.start()
+        try:
+            await conn.execute(LOAD_PRODUCTS_QUERY, args.products)
+            await conn.execute(LOAD_NUTRITION_QUERY)
+            await conn.execute("ANALYZE foodtracker_app.products")
+            await conn.execute("ANALYZE foodtracker_app.product_nutrition_per_100g")
+
+            needle = args.query.lower()
+            ok = await explain(
+                conn, f"trgm: {needle!r}", SEARCH_PRODUCTS_TRGM_QUERY, needle, f"%{needle}%", None, None, None, 25
+            )
+            ok &= await explain(conn, "prefix: 'ch'", SEARCH_PRODUCTS_PREFIX_QUERY, "ch%", None, None, 25)
+            # Reference: the legacy LIKE query, expected to scan
+            await explain(conn, f"legacy like: {needle!r}", SEARCH_PRODUCTS_QUERY, f"%{needle}%", None, None, 25)
+        finally:
+            await tx.rollback()
+    finally:
+        await conn.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
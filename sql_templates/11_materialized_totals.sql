@@ -0,0 +1,184 @@
+-- 11.1) Materialized meal/day totals, kept in sync by triggers.
+-- Same numbers as v_meal_totals / v_day_totals, but a read no longer
+-- recomputes every logged item. Only the touched meal and its day are
+-- recomputed on write.
+CREATE TABLE IF NOT EXISTS foodtracker_app.meal_totals (
+  meal_id     UUID PRIMARY KEY,
+  user_id     UUID NOT NULL,
+  meal_date   DATE NOT NULL,
+  meal_type   foodtracker_app.meal_type NOT NULL,
+  meal_time   TIME NOT NULL,
+
+  calories    INT NOT NULL DEFAULT 0,
+  protein     NUMERIC NOT NULL DEFAULT 0,
+  fat         NUMERIC NOT NULL DEFAULT 0,
+  carbs       NUMERIC NOT NULL DEFAULT 0,
+  items_count INT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_meal_totals_user_date
+  ON foodtracker_app.meal_totals (user_id, meal_date);
+
+CREATE TABLE IF NOT EXISTS foodtracker_app.day_totals (
+  user_id   UUID NOT NULL,
+  day_date  DATE NOT NULL,
+
+  calories  INT NOT NULL DEFAULT 0,
+  protein   NUMERIC NOT NULL DEFAULT 0,
+  fat       NUMERIC NOT NULL DEFAULT 0,
+  carbs     NUMERIC NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (user_id, day_date)
+);
+
+-- Items are looked up by product when its nutrition changes
+CREATE INDEX IF NOT EXISTS idx_meal_items_product_id
+  ON foodtracker_app.meal_items (product_id);
+
+-- 11.2) Recompute helpers
+CREATE OR REPLACE FUNCTION foodtracker_app.refresh_day_totals(p_user_id UUID, p_day DATE)
+RETURNS VOID AS $$
+BEGIN
+  INSERT INTO foodtracker_app.day_totals (user_id, day_date, calories, protein, fat, carbs)
+  SELECT
+    t.user_id,
+    t.meal_date,
+    COALESCE(SUM(t.calories), 0)::INT,
+    COALESCE(ROUND(SUM(t.protein), 1), 0.0),
+    COALESCE(ROUND(SUM(t.fat), 1), 0.0),
+    COALESCE(ROUND(SUM(t.carbs), 1), 0.0)
+  FROM foodtracker_app.meal_totals t
+  WHERE t.user_id = p_user_id AND t.meal_date = p_day
+  GROUP BY t.user_id, t.meal_date
+  ON CONFLICT (user_id, day_date) DO UPDATE
+  SET
+    calories = EXCLUDED.calories,
+    protein  = EXCLUDED.protein,
+    fat      = EXCLUDED.fat,
+    carbs    = EXCLUDED.carbs;
+
+  -- no meals left on that day: v_day_totals has no row either
+  IF NOT FOUND THEN
+    DELETE FROM foodtracker_app.day_totals
+    WHERE user_id = p_user_id AND day_date = p_day;
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION foodtracker_app.refresh_meal_totals(p_meal_id UUID)
+RETURNS VOID AS $$
+DECLARE
+  v_user_id UUID;
+  v_day     DATE;
+BEGIN
+  SELECT m.user_id, m.meal_date INTO v_user_id, v_day
+  FROM foodtracker_app.meals m
+  WHERE m.meal_id = p_meal_id;
+
+  IF NOT FOUND THEN
+    -- meal is gone (e.g. items removed by ON DELETE CASCADE)
+    DELETE FROM foodtracker_app.meal_totals
+    WHERE meal_id = p_meal_id
+    RETURNING user_id, meal_date INTO v_user_id, v_day;
+  ELSE
+    INSERT INTO foodtracker_app.meal_totals (
+      meal_id, user_id, meal_date, meal_type, meal_time, calories, protein, fat, carbs, items_count
+    )
+    SELECT meal_id, user_id, meal_date, meal_type, meal_time, calories, protein, fat, carbs, items_count
+    FROM foodtracker_app.v_meal_totals
+    WHERE meal_id = p_meal_id
+    ON CONFLICT (meal_id) DO UPDATE
+    SET
+      user_id     = EXCLUDED.user_id,
+      meal_date   = EXCLUDED.meal_date,
+      meal_type   = EXCLUDED.meal_type,
+      meal_time   = EXCLUDED.meal_time,
+      calories    = EXCLUDED.calories,
+      protein     = EXCLUDED.protein,
+      fat         = EXCLUDED.fat,
+      carbs       = EXCLUDED.carbs,
+      items_count = EXCLUDED.items_count;
+  END IF;
+
+  IF v_user_id IS NOT NULL THEN
+    PERFORM foodtracker_app.refresh_day_totals(v_user_id, v_day);
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 11.3) Triggers
+CREATE OR REPLACE FUNCTION foodtracker_app.sync_totals_from_meal_items()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM foodtracker_app.refresh_meal_totals(OLD.meal_id);
+  END IF;
+
+  IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.meal_id IS DISTINCT FROM OLD.meal_id) THEN
+    PERFORM foodtracker_app.refresh_meal_totals(NEW.meal_id);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_meal_items_totals ON foodtracker_app.meal_items;
+CREATE TRIGGER trg_meal_items_totals
+AFTER INSERT OR UPDATE OF meal_id, product_id, grams OR DELETE ON foodtracker_app.meal_items
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.sync_totals_from_meal_items();
+
+CREATE OR REPLACE FUNCTION foodtracker_app.sync_totals_from_meals()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM foodtracker_app.meal_totals WHERE meal_id = OLD.meal_id;
+    PERFORM foodtracker_app.refresh_day_totals(OLD.user_id, OLD.meal_date);
+    RETURN NULL;
+  END IF;
+
+  PERFORM foodtracker_app.refresh_meal_totals(NEW.meal_id);
+
+  IF TG_OP = 'UPDATE' AND (NEW.user_id, NEW.meal_date) IS DISTINCT FROM (OLD.user_id, OLD.meal_date) THEN
+    PERFORM foodtracker_app.refresh_day_totals(OLD.user_id, OLD.meal_date);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_meals_totals ON foodtracker_app.meals;
+CREATE TRIGGER trg_meals_totals
+AFTER INSERT OR UPDATE OF user_id, meal_date, meal_type, meal_time OR DELETE ON foodtracker_app.meals
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.sync_totals_from_meals();
+
+CREATE OR REPLACE FUNCTION foodtracker_app.sync_totals_from_nutrition()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM foodtracker_app.refresh_meal_totals(affected.meal_id)
+  FROM (
+    SELECT DISTINCT mi.meal_id
+    FROM foodtracker_app.meal_items mi
+    WHERE mi.product_id = NEW.product_id
+  ) AS affected;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_nutrition_totals ON foodtracker_app.product_nutrition_per_100g;
+CREATE TRIGGER trg_nutrition_totals
+AFTER INSERT OR UPDATE OF calories, protein, fat, carbs ON foodtracker_app.product_nutrition_per_100g
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.sync_totals_from_nutrition();
+
+-- 11.4) Backfill for existing data (idempotent)
+INSERT INTO foodtracker_app.meal_totals (
+  meal_id, user_id, meal_date, meal_type, meal_time, calories, protein, fat, carbs, items_count
+)
+SELECT meal_id, user_id, meal_date, meal_type, meal_time, calories, protein, fat, carbs, items_count
+FROM foodtracker_app.v_meal_totals
+ON CONFLICT (meal_id) DO NOTHING;
+
+INSERT INTO foodtracker_app.day_totals (user_id, day_date, calories, protein, fat, carbs)
+SELECT user_id, day_date, calories, protein, fat, carbs
+FROM foodtracker_app.v_day_totals
+ON CONFLICT (user_id, day_date) DO NOTHING;
@@ -0,0 +1,10 @@
+-- 12.1) Ranked product search in the database (PRODUCT_SEARCH_BACKEND=trgm)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Substring matches (LIKE '%q%') and similarity ranking, queries of 3+ chars
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm
+  ON foodtracker_app.products USING gin (lower(name) gin_trgm_ops);
+
+-- Prefix matches (LIKE 'q%') for 1-2 char queries, independent of collation
+CREATE INDEX IF NOT EXISTS idx_products_name_lower_pattern
+  ON foodtracker_app.products (lower(name) text_pattern_ops);
@@ -0,0 +1,53 @@
+-- 13.1) Per-user change counter, used for ETags on GET /v1/day, /v1/meals/{id},
+-- /v1/settings and /v1/stats. Every change that can alter one of those
+-- responses bumps the owner's version in the same transaction.
+-- No FK to users: rows are bumped while a user's data is being cascade-deleted.
+CREATE TABLE IF NOT EXISTS foodtracker_app.user_versions (
+  user_id    UUID PRIMARY KEY,
+  version    BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION foodtracker_app.bump_user_version(p_user_id UUID)
+RETURNS VOID AS $$
+  INSERT INTO foodtracker_app.user_versions (user_id, version)
+  VALUES (p_user_id, 1)
+  ON CONFLICT (user_id) DO UPDATE
+  SET
+    version    = foodtracker_app.user_versions.version + 1,
+    updated_at = now();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION foodtracker_app.bump_user_version_from_row()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM foodtracker_app.bump_user_version(OLD.user_id);
+  END IF;
+
+  IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+    PERFORM foodtracker_app.bump_user_version(NEW.user_id);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 13.2) Triggers
+-- meal_totals is rewritten (11_materialized_totals.sql) for every change to a
+-- meal, its items or the nutrition of a product in it, so it covers meals,
+-- meal_items and nutrition corrections in one place.
+DROP TRIGGER IF EXISTS trg_meal_totals_user_version ON foodtracker_app.meal_totals;
+CREATE TRIGGER trg_meal_totals_user_version
+AFTER INSERT OR UPDATE OR DELETE ON foodtracker_app.meal_totals
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.bump_user_version_from_row();
+
+DROP TRIGGER IF EXISTS trg_settings_user_version ON foodtracker_app.settings;
+CREATE TRIGGER trg_settings_user_version
+AFTER INSERT OR UPDATE OR DELETE ON foodtracker_app.settings
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.bump_user_version_from_row();
+
+DROP TRIGGER IF EXISTS trg_day_insights_user_version ON foodtracker_app.day_insights;
+CREATE TRIGGER trg_day_insights_user_version
+AFTER INSERT OR UPDATE OR DELETE ON foodtracker_app.day_insights
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.bump_user_version_from_row();
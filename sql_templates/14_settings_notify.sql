@@ -0,0 +1,20 @@
+-- 14.1) Tell every API worker that a user's settings changed, so their
+-- in-process settings caches drop the entry. Payload: user_id.
+-- pg_notify is delivered on commit only.
+CREATE OR REPLACE FUNCTION foodtracker_app.notify_settings_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM pg_notify('foodtracker_settings', OLD.user_id::text);
+  ELSE
+    PERFORM pg_notify('foodtracker_settings', NEW.user_id::text);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_settings_notify ON foodtracker_app.settings;
+CREATE TRIGGER trg_settings_notify
+AFTER INSERT OR UPDATE OR DELETE ON foodtracker_app.settings
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.notify_settings_changed();
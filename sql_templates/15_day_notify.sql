@@ -0,0 +1,38 @@
+-- 15.1) Live day updates: NOTIFY foodtracker_day with "<user_id> <date>" for
+-- every day whose totals, meals or insight changed. meal_totals is rewritten
+-- for any change to meals, meal_items and nutrition events (see
+-- 11_materialized_totals.sql), so it stands in for all three write paths.
+-- Postgres folds identical payloads within one transaction into one
+-- notification and delivers them on commit.
+CREATE OR REPLACE FUNCTION foodtracker_app.notify_day_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'meal_totals' THEN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+      PERFORM pg_notify('foodtracker_day', OLD.user_id::text || ' ' || OLD.meal_date::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+      PERFORM pg_notify('foodtracker_day', NEW.user_id::text || ' ' || NEW.meal_date::text);
+    END IF;
+  ELSE
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+      PERFORM pg_notify('foodtracker_day', OLD.user_id::text || ' ' || OLD.insight_date::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+      PERFORM pg_notify('foodtracker_day', NEW.user_id::text || ' ' || NEW.insight_date::text);
+    END IF;
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_meal_totals_notify ON foodtracker_app.meal_totals;
+CREATE TRIGGER trg_meal_totals_notify
+AFTER INSERT OR UPDATE OR DELETE ON foodtracker_app.meal_totals
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.notify_day_changed();
+
+DROP TRIGGER IF EXISTS trg_day_insights_notify ON foodtracker_app.day_insights;
+CREATE TRIGGER trg_day_insights_notify
+AFTER INSERT OR UPDATE OR DELETE ON foodtracker_app.day_insights
+FOR EACH ROW EXECUTE FUNCTION foodtracker_app.notify_day_changed();
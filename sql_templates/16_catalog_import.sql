@@ -0,0 +1,39 @@
+-- 16.1) Bulk catalog import (python -m app.cli import-catalog, POST /v1/products/import)
+-- writes nutrition events and their snapshots in one set-based statement.
+-- While foodtracker.bulk_nutrition is on (SET LOCAL for that transaction only)
+-- the per-row snapshot upsert is skipped.
+CREATE OR REPLACE FUNCTION foodtracker_app.apply_product_nutrition_event()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF current_setting('foodtracker.bulk_nutrition', true) = 'on' THEN
+    RETURN NEW;
+  END IF;
+
+  -- upsert current nutrition snapshot
+  INSERT INTO foodtracker_app.product_nutrition_per_100g (
+    product_id, calories, protein, fat, carbs, updated_at
+  )
+  VALUES (
+    NEW.product_id,
+    NEW.calories,
+    NEW.protein,
+    NEW.fat,
+    NEW.carbs,
+    NEW.created_at
+  )
+  ON CONFLICT (product_id) DO UPDATE
+  SET
+    calories   = EXCLUDED.calories,
+    protein    = EXCLUDED.protein,
+    fat        = EXCLUDED.fat,
+    carbs      = EXCLUDED.carbs,
+    updated_at = EXCLUDED.updated_at;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 16.2) Catalog refreshes match non-custom products by name and brand
+CREATE INDEX IF NOT EXISTS idx_products_catalog_name_brand
+  ON foodtracker_app.products (lower(name), lower(coalesce(brand, '')))
+  WHERE NOT is_custom;
@@ -0,0 +1,86 @@
+-- 17.1) Nutrition snapshots maintained once per statement instead of once per
+-- event row. A batch of corrections upserts each product once, with its
+-- latest event (the batch insert writes one event per product, the last
+-- one in request order, so events of a statement never tie on created_at).
+-- Rows are upserted in product_id order, so concurrent batches take the
+-- snapshot row locks in the same order and cannot deadlock; an event older
+-- than the snapshot it would replace is ignored.
+CREATE OR REPLACE FUNCTION foodtracker_app.apply_product_nutrition_events()
+RETURNS TRIGGER AS $$
+BEGIN
+  -- Bulk imports write the snapshots themselves (16_catalog_import.sql)
+  IF current_setting('foodtracker.bulk_nutrition', true) = 'on' THEN
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO foodtracker_app.product_nutrition_per_100g AS n (
+    product_id, calories, protein, fat, carbs, updated_at
+  )
+  SELECT product_id, calories, protein, fat, carbs, created_at
+  FROM (
+    SELECT DISTINCT ON (product_id) product_id, calories, protein, fat, carbs, created_at
+    FROM new_events
+    ORDER BY product_id, created_at DESC
+  ) AS latest
+  ORDER BY product_id
+  ON CONFLICT (product_id) DO UPDATE
+  SET
+    calories   = EXCLUDED.calories,
+    protein    = EXCLUDED.protein,
+    fat        = EXCLUDED.fat,
+    carbs      = EXCLUDED.carbs,
+    updated_at = EXCLUDED.updated_at
+  WHERE n.updated_at <= EXCLUDED.updated_at;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_apply_nutrition_event ON foodtracker_app.product_nutrition_events;
+DROP TRIGGER IF EXISTS trg_apply_nutrition_events ON foodtracker_app.product_nutrition_events;
+CREATE TRIGGER trg_apply_nutrition_events
+AFTER INSERT ON foodtracker_app.product_nutrition_events
+REFERENCING NEW TABLE AS new_events
+FOR EACH STATEMENT EXECUTE FUNCTION foodtracker_app.apply_product_nutrition_events();
+
+-- 17.2) meal_totals refresh per statement: every meal using any of the
+-- changed products is recomputed once, not once per product.
+-- Transition tables cannot be combined with UPDATE OF <columns>, so updates
+-- compare old and new values themselves.
+CREATE OR REPLACE FUNCTION foodtracker_app.sync_totals_from_nutrition_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM foodtracker_app.refresh_meal_totals(affected.meal_id)
+    FROM (
+      SELECT DISTINCT mi.meal_id
+      FROM foodtracker_app.meal_items mi
+      JOIN new_nutrition c ON c.product_id = mi.product_id
+    ) AS affected;
+  ELSE
+    PERFORM foodtracker_app.refresh_meal_totals(affected.meal_id)
+    FROM (
+      SELECT DISTINCT mi.meal_id
+      FROM new_nutrition c
+      JOIN old_nutrition o ON o.product_id = c.product_id
+      JOIN foodtracker_app.meal_items mi ON mi.product_id = c.product_id
+      WHERE (c.calories, c.protein, c.fat, c.carbs) IS DISTINCT FROM (o.calories, o.protein, o.fat, o.carbs)
+    ) AS affected;
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_nutrition_totals ON foodtracker_app.product_nutrition_per_100g;
+DROP TRIGGER IF EXISTS trg_nutrition_totals_insert ON foodtracker_app.product_nutrition_per_100g;
+CREATE TRIGGER trg_nutrition_totals_insert
+AFTER INSERT ON foodtracker_app.product_nutrition_per_100g
+REFERENCING NEW TABLE AS new_nutrition
+FOR EACH STATEMENT EXECUTE FUNCTION foodtracker_app.sync_totals_from_nutrition_rows();
+
+DROP TRIGGER IF EXISTS trg_nutrition_totals_update ON foodtracker_app.product_nutrition_per_100g;
+CREATE TRIGGER trg_nutrition_totals_update
+AFTER UPDATE ON foodtracker_app.product_nutrition_per_100g
+REFERENCING OLD TABLE AS old_nutrition NEW TABLE AS new_nutrition
+FOR EACH STATEMENT EXECUTE FUNCTION foodtracker_app.sync_totals_from_nutrition_rows();
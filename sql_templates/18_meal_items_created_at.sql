@@ -0,0 +1,27 @@
+-- 18.1) Expose meal_items.created_at on v_meal_items_computed so callers can
+-- order items without joining meal_items a second time. New view columns
+-- must go last for CREATE OR REPLACE VIEW.
+CREATE OR REPLACE VIEW foodtracker_app.v_meal_items_computed AS
+SELECT
+  mi.item_id,
+  mi.meal_id,
+  mi.product_id,
+  mi.grams,
+  mi.added_via,
+  p.name,
+  p.brand,
+  p.is_custom,
+
+  -- computed per item
+  ROUND((n.calories * mi.grams) / 100.0)::INT AS calories,
+  ROUND((n.protein  * mi.grams) / 100.0, 1) AS protein,
+  ROUND((n.fat      * mi.grams) / 100.0, 1) AS fat,
+  ROUND((n.carbs    * mi.grams) / 100.0, 1) AS carbs,
+
+  mi.created_at
+
+FROM foodtracker_app.meal_items mi
+JOIN foodtracker_app.products p
+  ON p.product_id = mi.product_id
+JOIN foodtracker_app.product_nutrition_per_100g n
+  ON n.product_id = mi.product_id;
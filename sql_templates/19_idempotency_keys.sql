@@ -0,0 +1,20 @@
+-- 19.1) Responses of mutating requests sent with Idempotency-Key
+-- (IDEMPOTENCY_STORE=postgres). A row without status is a claim: the request
+-- is still running in some worker.
+CREATE TABLE IF NOT EXISTS foodtracker_app.idempotency_keys (
+  user_id     UUID NOT NULL,
+  idem_key    TEXT NOT NULL,
+  fingerprint TEXT NOT NULL,
+
+  status      INT,
+  headers     JSONB,
+  body        BYTEA,
+
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  expires_at  TIMESTAMPTZ NOT NULL,
+
+  PRIMARY KEY (user_id, idem_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at
+  ON foodtracker_app.idempotency_keys (expires_at);
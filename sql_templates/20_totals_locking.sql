@@ -0,0 +1,119 @@
+-- 20.1) Serialize totals refreshes per user day.
+-- refresh_* recompute an aggregate and upsert it. Under READ COMMITTED two
+-- transactions writing to the same meal or day would each see only their
+-- own rows and the last commit would overwrite the other's totals. A
+-- transaction-scoped advisory lock on (user_id, day) makes the second one
+-- wait; its next statement takes a fresh snapshot that includes the first
+-- commit. A meal belongs to one day, so the day lock covers its meal too.
+CREATE OR REPLACE FUNCTION foodtracker_app.lock_day_totals(p_user_id UUID, p_day DATE)
+RETURNS VOID AS $$
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('foodtracker_day_totals'), hashtext(p_user_id::text || ' ' || p_day::text));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION foodtracker_app.refresh_day_totals(p_user_id UUID, p_day DATE)
+RETURNS VOID AS $$
+BEGIN
+  PERFORM foodtracker_app.lock_day_totals(p_user_id, p_day);
+
+  INSERT INTO foodtracker_app.day_totals (user_id, day_date, calories, protein, fat, carbs)
+  SELECT
+    t.user_id,
+    t.meal_date,
+    COALESCE(SUM(t.calories), 0)::INT,
+    COALESCE(ROUND(SUM(t.protein), 1), 0.0),
+    COALESCE(ROUND(SUM(t.fat), 1), 0.0),
+    COALESCE(ROUND(SUM(t.carbs), 1), 0.0)
+  FROM foodtracker_app.meal_totals t
+  WHERE t.user_id = p_user_id AND t.meal_date = p_day
+  GROUP BY t.user_id, t.meal_date
+  ON CONFLICT (user_id, day_date) DO UPDATE
+  SET
+    calories = EXCLUDED.calories,
+    protein  = EXCLUDED.protein,
+    fat      = EXCLUDED.fat,
+    carbs    = EXCLUDED.carbs;
+
+  -- no meals left on that day: v_day_totals has no row either
+  IF NOT FOUND THEN
+    DELETE FROM foodtracker_app.day_totals
+    WHERE user_id = p_user_id AND day_date = p_day;
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION foodtracker_app.refresh_meal_totals(p_meal_id UUID)
+RETURNS VOID AS $$
+DECLARE
+  v_user_id UUID;
+  v_day     DATE;
+BEGIN
+  SELECT m.user_id, m.meal_date INTO v_user_id, v_day
+  FROM foodtracker_app.meals m
+  WHERE m.meal_id = p_meal_id;
+
+  IF NOT FOUND THEN
+    -- meal is gone (e.g. items removed by ON DELETE CASCADE)
+    DELETE FROM foodtracker_app.meal_totals
+    WHERE meal_id = p_meal_id
+    RETURNING user_id, meal_date INTO v_user_id, v_day;
+  ELSE
+    -- Taken before the aggregate below, which then runs on a fresh snapshot
+    PERFORM foodtracker_app.lock_day_totals(v_user_id, v_day);
+
+    INSERT INTO foodtracker_app.meal_totals (
+      meal_id, user_id, meal_date, meal_type, meal_time, calories, protein, fat, carbs, items_count
+    )
+    SELECT meal_id, user_id, meal_date, meal_type, meal_time, calories, protein, fat, carbs, items_count
+    FROM foodtracker_app.v_meal_totals
+    WHERE meal_id = p_meal_id
+    ON CONFLICT (meal_id) DO UPDATE
+    SET
+      user_id     = EXCLUDED.user_id,
+      meal_date   = EXCLUDED.meal_date,
+      meal_type   = EXCLUDED.meal_type,
+      meal_time   = EXCLUDED.meal_time,
+      calories    = EXCLUDED.calories,
+      protein     = EXCLUDED.protein,
+      fat         = EXCLUDED.fat,
+      carbs       = EXCLUDED.carbs,
+      items_count = EXCLUDED.items_count;
+  END IF;
+
+  IF v_user_id IS NOT NULL THEN
+    PERFORM foodtracker_app.refresh_day_totals(v_user_id, v_day);
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 20.2) A nutrition batch refreshes many meals: take the day locks in
+-- (user_id, day) order so that two batches cannot deadlock on them.
+CREATE OR REPLACE FUNCTION foodtracker_app.sync_totals_from_nutrition_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM foodtracker_app.refresh_meal_totals(affected.meal_id)
+    FROM (
+      SELECT DISTINCT m.user_id, m.meal_date, m.meal_id
+      FROM foodtracker_app.meal_items mi
+      JOIN new_nutrition c ON c.product_id = mi.product_id
+      JOIN foodtracker_app.meals m ON m.meal_id = mi.meal_id
+      ORDER BY m.user_id, m.meal_date, m.meal_id
+    ) AS affected;
+  ELSE
+    PERFORM foodtracker_app.refresh_meal_totals(affected.meal_id)
+    FROM (
+      SELECT DISTINCT m.user_id, m.meal_date, m.meal_id
+      FROM new_nutrition c
+      JOIN old_nutrition o ON o.product_id = c.product_id
+      JOIN foodtracker_app.meal_items mi ON mi.product_id = c.product_id
+      JOIN foodtracker_app.meals m ON m.meal_id = mi.meal_id
+      WHERE (c.calories, c.protein, c.fat, c.carbs) IS DISTINCT FROM (o.calories, o.protein, o.fat, o.carbs)
+      ORDER BY m.user_id, m.meal_date, m.meal_id
+    ) AS affected;
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,14 @@
+-- 21.1) Claims of idempotency keys get their own short lease.
+-- A claim used to live for the whole key TTL, so a worker that died while
+-- running the request left the key answering 409 for a day. locked_until is
+-- a few command timeouts ahead; once it passes an unanswered claim can be
+-- taken over by a retry. Rows claimed before this column existed keep
+-- waiting for expires_at.
+ALTER TABLE foodtracker_app.idempotency_keys
+  ADD COLUMN IF NOT EXISTS locked_until TIMESTAMPTZ;
+
+-- 21.2) Replay headers used to be stored as a JSON string holding the array
+-- (text passed through the jsonb codec); unwrap those rows.
+UPDATE foodtracker_app.idempotency_keys
+SET headers = (headers #>> '{}')::jsonb
+WHERE jsonb_typeof(headers) = 'string';
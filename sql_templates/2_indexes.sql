@@ -6,9 +6,8 @@ CREATE INDEX IF NOT EXISTS idx_meals_user_date
 CREATE INDEX IF NOT EXISTS idx_meal_items_meal_id
   ON foodtracker_app.meal_items (meal_id);
 
--- Product search: simple trigram (optional). If you want better search:
--- CREATE EXTENSION IF NOT EXISTS pg_trgm;
--- CREATE INDEX idx_products_name_trgm ON foodtracker_app.products USING gin (name gin_trgm_ops);
+-- Product search: trigram indexes for the ranked search mode live in
+-- 12_product_search_trgm.sql
 
 CREATE INDEX IF NOT EXISTS idx_products_name_lower
   ON foodtracker_app.products (lower(name));
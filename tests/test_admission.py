@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.admission import AdmissionController, priority_for_path
+from app.dependencies import get_db_connection
+from app.errors import ServiceUnavailableError
+from app.main import app
+
+
+def test_paths_map_to_lanes():
+    assert priority_for_path("/readyz") == "critical"
+    assert priority_for_path("/v1/export") == "background"
+    assert priority_for_path("/v1/day/2024-05-01") == "normal"
+
+
+def test_full_queue_is_shed_with_retry_after():
+    async def scenario():
+        controller = AdmissionController("test", limit=1, queue_size=1, queue_timeout=1.0, retry_after=2)
+        await controller.acquire("normal")
+        waiting = asyncio.create_task(controller.acquire("normal"))
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceUnavailableError) as shed:
+            await controller.acquire("normal")
+        controller.release()
+        await waiting
+        return controller, shed.value
+
+    controller, error = asyncio.run(scenario())
+
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "2"}
+    assert controller.in_use == 1
+    assert controller.queued == 0
+    assert controller.shed == 1
+
+
+def test_waiting_too_long_is_shed():
+    async def scenario():
+        controller = AdmissionController("test", limit=1, queue_timeout=0.01)
+        await controller.acquire("normal")
+        with pytest.raises(ServiceUnavailableError):
+            await controller.acquire("normal")
+        return controller
+
+    controller = asyncio.run(scenario())
+
+    assert controller.in_use == 1
+    assert controller.queued == 0
+
+
+def test_critical_lane_uses_reserve_and_goes_first():
+    async def scenario():
+        controller = AdmissionController("test", limit=2, reserved=1, queue_timeout=1.0)
+        order = []
+        await controller.acquire("normal")
+
+        async def take(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+
+        # The reserved slot is free, but only for the critical lane
+        normal = asyncio.create_task(take("normal"))
+        await asyncio.sleep(0)
+        assert order == []
+        await take("critical")
+        controller.release()
+        controller.release()
+        await normal
+        return order
+
+    assert asyncio.run(scenario()) == ["critical", "normal"]
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        controller = AdmissionController("test", limit=1, queue_timeout=1.0)
+        await controller.acquire("normal")
+        waiting = asyncio.create_task(controller.acquire("normal"))
+        await asyncio.sleep(0)
+        # Slot handed over, then the waiter is cancelled before it resumes
+        controller.release()
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return controller
+
+    controller = asyncio.run(scenario())
+
+    assert controller.in_use == 0
+    assert controller.queued == 0
+
+
+def test_shed_request_gets_503_with_retry_after():
+    def saturated():
+        raise ServiceUnavailableError("Database is busy, retry later", retry_after=1)
+
+    app.dependency_overrides[get_db_connection] = saturated
+    try:
+        response = TestClient(app).post("/v1/meals", json={"date": "2024-05-01", "meal_type": "lunch", "meal_time": "13:00"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["error"]["code"] == "UNAVAILABLE"
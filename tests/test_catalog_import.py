@@ -0,0 +1,162 @@
+import asyncio
+import io
+import uuid
+from contextlib import asynccontextmanager
+
+import asyncpg
+import orjson
+import pytest
+from asyncpg.exceptions import _base
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.db import database
+from app.main import app
+from app.services import catalog_import
+from app.services.catalog_import import (
+    CatalogFormatError,
+    catalog_format,
+    import_catalog,
+    parse_catalog,
+    stream_catalog_import,
+)
+
+
+class ImportConnection:
+    def __init__(self):
+        self.batches = []
+        self.executed = []
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, *args):
+        self.executed.append(query)
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.batches.append(list(records))
+
+    async def fetch(self, query, *args):
+        return [
+            {"product_id": uuid.UUID(int=1), "name": "Product 1", "brand": None, "inserted": True},
+            {"product_id": uuid.UUID(int=2), "name": "Product 2", "brand": "Acme", "inserted": True},
+        ]
+
+    async def fetchval(self, query, *args):
+        return 3
+
+
+def test_parse_csv_rows():
+    lines = [
+        "name,brand,calories,protein,fat,carbs\n",
+        "Oatmeal,,379,13,6.54,67\n",
+        '"Yogurt, Greek",Fage,59,10,0.4,3.6\n',
+    ]
+
+    rows = list(parse_catalog(lines, "csv"))
+
+    assert rows == [
+        (2, None, "Oatmeal", None, 379, 13.0, 6.5, 67.0),
+        (3, None, "Yogurt, Greek", "Fage", 59, 10.0, 0.4, 3.6),
+    ]
+
+
+def test_parse_ndjson_accepts_nested_nutrition_and_product_id():
+    product_id = "10000000-0000-0000-0000-000000000001"
+    lines = [
+        '{"name": "Banana", "calories": 89, "protein": 1.1, "fat": 0.3, "carbs": 23}\n',
+        "\n",
+        f'{{"product_id": "{product_id}", "name": "Chicken", "nutrition_per_100g": '
+        '{"calories": 165, "protein": 31, "fat": 3.6, "carbs": 0}}\n',
+    ]
+
+    rows = list(parse_catalog(lines, "ndjson"))
+
+    assert rows[0] == (1, None, "Banana", None, 89, 1.1, 0.3, 23.0)
+    assert rows[1][:3] == (3, uuid.UUID(product_id), "Chicken")
+
+
+@pytest.mark.parametrize(
+    "lines, message",
+    [
+        (["name,calories\n"], "line 1: missing columns: protein, fat, carbs"),
+        (["name,calories,protein,fat,carbs\n", ",1,1,1,1\n"], "line 2: name is required"),
+        (["name,calories,protein,fat,carbs\n", "Oil,-1,0,100,0\n"], "line 2: nutrition values must be non-negative"),
+        (["name,calories,protein,fat,carbs\n", "Oil,x,0,100,0\n"], "line 2: invalid nutrition value"),
+        (["name,calories,protein,fat,carbs\n", "Oil,9999999999,0,100,0\n"], "line 2: calories must not exceed"),
+    ],
+)
+def test_parse_csv_errors_name_the_line(lines, message):
+    with pytest.raises(CatalogFormatError, match=message):
+        list(parse_catalog(lines, "csv"))
+
+
+def test_catalog_format_from_name():
+    assert catalog_format("products.ndjson") == "ndjson"
+    assert catalog_format("application/x-ndjson") == "ndjson"
+    assert catalog_format("text/csv") == "csv"
+    assert catalog_format(None) == "csv"
+
+
+def test_import_copies_in_batches_then_applies_once():
+    conn = ImportConnection()
+    rows = iter([(line, None, f"Product {line}", None, 100, 1.0, 1.0, 1.0) for line in range(1, 6)])
+
+    async def scenario():
+        return [progress async for progress in import_catalog(conn, rows, batch_size=2)]
+
+    progress = asyncio.run(scenario())
+
+    assert [len(batch) for batch in conn.batches] == [2, 2, 1]
+    assert [item["rows"] for item in progress] == [2, 4, 5, 5]
+    assert progress[-1] == {"status": "done", "rows": 5, "created": 2, "renamed": 0, "nutrition_updated": 3}
+
+
+def test_import_puts_created_and_renamed_products_into_the_search_index(monkeypatch):
+    added = []
+    monkeypatch.setattr(catalog_import.product_index, "add", lambda *product: added.append(product))
+    rows = iter([(1, None, "Product 1", None, 100, 1.0, 1.0, 1.0)])
+
+    async def scenario():
+        return [progress async for progress in import_catalog(ImportConnection(), rows)]
+
+    asyncio.run(scenario())
+
+    assert added == [(str(uuid.UUID(int=1)), "Product 1", None), (str(uuid.UUID(int=2)), "Product 2", "Acme")]
+
+
+def test_malformed_content_length_is_400(monkeypatch):
+    monkeypatch.setattr("app.routers.products.get_settings", lambda: Settings(catalog_import_enabled=True))
+
+    response = TestClient(app).post(
+        "/v1/products/import", content=b"name,calories,protein,fat,carbs\n", headers={"Content-Length": "12abc"}
+    )
+
+    assert response.status_code == 400
+
+
+def test_stream_reports_client_side_encoding_errors(monkeypatch):
+    class RefusingConnection(ImportConnection):
+        async def copy_records_to_table(self, table, records, columns):
+            raise _base.DataError("invalid input for query argument $5: 9999999999 (value out of int32 range)")
+
+    @asynccontextmanager
+    async def connection():
+        yield RefusingConnection()
+
+    monkeypatch.setattr(database, "connection", connection)
+    source = io.BytesIO(b"name,calories,protein,fat,carbs\nOats,379,13,6.5,67\n")
+
+    async def scenario():
+        return [orjson.loads(line) async for line in stream_catalog_import(source, "csv", batch_size=10)]
+
+    lines = asyncio.run(scenario())
+
+    assert lines[-1]["status"] == "failed"
+    assert lines[-1]["error"].startswith("DataError")
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import date
+
+from app.cli import check_totals
+from app.repositories.totals import (
+    DAY_TOTALS_DRIFT_QUERY,
+    MEAL_TOTALS_DRIFT_QUERY,
+    REFRESH_DAY_TOTALS_QUERY,
+    REFRESH_MEAL_TOTALS_QUERY,
+)
+
+USER = "00000000-0000-0000-0000-000000000001"
+MEAL = "20000000-0000-0000-0000-000000000001"
+
+
+class DriftConnection:
+    def __init__(self, meal_drift, day_drift):
+        self.drift = {MEAL_TOTALS_DRIFT_QUERY: meal_drift, DAY_TOTALS_DRIFT_QUERY: day_drift}
+        self.executed = []
+        self.transactions = 0
+
+    async def fetch(self, query, *args):
+        assert args == (USER,)
+        return self.drift[query]
+
+    async def execute(self, query, *args):
+        assert self.transactions, "repair must run in a transaction"
+        self.executed.append((query, args))
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        self.transactions += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+MEAL_DRIFT = {
+    "meal_id": MEAL,
+    "user_id": USER,
+    "meal_date": date(2024, 5, 1),
+    "actual_calories": 100,
+    "expected_calories": 250,
+    "actual_items_count": 1,
+    "expected_items_count": 2,
+}
+DAY_DRIFT = {"user_id": USER, "day_date": date(2024, 5, 1), "actual_calories": 100, "expected_calories": 250}
+
+
+def test_no_drift_exits_zero(capsys):
+    conn = DriftConnection([], [])
+
+    assert asyncio.run(check_totals(conn, USER, repair=True)) == 0
+    assert conn.executed == []
+    assert "drift: 0" in capsys.readouterr().out
+
+
+def test_drift_without_repair_exits_one(capsys):
+    conn = DriftConnection([MEAL_DRIFT], [DAY_DRIFT])
+
+    assert asyncio.run(check_totals(conn, USER, repair=False)) == 1
+    assert conn.executed == []
+    out = capsys.readouterr().out
+    assert f"meal {MEAL}" in out
+    assert "calories 100 != 250" in out
+
+
+def test_repair_refreshes_drifted_meals_and_days():
+    conn = DriftConnection([MEAL_DRIFT], [DAY_DRIFT])
+
+    assert asyncio.run(check_totals(conn, USER, repair=True)) == 0
+    assert conn.executed == [
+        (REFRESH_MEAL_TOTALS_QUERY, ([MEAL],)),
+        (REFRESH_DAY_TOTALS_QUERY, ([USER], [date(2024, 5, 1)])),
+    ]
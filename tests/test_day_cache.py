@@ -0,0 +1,90 @@
+from datetime import date, time
+
+from app.schemas.common import DayResponse, MealSummary, Summary
+from app.services.day_cache import DayCache
+
+USER = "00000000-0000-0000-0000-000000000001"
+DAY = date(2024, 5, 1)
+
+
+def make_day(day: date = DAY, meal_ids: tuple[str, ...] = ()) -> DayResponse:
+    meals = [
+        MealSummary(
+            meal_id=meal_id,
+            meal_type="lunch",
+            meal_time=time(13, 0),
+            calories=0,
+            protein=0,
+            fat=0,
+            carbs=0,
+            items_count=0,
+        )
+        for meal_id in meal_ids
+    ]
+    summary = Summary(calories=0, protein=0, fat=0, carbs=0, status="under")
+    return DayResponse(date=day, summary=summary, meals=meals)
+
+
+def test_hit_miss_counters():
+    cache = DayCache(max_size=4)
+    assert cache.get(USER, DAY) is None
+    cache.put(USER, DAY, make_day(), cache.begin())
+    assert cache.get(USER, DAY) is not None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = DayCache(max_size=2)
+    for offset in range(1, 4):
+        day = date(2024, 5, offset)
+        cache.put(USER, day, make_day(day), cache.begin())
+        if offset == 2:
+            cache.get(USER, date(2024, 5, 1))
+
+    assert cache.get(USER, date(2024, 5, 1)) is not None
+    assert cache.get(USER, date(2024, 5, 2)) is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_meal_only_drops_its_day():
+    cache = DayCache()
+    other_day = date(2024, 5, 2)
+    cache.put(USER, DAY, make_day(DAY, ("meal-1",)), cache.begin())
+    cache.put(USER, other_day, make_day(other_day, ("meal-2",)), cache.begin())
+
+    cache.invalidate_meal(USER, "meal-1")
+
+    assert cache.get(USER, DAY) is None
+    assert cache.get(USER, other_day) is not None
+
+
+def test_invalidate_meal_ignores_other_user():
+    cache = DayCache()
+    cache.put(USER, DAY, make_day(DAY, ("meal-1",)), cache.begin())
+    cache.invalidate_meal("someone-else", "meal-1")
+    assert cache.get(USER, DAY) is not None
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = DayCache()
+    token = cache.begin()
+    cache.invalidate_day(USER, DAY)
+    cache.put(USER, DAY, make_day(), token)
+    assert cache.get(USER, DAY) is None
+
+
+def test_ttl_expiry():
+    cache = DayCache(ttl_seconds=-1)
+    cache.put(USER, DAY, make_day(), cache.begin())
+    assert cache.get(USER, DAY) is None
+
+
+def test_entry_with_other_version_is_a_miss():
+    cache = DayCache(max_size=4)
+    cache.put(USER, DAY, make_day(), cache.begin(), version=3)
+
+    assert cache.get(USER, DAY, version=3) is not None
+    assert cache.get(USER, DAY) is not None
+    assert cache.get(USER, DAY, version=4) is None
+    assert len(cache) == 0
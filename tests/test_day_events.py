@@ -0,0 +1,102 @@
+import asyncio
+from datetime import date, time
+
+from app.schemas.common import DayResponse, Insight, MealSummary, Summary
+from app.services.day_events import DayEventHub, day_changes, format_event
+
+USER = "00000000-0000-0000-0000-000000000001"
+DAY = date(2024, 5, 1)
+
+
+def make_day(calories=500, meals=(("m1", 500),), insight=None):
+    return DayResponse.model_construct(
+        date=DAY,
+        summary=Summary.model_construct(calories=calories, protein=10.0, fat=5.0, carbs=60.0, status="under"),
+        meals=[
+            MealSummary.model_construct(
+                meal_id=meal_id,
+                meal_type="lunch",
+                meal_time=time(13, 0),
+                calories=meal_calories,
+                protein=10.0,
+                fat=5.0,
+                carbs=60.0,
+                items_count=1,
+            )
+            for meal_id, meal_calories in meals
+        ],
+        insight=insight,
+    )
+
+
+def test_first_event_is_the_whole_day():
+    day = make_day()
+    assert day_changes(None, day) == [("day", day)]
+
+
+def test_changes_carry_only_what_differs():
+    before = make_day(meals=(("m1", 500), ("m2", 300)))
+    after = make_day(calories=700, meals=(("m1", 700),), insight=Insight.model_construct(text="ok", severity="neutral"))
+
+    events = dict(day_changes(before, after))
+
+    assert events["summary"].calories == 700
+    assert [meal.meal_id for meal in events["meals"]["upserted"]] == ["m1"]
+    assert events["meals"]["removed"] == ["m2"]
+    assert events["insight"].text == "ok"
+    assert day_changes(after, make_day(calories=700, meals=(("m1", 700),), insight=after.insight)) == []
+
+
+def test_format_event_is_one_sse_message():
+    assert format_event("meals", {"removed": ["m1"]}) == b'event: meals\ndata: {"removed":["m1"]}\n\n'
+
+
+def test_notifications_share_one_load_per_day():
+    loads = []
+
+    async def loader(user_id, day):
+        loads.append((user_id, day))
+        await asyncio.sleep(0)
+        return make_day(calories=len(loads))
+
+    async def scenario():
+        hub = DayEventHub(loader=loader)
+        first = hub.subscribe(USER, DAY)
+        second = hub.subscribe(USER, DAY)
+        hub.notify(f"{USER} {DAY.isoformat()}")
+        await asyncio.sleep(0)
+        # Two more writes while the first load runs, and one for a day nobody watches
+        hub.notify(f"{USER} {DAY.isoformat()}")
+        hub.notify(f"{USER} {DAY.isoformat()}")
+        hub.notify(f"{USER} 2024-05-02")
+        hub.notify("garbage")
+        first_day = await first.next(1)
+        second_day = await second.next(1)
+        while hub._refreshing:
+            await asyncio.sleep(0)
+        latest = await first.next(1)
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        return first_day, second_day, latest, len(hub)
+
+    first_day, second_day, latest, remaining = asyncio.run(scenario())
+
+    # One load, plus one reload for the writes that landed while it ran
+    assert loads == [(USER, DAY), (USER, DAY)]
+    assert first_day is second_day
+    assert latest.summary.calories == 2
+    assert remaining == 0
+
+
+def test_subscribe_refuses_past_the_limit():
+    async def scenario():
+        hub = DayEventHub(max_subscribers=1)
+        subscription = hub.subscribe(USER, DAY)
+        refused = hub.subscribe(USER, DAY)
+        hub.unsubscribe(subscription)
+        return refused, hub.has_capacity()
+
+    refused, has_capacity = asyncio.run(scenario())
+
+    assert refused is None
+    assert has_capacity
@@ -0,0 +1,99 @@
+import asyncio
+import json
+from datetime import date
+
+from app.services.day import load_day_composite, load_days
+from app.services.day_cache import day_cache
+from app.services.settings_cache import settings_cache
+
+COMPOSITE_RECORD = {
+    "calorie_target": 2000,
+    "calorie_tolerance": 100,
+    "macro_mode": "percent",
+    "protein_target": 30,
+    "fat_target": 30,
+    "carbs_target": 40,
+    "calories": 2500,
+    "protein": 120.5,
+    "fat": 80.0,
+    "carbs": 300.0,
+    "meals": json.dumps(
+        [
+            {
+                "meal_id": "20000000-0000-0000-0000-000000000001",
+                "meal_type": "breakfast",
+                "meal_time": "08:00:00",
+                "calories": 2500,
+                "protein": 120.5,
+                "fat": 80.0,
+                "carbs": 300.0,
+                "items_count": 3,
+            }
+        ]
+    ),
+    "insight_text": None,
+    "insight_severity": None,
+}
+
+
+class FakeConnection:
+    def __init__(self, record):
+        self.record = record
+        self.calls = 0
+
+    async def fetchrow(self, query, *args):
+        self.calls += 1
+        return self.record
+
+
+def test_load_day_composite_single_round_trip():
+    conn = FakeConnection(COMPOSITE_RECORD)
+    day = asyncio.run(load_day_composite(conn, "user", date(2024, 5, 1)))
+
+    assert conn.calls == 1
+    assert day.summary.status == "over"
+    assert day.meals[0].meal_type == "breakfast"
+    assert day.meals[0].items_count == 3
+    assert day.insight is None
+
+
+def test_load_day_composite_with_insight():
+    record = {**COMPOSITE_RECORD, "meals": "[]", "calories": 0, "insight_text": "Nice", "insight_severity": "positive"}
+    day = asyncio.run(load_day_composite(FakeConnection(record), "user", date(2024, 5, 1)))
+
+    assert day.meals == []
+    assert day.summary.status == "under"
+    assert day.insight.severity == "positive"
+
+
+class RangeConnection:
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    async def fetchrow(self, query, *args):
+        self.queries.append(query)
+        fields = ("calorie_target", "calorie_tolerance", "macro_mode", "protein_target", "fat_target", "carbs_target")
+        return {field: COMPOSITE_RECORD[field] for field in fields}
+
+    async def fetch(self, query, *args):
+        self.queries.append(query)
+        return self.records
+
+
+def test_load_days_reads_range_in_one_query_and_fills_cache():
+    day_cache.clear()
+    settings_cache.clear()
+    records = [
+        {**COMPOSITE_RECORD, "day_date": date(2024, 5, 1)},
+        {**COMPOSITE_RECORD, "day_date": date(2024, 5, 2), "meals": "[]", "calories": 0},
+    ]
+    conn = RangeConnection(records)
+
+    days = asyncio.run(load_days(conn, "user", date(2024, 5, 1), date(2024, 5, 2), version=3))
+
+    # Settings once, then the whole range
+    assert len(conn.queries) == 2
+    assert [day.date for day in days] == [date(2024, 5, 1), date(2024, 5, 2)]
+    assert [day.summary.status for day in days] == ["over", "under"]
+    assert day_cache.get("user", date(2024, 5, 2), 3) is days[1]
@@ -0,0 +1,229 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.db import (
+    PRIMARY_UNTIL_HEADER,
+    Database,
+    ReadRouter,
+    init_connection,
+    repository_queries,
+    server_settings,
+    statement_cache_options,
+    warm_statement_cache,
+    read_router,
+    wrote_recently,
+)
+from app.dependencies import get_db_connection
+from app.main import create_app
+from app.repositories.day import DAY_COMPOSITE_QUERY
+from app.repositories.meals import CREATE_ITEMS_BATCH_QUERY
+
+
+class FakeConnection:
+    def __init__(self, failing):
+        self.failing = failing
+        self.prepared = []
+        self.codecs = []
+        self.executed = []
+
+    async def set_type_codec(self, type_name, *, encoder, decoder, schema, format="text"):
+        self.codecs.append((schema, type_name))
+
+    async def execute(self, query, *args):
+        self.executed.append(args)
+
+    async def _get_statement(self, query, timeout):
+        if query in self.failing:
+            raise asyncpg.UndefinedFunctionError("function similarity(text, text) does not exist")
+        self.prepared.append(query)
+
+
+def test_statement_cache_options_per_mode():
+    assert statement_cache_options(Settings(db_statement_mode="unnamed")) == {"statement_cache_size": 0}
+    assert statement_cache_options(Settings(db_statement_mode="cached", db_statement_cache_size=64)) == {
+        "statement_cache_size": 64
+    }
+    assert statement_cache_options(Settings(db_statement_mode="pooler"))["statement_cache_size"] > 0
+
+
+def test_repository_queries_are_collected_once():
+    queries = repository_queries()
+    assert DAY_COMPOSITE_QUERY in queries
+    assert CREATE_ITEMS_BATCH_QUERY in queries
+    assert len(queries) == len(set(queries))
+    assert len(queries) <= Settings().db_statement_cache_size
+
+
+def test_warm_statement_cache_skips_failing_queries():
+    conn = FakeConnection(failing={"SELECT 2"})
+    prepared = asyncio.run(warm_statement_cache(conn, ["SELECT 1", "SELECT 2", "SELECT 3"]))
+    assert prepared == 2
+    assert conn.prepared == ["SELECT 1", "SELECT 3"]
+
+
+class HangingPool:
+    def __init__(self):
+        self.terminated = False
+
+    async def close(self):
+        await asyncio.sleep(10)
+
+    def terminate(self):
+        self.terminated = True
+
+
+def test_init_connection_sets_codecs():
+    conn = FakeConnection(failing=set())
+    settings = Settings(db_search_path="foodtracker_app, public", db_statement_timeout_ms=5000)
+    asyncio.run(init_connection(conn, settings))
+    assert conn.codecs == [("pg_catalog", "json"), ("pg_catalog", "jsonb"), ("pg_catalog", "numeric")]
+    # Session settings go through server_settings: RESET ALL on release would undo set_config()
+    assert conn.executed == []
+    assert conn.prepared == []
+
+
+def test_session_settings_are_pool_server_settings(monkeypatch):
+    settings = Settings(db_search_path="foodtracker_app, public", db_statement_timeout_ms=5000)
+    created = {}
+
+    async def create_pool(dsn, **options):
+        created.update(options)
+        return object()
+
+    monkeypatch.setattr("app.db.get_settings", lambda: settings)
+    monkeypatch.setattr(asyncpg, "create_pool", create_pool)
+    asyncio.run(Database().get_pool())
+
+    assert created["server_settings"] == {
+        "application_name": settings.db_application_name,
+        "search_path": "foodtracker_app, public",
+        "statement_timeout": "5000",
+    }
+    assert server_settings(Settings()) == {"application_name": Settings().db_application_name}
+
+
+def test_init_connection_warms_cache_in_cached_mode():
+    conn = FakeConnection(failing=set())
+    asyncio.run(init_connection(conn, Settings(db_statement_mode="cached")))
+    assert conn.executed == []
+    assert conn.prepared == repository_queries()
+
+
+def test_close_terminates_pool_that_does_not_drain():
+    database = Database()
+    pool = HangingPool()
+    database._pool = pool
+    database.warm = True
+    asyncio.run(database.close(timeout=0.01))
+    assert pool.terminated
+    assert database.draining and not database.warm
+
+
+class FakePool:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def connection(self):
+        if self.fail:
+            raise ConnectionRefusedError("replica is down")
+        self.acquired += 1
+        yield self.name
+
+
+PRODUCT_ID = "10000000-0000-0000-0000-000000000001"
+NUTRITION = {"calories": 100, "protein": 1.0, "fat": 1.0, "carbs": 1.0}
+
+
+class WindowConnection:
+    async def fetch(self, query, *args):
+        return []
+
+    async def fetchval(self, query, *args):
+        return len(args[0])
+
+
+def _read(router, user_id="user"):
+    async def run():
+        async with router.connection(user_id) as conn:
+            return conn
+
+    return asyncio.run(run())
+
+
+def test_reads_go_to_replica_until_user_writes():
+    router = ReadRouter(FakePool("primary"), FakePool("replica"))
+    assert _read(router) == "replica"
+
+    router.mark_write("user")
+    assert _read(router) == "primary"
+    assert _read(router, "other") == "replica"
+
+
+def test_unreachable_replica_falls_back_and_is_skipped():
+    replica = FakePool("replica", fail=True)
+    router = ReadRouter(FakePool("primary"), replica)
+
+    assert _read(router) == "primary"
+    assert not router.use_replica("user")
+
+    replica.fail = False
+    router._replica_down_until = 0.0
+    assert _read(router) == "replica"
+
+
+def test_no_replica_reads_from_primary():
+    assert _read(ReadRouter(FakePool("primary"), None)) == "primary"
+
+
+def test_write_window_travels_through_cors_in_a_header(monkeypatch):
+    monkeypatch.setattr("app.main.replica_database", FakePool("replica"))
+    app = create_app()
+    read_from = []
+
+    @asynccontextmanager
+    async def connection(user_id=None, primary=False):
+        read_from.append("primary" if primary else "replica")
+        yield WindowConnection()
+
+    monkeypatch.setattr(read_router, "connection", connection)
+    app.dependency_overrides[get_db_connection] = lambda: WindowConnection()
+    client = TestClient(app)
+    origin = {"Origin": "https://my-miniapp-production.up.railway.app"}
+
+    preflight = client.options(
+        "/v1/products/search",
+        headers={**origin, "Access-Control-Request-Method": "GET", "Access-Control-Request-Headers": "x-primary-until"},
+    )
+    assert preflight.status_code == 200
+
+    written = client.post(
+        "/v1/products/nutrition/batch",
+        json={"items": [{"product_id": PRODUCT_ID, "nutrition_per_100g": NUTRITION}]},
+        headers=origin,
+    )
+    assert written.status_code == 200
+    assert "x-primary-until" in written.headers["access-control-expose-headers"].lower()
+    # No credentials cross-site: the client echoes the header on its next reads
+    client.get("/v1/products/search", params={"q": "oat"}, headers=origin)
+    client.get(
+        "/v1/products/search",
+        params={"q": "oat"},
+        headers={**origin, PRIMARY_UNTIL_HEADER: written.headers[PRIMARY_UNTIL_HEADER]},
+    )
+    assert read_from == ["replica", "primary"]
+
+
+def test_expired_forged_or_garbled_write_window_is_ignored():
+    assert wrote_recently({PRIMARY_UNTIL_HEADER: str(time.time() + 5)})
+    assert not wrote_recently({PRIMARY_UNTIL_HEADER: str(time.time() - 1)})
+    assert not wrote_recently({PRIMARY_UNTIL_HEADER: str(time.time() + 3600)})
+    assert not wrote_recently({PRIMARY_UNTIL_HEADER: "soon"})
+    assert not wrote_recently({})
@@ -0,0 +1,67 @@
+from contextlib import asynccontextmanager
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_read_connection, get_read_connector
+from app.main import app
+from app.services.etag import etag_matches, make_etag
+
+
+class VersionOnlyConnection:
+    """Answers the version lookup; any other query fails the test."""
+
+    def __init__(self, version):
+        self.version = version
+
+    async def fetchval(self, query, *args):
+        assert "user_versions" in query
+        return self.version
+
+    async def fetchrow(self, query, *args):
+        raise AssertionError("aggregate query ran on a 304 path")
+
+    async def fetch(self, query, *args):
+        raise AssertionError("aggregate query ran on a 304 path")
+
+
+def test_etag_depends_on_version_and_key():
+    etag = make_etag("day", 7, "2024-05-01")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("day", 7, "2024-05-01")
+    assert etag != make_etag("day", 8, "2024-05-01")
+    assert etag != make_etag("day", 7, "2024-05-02")
+    assert etag != make_etag("meal", 7, "2024-05-01")
+
+
+def test_etag_matches_lists_weak_and_wildcard():
+    etag = make_etag("settings", 1)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_conditional_get_skips_queries():
+    conn = VersionOnlyConnection(5)
+
+    @asynccontextmanager
+    async def connect():
+        yield conn
+
+    app.dependency_overrides[get_read_connection] = lambda: conn
+    app.dependency_overrides[get_read_connector] = lambda: connect
+    try:
+        client = TestClient(app)
+        cases = [
+            ("/v1/day/2024-05-01", make_etag("day", 5, "2024-05-01")),
+            ("/v1/settings", make_etag("settings", 5)),
+            ("/v1/meals/20000000-0000-0000-0000-000000000001", make_etag("meal", 5, "20000000-0000-0000-0000-000000000001")),
+            ("/v1/stats?from=2024-05-01&to=2024-05-07", make_etag("stats", 5, "custom", "2024-05-01", "2024-05-07", "day", "rows")),
+        ]
+        for path, etag in cases:
+            response = client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == 304, path
+            assert response.headers["etag"] == etag
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,100 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from contextlib import asynccontextmanager
+from datetime import date, time
+
+from app.services import export as export_service
+from app.services.export import EXPORT_COLUMNS, row_encoder, stream_export
+
+USER = "00000000-0000-0000-0000-000000000001"
+
+
+def make_row(index, item=True):
+    return {
+        "meal_date": date(2024, 5, 1),
+        "meal_type": "lunch",
+        "meal_time": time(13, 0),
+        "meal_id": f"meal-{index}",
+        "item_id": f"item-{index}" if item else None,
+        "product_id": "p-1" if item else None,
+        "name": "Yogurt, Greek" if item else None,
+        "brand": None,
+        "grams": 150 if item else None,
+        "added_via": "search" if item else None,
+        "calories": 89 if item else None,
+        "protein": 15.0 if item else None,
+        "fat": 0.6 if item else None,
+        "carbs": 5.4 if item else None,
+    }
+
+
+class CursorConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.transactions = []
+
+    def transaction(self, **options):
+        self.transactions.append(options)
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def cursor(self, query, *args, prefetch):
+        for row in self.rows:
+            yield row
+
+
+class FakeRouter:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def connection(self, user_id=None):
+        yield self.conn
+
+
+def collect(monkeypatch, rows, **kwargs):
+    conn = CursorConnection(rows)
+    monkeypatch.setattr(export_service, "read_router", FakeRouter(conn))
+
+    async def scenario():
+        return [chunk async for chunk in stream_export(USER, **kwargs)]
+
+    return asyncio.run(scenario()), conn
+
+
+def test_csv_rows_leave_missing_items_empty():
+    encode = row_encoder("csv")
+    [row] = list(csv.reader(io.StringIO(encode(make_row(1, item=False)).decode())))
+    assert row[:4] == ["2024-05-01", "lunch", "13:00:00", "meal-1"]
+    assert row[4:] == [""] * (len(EXPORT_COLUMNS) - 4)
+
+
+def test_ndjson_export_streams_in_chunks(monkeypatch):
+    rows = [make_row(index) for index in range(2000)]
+
+    chunks, conn = collect(monkeypatch, rows, fmt="ndjson")
+
+    assert len(chunks) > 1
+    lines = b"".join(chunks).decode().splitlines()
+    assert len(lines) == 2000
+    assert json.loads(lines[0])["name"] == "Yogurt, Greek"
+    assert conn.transactions == [{"isolation": "repeatable_read", "readonly": True}]
+
+
+def test_gzip_export_matches_plain_output(monkeypatch):
+    rows = [make_row(index) for index in range(500)] + [make_row(500, item=False)]
+
+    plain, _ = collect(monkeypatch, rows, fmt="csv")
+    compressed, _ = collect(monkeypatch, rows, fmt="csv", compress=True)
+
+    assert gzip.decompress(b"".join(compressed)) == b"".join(plain)
+    header = b"".join(plain).split(b"\n", 1)[0].decode()
+    assert header == ",".join(EXPORT_COLUMNS)
@@ -0,0 +1,220 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.db import database
+from app.services.idempotency import (
+    IdempotencyCache,
+    IdempotencyMiddleware,
+    PostgresIdempotencyStore,
+    StoredResponse,
+    request_fingerprint,
+    stored_from_record,
+)
+
+
+def make_app(store=None, delay=0.0, max_bytes=1024 * 1024):
+    app = FastAPI()
+    calls = []
+
+    @app.post("/items")
+    async def create(payload: dict) -> dict:
+        calls.append(payload)
+        await asyncio.sleep(delay)
+        if payload.get("fail"):
+            return JSONResponse(status_code=503, content={"error": "busy"})
+        return {"item": len(calls)}
+
+    wrapped = IdempotencyMiddleware(app, cache=IdempotencyCache(max_size=10), store=store, max_bytes=max_bytes)
+    return wrapped, calls
+
+
+async def call(app, body, key="k-1", chunk_size=None):
+    messages = []
+    # Without chunk_size the body goes in one message with Content-Length, otherwise chunked
+    chunks = [body] if chunk_size is None else [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    headers = [(b"content-type", b"application/json")]
+    if chunk_size is None:
+        headers.append((b"content-length", str(len(body)).encode()))
+    if key:
+        headers.append((b"idempotency-key", key.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/items",
+        "raw_path": b"/items",
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "server": ("test", 80),
+        "client": ("test", 1),
+    }
+    await app(scope, receive, send)
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], dict(start["headers"]), body
+
+
+def test_retry_is_replayed_without_running_the_route():
+    app, calls = make_app()
+    client = TestClient(app)
+
+    first = client.post("/items", json={"grams": 100}, headers={"Idempotency-Key": "abc"})
+    second = client.post("/items", json={"grams": 100}, headers={"Idempotency-Key": "abc"})
+    other = client.post("/items", json={"grams": 100}, headers={"Idempotency-Key": "def"})
+
+    assert first.json() == second.json() == {"item": 1}
+    assert "idempotent-replayed" not in first.headers
+    assert second.headers["idempotent-replayed"] == "true"
+    assert other.json() == {"item": 2}
+    assert len(calls) == 2
+
+
+def test_key_reused_with_other_body_is_rejected():
+    app, calls = make_app()
+    client = TestClient(app)
+
+    client.post("/items", json={"grams": 100}, headers={"Idempotency-Key": "abc"})
+    response = client.post("/items", json={"grams": 150}, headers={"Idempotency-Key": "abc"})
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_concurrent_duplicates_wait_for_the_first():
+    app, calls = make_app(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(call(app, b'{"grams": 100}') for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert {body for _, _, body in results} == {b'{"item":1}'}
+    assert sum(b"idempotent-replayed" in headers for _, headers, _ in results) == 4
+
+
+def test_server_errors_are_not_remembered():
+    app, calls = make_app()
+
+    async def scenario():
+        return [await call(app, b'{"fail": true}') for _ in range(2)]
+
+    statuses = [status for status, _, _ in asyncio.run(scenario())]
+
+    assert statuses == [503, 503]
+    assert len(calls) == 2
+
+
+def test_chunked_body_over_the_limit_passes_through():
+    app, calls = make_app(max_bytes=16)
+    body = b'{"grams": 100, "note": "' + b"x" * 64 + b'"}'
+
+    async def scenario():
+        return [await call(app, body, chunk_size=10) for _ in range(2)]
+
+    results = asyncio.run(scenario())
+
+    assert [status for status, _, _ in results] == [200, 200]
+    assert all(b"idempotent-replayed" not in headers for _, headers, _ in results)
+    assert calls == [{"grams": 100, "note": "x" * 64}] * 2
+
+
+def test_fingerprint_covers_the_query_string():
+    def scope(query_string):
+        return {"method": "POST", "path": "/items", "query_string": query_string}
+
+    assert request_fingerprint(scope(b"dry_run=1"), b"{}") != request_fingerprint(scope(b""), b"{}")
+    assert request_fingerprint(scope(b"dry_run=1"), b"{}") == request_fingerprint(scope(b"dry_run=1"), b"{}")
+
+
+class BusyStore:
+    """A worker elsewhere holds the key and has not answered yet."""
+
+    async def claim(self, user_id, key, fingerprint):
+        return {"fingerprint": fingerprint, "status": None, "headers": None, "body": None}
+
+
+def test_key_running_in_another_worker_is_409():
+    app, calls = make_app(store=BusyStore())
+
+    status, _, body = asyncio.run(call(app, b'{"grams": 100}'))
+
+    assert status == 409
+    assert b"CONFLICT" in body
+    assert calls == []
+
+
+class ClaimConnection:
+    def __init__(self):
+        self.claims = []
+
+    async def execute(self, query, *args):
+        return "DELETE 0"
+
+    async def fetchval(self, query, *args):
+        self.claims.append(args)
+        return True
+
+
+def test_store_claims_with_a_short_lease(monkeypatch):
+    conn = ClaimConnection()
+
+    @asynccontextmanager
+    async def connection():
+        yield conn
+
+    monkeypatch.setattr(database, "connection", connection)
+    store = PostgresIdempotencyStore(ttl_seconds=86400.0, lease_seconds=30.0)
+
+    assert asyncio.run(store.claim("user", "k-1", "fp")) is None
+    assert conn.claims == [("user", "k-1", "fp", 86400.0, 30.0)]
+
+
+def test_store_hands_headers_to_the_jsonb_codec_as_a_list(monkeypatch):
+    executed = []
+
+    class CompleteConnection:
+        async def execute(self, query, *args):
+            executed.append(args)
+
+    @asynccontextmanager
+    async def connection():
+        yield CompleteConnection()
+
+    monkeypatch.setattr(database, "connection", connection)
+    response = StoredResponse("fp", 201, [(b"content-type", b"application/json")], b"{}")
+    asyncio.run(PostgresIdempotencyStore().complete("user", "k-1", response))
+
+    [(_, _, status, headers, body)] = executed
+    assert (status, headers, body) == (201, [["content-type", "application/json"]], b"{}")
+    # What the codec decodes back
+    record = {"fingerprint": "fp", "status": 201, "headers": headers, "body": body}
+    assert stored_from_record(record) == response
+
+
+def test_malformed_content_length_is_400():
+    app, calls = make_app()
+    client = TestClient(app)
+
+    headers = {"Idempotency-Key": "abc", "Content-Length": "12abc", "Content-Type": "application/json"}
+    response = client.post("/items", content=b"{}", headers=headers)
+
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "BAD_REQUEST"
+    assert calls == []
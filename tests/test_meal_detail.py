@@ -0,0 +1,67 @@
+import json
+from datetime import time
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_read_connection
+from app.main import app
+
+MEAL_ID = "20000000-0000-0000-0000-000000000001"
+
+
+class MealConnection:
+    def __init__(self, record):
+        self.record = record
+        self.queries = []
+
+    async def fetchval(self, query, *args):
+        assert "user_versions" in query
+        return 3
+
+    async def fetchrow(self, query, *args):
+        self.queries.append(query)
+        return self.record
+
+    async def fetch(self, query, *args):
+        raise AssertionError("meal detail must be a single statement")
+
+
+def get_meal(conn):
+    app.dependency_overrides[get_read_connection] = lambda: conn
+    try:
+        return TestClient(app).get(f"/v1/meals/{MEAL_ID}")
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_meal_detail_is_one_statement():
+    items = [
+        {"item_id": "i-1", "name": "Oats", "grams": 50, "calories": 190, "protein": 6.5, "fat": 3.5, "carbs": 30.0, "added_via": "search"},
+        {"item_id": "i-2", "name": "Milk", "grams": 200, "calories": 120, "protein": 6.0, "fat": 5.0, "carbs": 9.4, "added_via": "barcode"},
+    ]
+    conn = MealConnection({
+        "meal_id": MEAL_ID,
+        "meal_type": "breakfast",
+        "meal_time": time(8, 30),
+        "calories": 310,
+        "protein": 12.5,
+        "fat": 8.5,
+        "carbs": 39.4,
+        "items": json.dumps(items),
+    })
+
+    response = get_meal(conn)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["meal"]["meal_time"] == "08:30:00"
+    assert "items" not in body["meal"]
+    assert body["items"] == items
+    [query] = conn.queries
+    assert "json_agg" in query
+
+
+def test_missing_meal_is_404():
+    response = get_meal(MealConnection(None))
+
+    assert response.status_code == 404
@@ -0,0 +1,117 @@
+import asyncpg
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_db_connection
+from app.main import app
+from app.services.day_cache import day_cache
+
+MEAL_ID = "20000000-0000-0000-0000-000000000001"
+ITEM_ID = "30000000-0000-0000-0000-000000000001"
+PRODUCT_ID = "10000000-0000-0000-0000-000000000001"
+
+ITEM = {
+    "item_id": ITEM_ID,
+    "name": "Oats",
+    "grams": 50,
+    "calories": 190,
+    "protein": 6.5,
+    "fat": 3.5,
+    "carbs": 30.0,
+    "added_via": "search",
+}
+
+
+class WriteConnection:
+    """Answers every statement with one canned row; records what ran."""
+
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    async def fetchrow(self, query, *args):
+        self.queries.append(query)
+        return self.row
+
+    async def fetch(self, query, *args):
+        self.queries.append(query)
+        return [self.row] if self.row else []
+
+    async def fetchval(self, query, *args):
+        raise AssertionError("unexpected extra statement")
+
+
+def call(conn, method, path, body):
+    day_cache.clear()
+    app.dependency_overrides[get_db_connection] = lambda: conn
+    try:
+        return TestClient(app).request(method, path, json=body)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_item_mutations_return_computed_row_in_one_statement():
+    cases = [
+        ("POST", f"/v1/meals/{MEAL_ID}/items", {"product_id": PRODUCT_ID, "grams": 50}, ITEM),
+        ("PATCH", f"/v1/meals/{MEAL_ID}/items/{ITEM_ID}", {"grams": 50}, ITEM),
+        ("POST", f"/v1/meals/{MEAL_ID}/items/batch", {"items": [{"product_id": PRODUCT_ID, "grams": 50}]}, [ITEM]),
+    ]
+    for method, path, body, expected in cases:
+        conn = WriteConnection(ITEM)
+        response = call(conn, method, path, body)
+        assert response.status_code == 200, path
+        assert response.json() == expected
+        [query] = conn.queries
+        assert "RETURNING" in query and "product_nutrition_per_100g" in query
+
+
+def test_item_mutation_without_row_is_404():
+    conn = WriteConnection(None)
+    response = call(conn, "PATCH", f"/v1/meals/{MEAL_ID}/items/{ITEM_ID}", {"grams": 50})
+
+    assert response.status_code == 404
+    assert len(conn.queries) == 1
+
+
+def test_item_of_product_without_nutrition_is_still_returned():
+    for method, path, body in [
+        ("POST", f"/v1/meals/{MEAL_ID}/items", {"product_id": PRODUCT_ID, "grams": 50}),
+        ("PATCH", f"/v1/meals/{MEAL_ID}/items/{ITEM_ID}", {"grams": 50}),
+        ("POST", f"/v1/meals/{MEAL_ID}/items/batch", {"items": [{"product_id": PRODUCT_ID, "grams": 50}]}),
+    ]:
+        conn = WriteConnection(ITEM)
+        call(conn, method, path, body)
+        [query] = conn.queries
+        assert "LEFT JOIN foodtracker_app.product_nutrition_per_100g" in query, path
+
+
+class UnknownProductConnection(WriteConnection):
+    async def fetchrow(self, query, *args):
+        raise asyncpg.ForeignKeyViolationError("meal_items_product_id_fkey")
+
+    async def fetch(self, query, *args):
+        raise asyncpg.ForeignKeyViolationError("meal_items_product_id_fkey")
+
+
+def test_unknown_product_is_404_for_single_and_batch_items():
+    for path, body in [
+        (f"/v1/meals/{MEAL_ID}/items", {"product_id": PRODUCT_ID, "grams": 50}),
+        (f"/v1/meals/{MEAL_ID}/items/batch", {"items": [{"product_id": PRODUCT_ID, "grams": 50}]}),
+    ]:
+        response = call(UnknownProductConnection(None), "POST", path, body)
+        assert response.status_code == 404, path
+        assert "Product not found" in response.text
+
+
+def test_product_and_first_event_are_one_statement():
+    conn = WriteConnection({"product_id": PRODUCT_ID})
+    response = call(
+        conn,
+        "POST",
+        "/v1/products",
+        {"name": "Granola", "nutrition_per_100g": {"calories": 450, "protein": 10.0, "fat": 15.0, "carbs": 60.0}},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"product_id": PRODUCT_ID}
+    [query] = conn.queries
+    assert "product_nutrition_events" in query
@@ -0,0 +1,65 @@
+import asyncio
+
+import asyncpg
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.metrics import MetricsMiddleware, observe_query
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@observe_query
+async def fetch_thing(value):
+    return value
+
+
+@observe_query
+async def fetch_broken():
+    raise asyncpg.UndefinedTableError("relation does not exist")
+
+
+@observe_query
+async def iter_things(count):
+    for value in range(count):
+        yield value
+
+
+async def _collect(count):
+    return [value async for value in iter_things(count)]
+
+
+def test_observe_query_records_latency_and_errors():
+    before = sample("gateway_db_query_duration_seconds_count", query="test_metrics.fetch_thing")
+    assert asyncio.run(fetch_thing(3)) == 3
+    assert sample("gateway_db_query_duration_seconds_count", query="test_metrics.fetch_thing") == before + 1
+
+    with pytest.raises(asyncpg.UndefinedTableError):
+        asyncio.run(fetch_broken())
+    assert sample("gateway_db_query_errors_total", query="test_metrics.fetch_broken") == 1
+
+
+def test_observe_query_wraps_async_generators():
+    assert asyncio.run(_collect(3)) == [0, 1, 2]
+    assert sample("gateway_db_query_duration_seconds_count", query="test_metrics.iter_things") == 1
+
+
+def test_middleware_labels_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str) -> dict[str, str]:
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+    for item_id in ("a", "b", "c"):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    client.get("/missing")
+
+    assert sample("gateway_http_request_duration_seconds_count", method="GET", route="/items/{item_id}", status="2xx") == 3
+    assert sample("gateway_http_request_duration_seconds_count", method="GET", route="unmatched", status="4xx") >= 1
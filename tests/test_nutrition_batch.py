@@ -0,0 +1,64 @@
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_db_connection
+from app.main import app
+from app.services.day_cache import day_cache
+
+PRODUCT_A = "10000000-0000-0000-0000-000000000001"
+PRODUCT_B = "10000000-0000-0000-0000-000000000002"
+
+
+class BatchConnection:
+    def __init__(self):
+        self.calls = []
+
+    async def fetchval(self, query, *args):
+        self.calls.append((query, args))
+        return len(set(args[0]))
+
+
+def nutrition(calories):
+    return {"calories": calories, "protein": 1.0, "fat": 2.0, "carbs": 3.0}
+
+
+def test_batch_corrections_are_one_insert():
+    conn = BatchConnection()
+    day_cache.clear()
+    app.dependency_overrides[get_db_connection] = lambda: conn
+    try:
+        response = TestClient(app).post(
+            "/v1/products/nutrition/batch",
+            json={
+                "source": "label",
+                "items": [
+                    {"product_id": PRODUCT_A, "nutrition_per_100g": nutrition(100)},
+                    {"product_id": PRODUCT_B, "nutrition_per_100g": nutrition(200)},
+                    {"product_id": PRODUCT_A, "nutrition_per_100g": nutrition(110)},
+                ],
+            },
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "events": 2, "products": 2}
+    [(query, args)] = conn.calls
+    assert "product_nutrition_events" in query
+    # Request order is kept, so the last correction of a product wins
+    assert args[0] == [PRODUCT_A, PRODUCT_B, PRODUCT_A]
+    assert args[1] == [100, 200, 110]
+    assert args[-1] == "label"
+    # No synthetic future timestamps that would make a later PATCH look older
+    assert "microsecond" not in query and "DISTINCT ON" in query
+
+
+def test_batch_corrections_require_items():
+    conn = BatchConnection()
+    app.dependency_overrides[get_db_connection] = lambda: conn
+    try:
+        response = TestClient(app).post("/v1/products/nutrition/batch", json={"items": []})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 422
+    assert conn.calls == []
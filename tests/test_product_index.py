@@ -0,0 +1,143 @@
+from app.services.product_index import ProductIndexBuilder, ProductSearchIndex, SearchHit, _rank, normalize
+
+PRODUCTS = [
+    ("10000000-0000-0000-0000-000000000001", "Chicken Breast", None),
+    ("10000000-0000-0000-0000-000000000002", "Chicken", None),
+    ("10000000-0000-0000-0000-000000000003", "Grilled chicken wings", "KFC"),
+    ("10000000-0000-0000-0000-000000000004", "Greek Yogurt", "Danone"),
+    ("10000000-0000-0000-0000-000000000005", "Йогурт питьевой", "Активиа"),
+    ("10000000-0000-0000-0000-000000000006", "Ёжевичный джем", None),
+]
+
+
+def build() -> ProductSearchIndex:
+    builder = ProductIndexBuilder()
+    for product_id, name, brand in PRODUCTS:
+        builder.add(product_id, name, brand)
+    return builder.build()
+
+
+def names(hits) -> list[str]:
+    by_id = {product_id: name for product_id, name, _ in PRODUCTS}
+    return [by_id.get(hit.product_id, hit.product_id) for hit in hits]
+
+
+def test_normalize():
+    assert normalize("  Ёжик   В тумане ") == "ежик в тумане"
+
+
+def test_ranking_exact_then_prefix_then_word():
+    assert names(build().search("chicken")) == ["Chicken", "Chicken Breast", "Grilled chicken wings"]
+
+
+def test_substring_match_in_the_middle_of_a_word():
+    assert names(build().search("icke")) == ["Chicken", "Chicken Breast", "Grilled chicken wings"]
+
+
+def test_short_query_uses_word_prefixes():
+    assert names(build().search("gr")) == ["Greek Yogurt", "Grilled chicken wings"]
+
+
+def test_brand_match_and_multi_token_query():
+    index = build()
+    assert names(index.search("danone")) == ["Greek Yogurt"]
+    assert names(index.search("yogurt danone")) == ["Greek Yogurt"]
+    assert index.search("yogurt kfc") == []
+
+
+def test_cyrillic_and_yo_folding():
+    index = build()
+    assert names(index.search("ЙОГУРТ")) == ["Йогурт питьевой"]
+    assert names(index.search("ежевич")) == ["Ёжевичный джем"]
+
+
+def test_limit():
+    assert len(build().search("chicken", limit=2)) == 2
+
+
+def test_incremental_add():
+    index = build()
+    index.add("10000000-0000-0000-0000-000000000099", "Chicken Soup", "Homemade")
+    hits = index.search("chicken soup")
+    assert [hit.product_id for hit in hits] == ["10000000-0000-0000-0000-000000000099"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "products.idx"
+    build().save(str(path))
+    loaded = ProductSearchIndex.load(str(path))
+
+    assert len(loaded) == len(PRODUCTS)
+    assert names(loaded.search("chicken")) == names(build().search("chicken"))
+    assert names(loaded.search("gr")) == ["Greek Yogurt", "Grilled chicken wings"]
+
+
+def test_keyset_pagination():
+    index = build()
+    first = index.search("chicken", limit=2)
+    rest = index.search("chicken", limit=2, after=first[-1].sort_key)
+    assert names(first + rest) == names(index.search("chicken"))
+
+
+def test_best_matches_are_found_past_many_weaker_ones():
+    builder = ProductIndexBuilder()
+    for i in range(1500):
+        builder.add(f"20000000-0000-0000-0000-{i:012d}", f"Salted oat crackers {i}", None)
+    builder.add("20000000-0000-0000-0000-999999999999", "Oat", None)
+    index = builder.build()
+
+    assert index.search("oat", limit=1)[0].product_id == "20000000-0000-0000-0000-999999999999"
+    first = index.search("oat", limit=1)
+    assert index.search("oat", limit=1, after=first[-1].sort_key)[0].score > first[0].score
+
+
+def test_compaction_folds_the_delta_into_the_snapshot():
+    index = build()
+    index.add("10000000-0000-0000-0000-000000000099", "Chicken Soup", "Homemade")
+    index.add("10000000-0000-0000-0000-000000000002", "Chicken Fillet", None)
+
+    compacted = index.compacted(index.delta(), watermark=123.0)
+
+    assert compacted.delta_size == 0
+    assert len(compacted) == len(PRODUCTS) + 1
+    assert compacted.watermark == 123.0
+    assert [hit.name for hit in compacted.search("chicken")] == [hit.name for hit in index.search("chicken")]
+    assert names(compacted.search("chicken soup")) == ["10000000-0000-0000-0000-000000000099"]
+
+
+def brute_force(index, query, limit):
+    tokens = normalize(query).split()
+    hits = []
+    for position in range(len(index._text_offsets) - 1):
+        name, brand = index._document(position)
+        score = _rank(tokens, name, brand)
+        if score is not None:
+            hits.append(SearchHit(index._product_id(position), score, name))
+    return sorted(hits, key=lambda hit: hit.sort_key)[:limit]
+
+
+def test_short_queries_stop_early_and_rank_like_a_full_scan(monkeypatch):
+    words = ["apple", "avocado", "banana", "almond", "bread", "oat", "ayran", "beef"]
+    builder = ProductIndexBuilder()
+    for i in range(5000):
+        name = f"{words[i % len(words)]} {words[(i * 7) % len(words)]} {i}"
+        builder.add(f"30000000-0000-0000-0000-{i:012d}", name, "Acme" if i % 3 else None)
+    index = builder.build()
+
+    for query in ("a", "av", "b", "apple a"):
+        assert index.search(query, limit=10) == brute_force(index, query, 10)
+        first = index.search(query, limit=10)
+        assert index.search(query, limit=10, after=first[-1].sort_key) == brute_force(index, query, 20)[10:]
+
+    documents = 0
+    read_document = index._document
+
+    def counting(position):
+        nonlocal documents
+        documents += 1
+        return read_document(position)
+
+    monkeypatch.setattr(index, "_document", counting)
+    index.search("a", limit=10)
+    # ~4000 products match "a"; only the shortest names are looked at
+    assert documents < 1000
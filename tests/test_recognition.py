@@ -0,0 +1,121 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.services.recognition import (
+    RecognitionJobs,
+    UploadLimitMiddleware,
+    UploadTooLarge,
+    prepare_image,
+    spool_upload,
+)
+
+USER = "00000000-0000-0000-0000-000000000001"
+
+
+class CountingRecognizer:
+    def __init__(self):
+        self.calls = 0
+
+    async def recognize(self, image):
+        self.calls += 1
+        return [{"name": "apple", "confidence": 0.9}]
+
+
+def test_spool_upload_copies_and_enforces_limit(tmp_path):
+    path = spool_upload(io.BytesIO(b"x" * 10), str(tmp_path), max_bytes=10)
+    assert path.read_bytes() == b"x" * 10
+
+    with pytest.raises(UploadTooLarge):
+        spool_upload(io.BytesIO(b"x" * 11), str(tmp_path), max_bytes=10)
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def upload_app(parsed):
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, path="/upload", max_bytes=1024)
+
+    @app.post("/upload")
+    async def upload(files: list[UploadFile] = File(...)):
+        parsed.append(len(files))
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_upload_limit_rejects_before_parsing():
+    parsed = []
+    client = upload_app(parsed)
+
+    assert client.post("/upload", files={"files": ("a.jpg", b"x" * 100)}).status_code == 200
+    declared = client.post("/upload", files={"files": ("a.jpg", b"x" * 2000)})
+    multipart = {"Content-Type": "multipart/form-data; boundary=b"}
+    chunked = client.post("/upload", content=iter([b"x" * 600] * 4), headers=multipart)
+    garbled = client.post("/upload", content=b"", headers={"Content-Length": "-1"})
+
+    assert declared.status_code == 413
+    assert chunked.status_code == 413
+    assert chunked.json() == declared.json()
+    assert garbled.status_code == 400
+    assert parsed == [1]
+
+
+def test_same_photo_is_recognized_once(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.recognition.Image", None)
+    recognizer = CountingRecognizer()
+
+    async def scenario():
+        jobs = RecognitionJobs(recognizer, executor=ThreadPoolExecutor(1))
+        first = jobs.submit(USER, [spool_upload(io.BytesIO(b"photo"), str(tmp_path), 100)])
+        await first.finished.wait()
+        second = jobs.submit(USER, [spool_upload(io.BytesIO(b"photo"), str(tmp_path), 100)])
+        await second.finished.wait()
+        other_user = jobs.get(second.job_id, "someone-else")
+        await jobs.stop()
+        return first, second, other_user
+
+    first, second, other_user = asyncio.run(scenario())
+
+    assert recognizer.calls == 1
+    assert first.status == second.status == "done"
+    assert first.results[0]["image_hash"] == second.results[0]["image_hash"]
+    assert [first.results[0]["cached"], second.results[0]["cached"]] == [False, True]
+    assert second.results[0]["candidates"] == [{"name": "apple", "confidence": 0.9}]
+    assert other_user is None
+    # Spooled files are removed once the job is finished
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_job_reports_error(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.recognition.Image", None)
+
+    class BrokenRecognizer:
+        async def recognize(self, image):
+            raise RuntimeError("model offline")
+
+    async def scenario():
+        jobs = RecognitionJobs(BrokenRecognizer(), executor=ThreadPoolExecutor(1))
+        job = jobs.submit(USER, [spool_upload(io.BytesIO(b"photo"), str(tmp_path), 100)])
+        await job.finished.wait()
+        await jobs.stop()
+        return job
+
+    job = asyncio.run(scenario())
+
+    assert job.status == "failed"
+    assert job.error == "RuntimeError: model offline"
+
+
+def test_prepare_image_without_pillow_hashes_content(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.recognition.Image", None)
+    path = tmp_path / "photo.bin"
+    path.write_bytes(b"photo")
+
+    image = prepare_image(str(path), 1024)
+
+    assert len(image.content_hash) == 32
+    assert image.data is None
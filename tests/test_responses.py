@@ -0,0 +1,58 @@
+import json
+import uuid
+from datetime import date, time
+from decimal import Decimal
+
+from app.responses import ORJSONResponse
+from app.schemas.common import DayResponse, Insight, MealItem, MealSummary, Summary
+
+ITEM_ID = uuid.UUID("30000000-0000-0000-0000-000000000001")
+
+
+def test_constructed_models_match_validated_output():
+    data = {
+        "date": date(2024, 5, 1),
+        "summary": {"calories": 1800, "protein": 90.5, "fat": 60.0, "carbs": 200.0, "status": "ok"},
+        "meals": [
+            {
+                "meal_id": "20000000-0000-0000-0000-000000000001",
+                "meal_type": "lunch",
+                "meal_time": time(13, 30),
+                "calories": 1800,
+                "protein": 90.5,
+                "fat": 60.0,
+                "carbs": 200.0,
+                "items_count": 2,
+            }
+        ],
+        "insight": {"text": "Nice", "severity": "positive"},
+    }
+    validated = DayResponse(**data)
+    constructed = DayResponse.model_construct(
+        date=data["date"],
+        summary=Summary.model_construct(**data["summary"]),
+        meals=[MealSummary.model_construct(**meal) for meal in data["meals"]],
+        insight=Insight.model_construct(**data["insight"]),
+    )
+
+    assert json.loads(ORJSONResponse(constructed).body) == json.loads(validated.model_dump_json())
+
+
+def test_uuid_and_decimal_are_encoded_natively():
+    item = MealItem.model_construct(
+        item_id=ITEM_ID, name="Rice", grams=150, calories=195, protein=Decimal("4.1"), fat=0.4, carbs=42.3
+    )
+    body = json.loads(ORJSONResponse([item]).body)
+
+    assert body == [
+        {
+            "item_id": str(ITEM_ID),
+            "name": "Rice",
+            "grams": 150,
+            "calories": 195,
+            "protein": 4.1,
+            "fat": 0.4,
+            "carbs": 42.3,
+            "added_via": None,
+        }
+    ]
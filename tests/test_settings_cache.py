@@ -0,0 +1,75 @@
+import asyncio
+
+from app.services.notifications import SETTINGS_CHANNEL, NotificationListener
+from app.services.settings_cache import SettingsCache, load_settings, settings_cache
+
+USER = "00000000-0000-0000-0000-000000000001"
+SETTINGS_ROW = {
+    "calorie_target": 2000,
+    "calorie_tolerance": 100,
+    "macro_mode": "percent",
+    "protein_target": 30,
+    "fat_target": 30,
+    "carbs_target": 40,
+}
+
+
+class SettingsConnection:
+    def __init__(self):
+        self.calls = 0
+
+    async def fetchrow(self, query, *args):
+        self.calls += 1
+        return SETTINGS_ROW
+
+
+def test_load_settings_reads_database_once():
+    settings_cache.clear()
+    conn = SettingsConnection()
+
+    first = asyncio.run(load_settings(conn, USER))
+    second = asyncio.run(load_settings(conn, USER))
+
+    assert conn.calls == 1
+    assert first is second
+    assert first.calorie_target == 2000
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = SettingsCache()
+    token = cache.begin()
+    cache.invalidate(USER)
+    cache.put(USER, object(), token)
+    assert cache.get(USER) is None
+
+
+def test_no_refill_while_replicas_may_lag_behind_an_invalidation(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("app.services.settings_cache.time.monotonic", lambda: now)
+    cache = SettingsCache(settle_seconds=5.0)
+
+    cache.invalidate(USER)
+    cache.put(USER, object(), cache.begin())
+    cache.put("other", object(), cache.begin())
+    assert cache.get(USER) is None
+    assert cache.get("other") is not None
+
+    now = 105.5
+    cache.put(USER, object(), cache.begin())
+    assert cache.get(USER) is not None
+
+
+def test_notifications_invalidate_and_reset_clears():
+    cache = SettingsCache()
+    listener = NotificationListener()
+    listener.subscribe(SETTINGS_CHANNEL, cache.invalidate)
+    listener.on_reset(cache.clear)
+
+    cache.put(USER, object(), cache.begin())
+    cache.put("other", object(), cache.begin())
+    listener.dispatch(SETTINGS_CHANNEL, USER)
+    assert cache.get(USER) is None
+    assert cache.get("other") is not None
+
+    listener.reset()
+    assert cache.get("other") is None
@@ -0,0 +1,163 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.db import read_router
+from app.dependencies import get_read_connector
+from app.main import app
+from app.services.single_flight import SingleFlight, read_flights
+
+
+def test_concurrent_calls_share_one_load():
+    flights = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.run("key", load) for _ in range(5)))
+        # Done flights are not kept: a later call loads again
+        await flights.run("key", load)
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"enabled": True, "in_flight": 0, "started": 2, "shared": 4}
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad cursor")
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("key", load) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert [type(result) for result in results] == [ValueError] * 3
+
+
+def test_cancelled_waiter_leaves_the_others_alone():
+    flights = SingleFlight()
+    loads = []
+
+    async def load():
+        loads.append(asyncio.current_task())
+        await asyncio.sleep(0.02)
+        return "day"
+
+    async def scenario():
+        first = asyncio.create_task(flights.run("key", load))
+        second = asyncio.create_task(flights.run("key", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "day"
+    assert len(loads) == 1
+
+
+def test_load_is_cancelled_with_its_last_waiter():
+    flights = SingleFlight()
+    loads = []
+
+    async def load():
+        loads.append(asyncio.current_task())
+        await asyncio.sleep(1)
+
+    async def scenario():
+        waiter = asyncio.create_task(flights.run("key", load))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        return len(flights)
+
+    assert asyncio.run(scenario()) == 0
+    assert loads[0].cancelled()
+
+
+class CountingPool:
+    """Stands in for the read pool: counts checkouts and the peak in use."""
+
+    def __init__(self):
+        self.acquired = 0
+        self.in_use = 0
+        self.peak = 0
+
+    @asynccontextmanager
+    async def connect(self):
+        self.acquired += 1
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+        try:
+            yield self
+        finally:
+            self.in_use -= 1
+
+    async def fetch(self, query, *args):
+        await asyncio.sleep(0.02)
+        return []
+
+
+def identical_searches(enabled, requests=10):
+    pool = CountingPool()
+    app.dependency_overrides[get_read_connector] = lambda: pool.connect
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/v1/products/search", params={"q": "oat"}) for _ in range(requests)))
+
+    previous, read_flights.enabled = read_flights.enabled, enabled
+    try:
+        responses = asyncio.run(scenario())
+    finally:
+        read_flights.enabled = previous
+        app.dependency_overrides.clear()
+    assert all(response.status_code == 200 for response in responses)
+    return pool
+
+
+def test_identical_reads_take_one_connection():
+    separate = identical_searches(enabled=False)
+    coalesced = identical_searches(enabled=True)
+
+    assert separate.acquired == 10 and separate.peak == 10
+    assert coalesced.acquired == 1 and coalesced.peak == 1
+
+
+def test_read_after_a_write_does_not_join_an_older_flight():
+    pool = CountingPool()
+    app.dependency_overrides[get_read_connector] = lambda: pool.connect
+    user_id = get_settings().fixed_user_id
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            before = asyncio.ensure_future(client.get("/v1/products/search", params={"q": "oat"}))
+            await asyncio.sleep(0.005)
+            read_router.mark_write(user_id)
+            after = await client.get("/v1/products/search", params={"q": "oat"})
+            return await before, after
+
+    try:
+        responses = asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
+    assert all(response.status_code == 200 for response in responses)
+    assert pool.acquired == 2
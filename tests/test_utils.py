@@ -1,9 +1,21 @@
+import uuid
 from datetime import date
 
 import pytest
 
 from app.schemas.common import Settings
-from app.services.utils import compute_status, ensure_valid_date
+from app.services.utils import (
+    accepts_encoding,
+    compute_status,
+    decode_cursor,
+    encode_cursor,
+    ensure_valid_date,
+    resolve_stats_period,
+    resolve_today,
+)
+
+PRODUCT_ID = "10000000-0000-0000-0000-000000000001"
+TRGM_CURSOR = (float, str, uuid.UUID)
 
 
 def make_settings(target: int = 2000, tolerance: int = 200) -> Settings:
@@ -40,3 +52,96 @@ def test_ensure_valid_date_success():
 def test_ensure_valid_date_failure():
     with pytest.raises(ValueError):
         ensure_valid_date("05/01/2024")
+
+
+def test_resolve_today_prefers_client_date():
+    assert resolve_today("2024-05-01", "Europe/Moscow", "UTC") == date(2024, 5, 1)
+
+
+def test_resolve_today_unknown_timezone():
+    with pytest.raises(ValueError):
+        resolve_today(None, "Mars/Olympus", "UTC")
+
+
+def test_resolve_stats_period_named_range():
+    start, end, label = resolve_stats_period("90d", None, None, date(2024, 5, 1))
+    assert (start, end, label) == (date(2024, 2, 2), date(2024, 5, 1), "90d")
+
+
+def test_resolve_stats_period_custom_defaults_to_today():
+    start, end, label = resolve_stats_period(None, "2024-01-01", None, date(2024, 1, 31))
+    assert (start, end, label) == (date(2024, 1, 1), date(2024, 1, 31), "custom")
+
+
+@pytest.mark.parametrize(
+    "range_, date_from, date_to",
+    [
+        ("1d", None, None),
+        (None, None, None),
+        (None, None, "2024-01-01"),
+        (None, "2024-02-01", "2024-01-01"),
+        (None, "2020-01-01", "2024-01-01"),
+    ],
+)
+def test_resolve_stats_period_rejects_invalid(range_, date_from, date_to):
+    with pytest.raises(ValueError):
+        resolve_stats_period(range_, date_from, date_to, date(2024, 5, 1))
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("trgm", [0.5, "Сыр", "10000000-0000-0000-0000-000000000001"])
+    assert decode_cursor(cursor, "trgm", TRGM_CURSOR) == [0.5, "Сыр", "10000000-0000-0000-0000-000000000001"]
+    # similarity 1 may come back as an int
+    assert decode_cursor(encode_cursor("trgm", [1, "Сыр", PRODUCT_ID]), "trgm", TRGM_CURSOR)[0] == 1
+
+
+@pytest.mark.parametrize("value", ["not-base64!", encode_cursor("like", ["a", "b"])])
+def test_cursor_rejects_garbage_and_other_modes(value):
+    with pytest.raises(ValueError):
+        decode_cursor(value, "trgm", TRGM_CURSOR)
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        ["0.5", "Сыр", PRODUCT_ID],
+        [True, "Сыр", PRODUCT_ID],
+        [0.5, None, PRODUCT_ID],
+        [0.5, ["Сыр"], PRODUCT_ID],
+        [0.5, "Сыр", "not-a-uuid"],
+        [0.5, "Сыр", 42],
+        [0.5, "Сыр"],
+        {"score": 0.5},
+    ],
+)
+def test_cursor_rejects_malformed_keys(key):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("trgm", key), "trgm", TRGM_CURSOR)
+
+
+def test_memory_cursor_needs_integer_scores():
+    memory = (int, int, str, uuid.UUID)
+    assert decode_cursor(encode_cursor("memory", [1, 7, "chicken", PRODUCT_ID]), "memory", memory)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("memory", [1.5, 7, "chicken", PRODUCT_ID]), "memory", memory)
+
+
+@pytest.mark.parametrize(
+    "header, accepted",
+    [
+        ("gzip", True),
+        ("deflate, GZIP;q=0.5", True),
+        ("*", True),
+        (None, False),
+        ("", False),
+        ("br", False),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000, br", False),
+        ("*;q=1, gzip;q=0", False),
+        ("*;q=0", False),
+        ("gzip;q=oops", False),
+        ("x-gzip", False),
+    ],
+)
+def test_accepts_encoding_honours_q_values(header, accepted):
+    assert accepts_encoding(header, "gzip") is accepted